@@ -57,8 +57,8 @@ export const studentService = {
     }
   },
 
-  // Get specific student
-  async getStudent(id) {
+  // Get specific student; a cursor fetches the next page of their quiz history
+  async getStudent(id, cursor = null) {
     try {
       const token = localStorage.getItem("access_token");
       if (!token) {
@@ -68,6 +68,7 @@ export const studentService = {
         headers: {
           Authorization: `Bearer ${token}`,
         },
+        params: cursor ? { cursor } : {},
       });
 
       const studentData = {
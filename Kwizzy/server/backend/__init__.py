@@ -1,17 +1,21 @@
 from flask import Flask
 from werkzeug.utils import safe_join
 from flask_sqlalchemy import SQLAlchemy
-from flask_restful import Api
+from flask_restful import Api as RestfulApi
 from flask_migrate import Migrate
 import os
 from os import path
 from flask_jwt_extended import JWTManager
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
 from flask_cors import CORS
 from flask_caching import Cache
 from dotenv import load_dotenv
 from celery import Celery
 from celery.schedules import crontab
-
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import sqlite3
 
 load_dotenv()
 
@@ -30,6 +34,26 @@ celery = Celery(
 DB_NAME = "database.db"
 
 
+class Api(RestfulApi):
+    def handle_error(self, e):
+        """
+        Leave token errors to flask_jwt_extended, which answers expired and
+        revoked tokens with a 401; Flask-RESTful would make them a 500
+        """
+        if isinstance(e, (JWTExtendedException, PyJWTError)):
+            raise e
+        return super().handle_error(e)
+
+
+@event.listens_for(Engine, "connect")
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite ignores ON DELETE rules unless foreign keys are switched on"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
 def create_app():
     app = Flask(__name__)
     app.config.from_object("backend.config.Config")
@@ -67,6 +91,10 @@ def create_app():
                 "task": "backend.api.csv.cleanup_old_exports",
                 "schedule": crontab(minute=0, hour=0),
             },
+            "refresh-dashboard-snapshot": {
+                "task": "backend.api.chart_api.refresh_dashboard_snapshot",
+                "schedule": crontab(minute="*/10"),
+            },
         },
     )
 
@@ -84,6 +112,12 @@ def create_app():
     migrate.init_app(app, db)
     jwt.init_app(app)
 
+    from .services.token_blocklist import token_blocklist
+
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        return token_blocklist.is_revoked(jwt_payload)
+
     CORS(
         app,
         resources={
@@ -91,7 +125,7 @@ def create_app():
                 "origins": ["http://localhost:5173"],
                 "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
                 "allow_headers": ["Content-Type", "Authorization"],
-                "expose_headers": ["Content-Range"],
+                "expose_headers": ["Content-Range", "ETag"],
                 "supports_credentials": True,
             }
         },
@@ -106,7 +140,14 @@ def create_app():
         response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization"
         return response
 
-    from .api.auth import Login, Register, ForgotPasswordAPI, ResetPasswordAPI
+    from .api.auth import (
+        Login,
+        Logout,
+        Register,
+        ForgotPasswordAPI,
+        ResetPasswordAPI,
+        EmailDeliveryApi,
+    )
     from .api.student import (
         Student,
         StudentActivity,
@@ -127,6 +168,10 @@ def create_app():
     from .api.taskAPI import TaskAPI
     from .api.csv import UserQuizExportAPI, AdminQuizExportAPI
     from .api.payment import PaymentApi, TransactionHistoryAPI, TransactionExportAPI
+    from .api.metrics import MetricsApi
+    from .api.quiz_import import QuizImportApi
+    from .api.student_import import StudentImportApi
+    from .api.search import SearchApi
 
     api.add_resource(Student, "/api/students", "/api/student/<int:student_id>")
     api.add_resource(StudentActivity, "/api/student/<int:student_id>/activity")
@@ -134,9 +179,11 @@ def create_app():
         StudentSubjectPerformance, "/api/student/<int:student_id>/subjects"
     )
     api.add_resource(Login, "/api/login")
+    api.add_resource(Logout, "/api/logout")
     api.add_resource(Register, "/api/register")
     api.add_resource(ForgotPasswordAPI, "/api/auth/forgot-password")
     api.add_resource(ResetPasswordAPI, "/api/auth/reset-password")
+    api.add_resource(EmailDeliveryApi, "/api/auth/email-status/<string:delivery_id>")
     api.add_resource(UserApi, "/api/user", "/api/user/<int:user_id>")
     api.add_resource(SubjectApi, "/api/subject", "/api/subject/<int:subject_id>")
     api.add_resource(ChapterApi, "/api/chapter", "/api/chapter/<int:chapter_id>")
@@ -186,9 +233,36 @@ def create_app():
         "/api/export/transactions",
         "/api/export/transactions/<int:student_id>",
     )
+    api.add_resource(MetricsApi, "/api/admin/metrics")
+    api.add_resource(QuizImportApi, "/api/admin/quiz-import")
+    api.add_resource(StudentImportApi, "/api/admin/student-import")
+    api.add_resource(SearchApi, "/api/search")
+
+    @app.cli.command("rebuild-analytics")
+    def rebuild_analytics():
+        """Regenerate the student analytics rollup from quiz history"""
+        from .services.analytics import rebuild_student_rollup
+
+        rows = rebuild_student_rollup()
+        print(f"Rebuilt student analytics rollup: {rows} rows")
+
+    @app.cli.command("rebuild-search-index")
+    def rebuild_search():
+        """Regenerate the full-text search indexes from their tables"""
+        from .services.search import rebuild_search_index
+        from .services.student_directory import rebuild_student_directory
+
+        entries = rebuild_search_index()
+        rebuild_student_directory()
+        print(f"Rebuilt search index: {entries} entries")
 
     with app.app_context():
         db.create_all()
+        from .services.search import install_search_index
+        from .services.student_directory import install_student_directory
+
+        install_search_index()
+        install_student_directory()
     return app
 
 
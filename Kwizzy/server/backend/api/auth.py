@@ -1,23 +1,38 @@
 from flask import request
 from flask_restful import Resource
-from werkzeug.security import generate_password_hash, check_password_hash
 from backend.models import User
 from backend import db
 from flask_jwt_extended import (
     create_access_token,
     create_refresh_token,
+    decode_token,
+    get_jwt,
+    jwt_required,
 )
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
+from redis import RedisError
 from datetime import datetime
 from flask import current_app, request
 from itsdangerous import URLSafeTimedSerializer
-from ..tasks.celery_tasks import EmailService
+from ..tasks.celery_tasks import queue_email, get_delivery_status
+from ..utils import role_required
+from ..services.password_hashing import password_hasher, HashingBusy, RETRY_AFTER
+from ..services.token_blocklist import token_blocklist
+from ..services.rate_limit import rate_limit
 import os
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def busy_response(error):
+    """Shed load while the password hashing pool is saturated"""
+    return {"message": str(error)}, 503, {"Retry-After": str(RETRY_AFTER)}
+
+
 class Register(Resource):
+    @rate_limit("register")
     def post(self):
         # Get the JSON data from the request body
         data = request.get_json()
@@ -47,7 +62,10 @@ class Register(Resource):
             return {"message": "User already exists"}, 400
 
         # Hash the password before storing it
-        hashed_password = generate_password_hash(password)
+        try:
+            hashed_password = password_hasher.hash(password)
+        except HashingBusy as e:
+            return busy_response(e)
 
         # Create a new user
         new_user = User(
@@ -68,6 +86,7 @@ class Register(Resource):
 
 
 class Login(Resource):
+    @rate_limit("login")
     def post(self):
         # Get the JSON data from the request body
         data = request.get_json()
@@ -82,9 +101,20 @@ class Login(Resource):
 
         # Find the user by email
         user = User.query.filter_by(email=email).first()
-        if not user or not check_password_hash(user.password, password):
+        if not user:
+            return {"message": "Invalid credentials"}, 401
+        try:
+            matches, new_hash = password_hasher.verify(user.password, password)
+        except HashingBusy as e:
+            return busy_response(e)
+        if not matches:
             return {"message": "Invalid credentials"}, 401
 
+        # Upgrade hashes made with an older method or work factor
+        if new_hash:
+            user.password = new_hash
+            db.session.commit()
+
         additional_claims = {"role": user.role}
 
         # Create JWT tokens (access and refresh)
@@ -104,7 +134,33 @@ class Login(Resource):
         }, 200
 
 
+class Logout(Resource):
+    @jwt_required(verify_type=False)
+    def post(self):
+        """Revoke the presented token, and the refresh token if one is sent"""
+        data = request.get_json(silent=True) or {}
+        tokens = [get_jwt()]
+        if data.get("refresh_token"):
+            try:
+                refresh = decode_token(data["refresh_token"])
+            except (PyJWTError, JWTExtendedException):
+                return {"message": "Invalid refresh token"}, 400
+            if refresh["sub"] != tokens[0]["sub"]:
+                return {"message": "Refresh token belongs to another user"}, 403
+            tokens.append(refresh)
+
+        try:
+            for token in tokens:
+                token_blocklist.revoke_token(token["jti"], token["exp"])
+        except RedisError as e:
+            logger.error(f"Logout error: {str(e)}")
+            return {"error": "Could not log out, please try again"}, 503
+
+        return {"message": "Logged out successfully"}, 200
+
+
 class ForgotPasswordAPI(Resource):
+    @rate_limit("forgot_password")
     def post(self):
         """Initiate password reset"""
         try:
@@ -126,14 +182,14 @@ class ForgotPasswordAPI(Resource):
                 f"{os.getenv('FRONTEND_URL')}/reset-password?token={reset_token}"
             )
 
-            # Send email
+            # Queue the email; a worker delivers it
             template_data = {
                 "user_name": user.name,
                 "reset_link": reset_link,
                 "expiry_time": "1 hour",  # Token expiry time
             }
 
-            EmailService.send_email(
+            delivery_id = queue_email(
                 to_email=user.email,
                 to_name=user.name,
                 subject="Password Reset Request",
@@ -141,7 +197,10 @@ class ForgotPasswordAPI(Resource):
                 template_data=template_data,
             )
 
-            return {"message": "Password reset link has been sent to your email"}, 200
+            return {
+                "message": "Password reset link has been sent to your email",
+                "delivery_id": delivery_id,
+            }, 200
 
         except Exception as e:
             logger.error(f"Password reset error: {str(e)}")
@@ -169,30 +228,56 @@ class ResetPasswordAPI(Resource):
                 return {"error": "User not found"}, 404
 
             # Update password
-            user.password = generate_password_hash(new_password)
+            user.password = password_hasher.hash(new_password)
             db.session.commit()
 
-            # Send confirmation email
+            # Sessions opened with the old password end here
+            try:
+                token_blocklist.revoke_user(user.id)
+            except RedisError as e:
+                logger.error(f"Could not revoke tokens of user {user.id}: {str(e)}")
+
+            # Queue the confirmation email; the reset stands even if it can't be
             template_data = {
                 "user_name": user.name,
                 "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             }
 
-            EmailService.send_email(
-                to_email=user.email,
-                to_name=user.name,
-                subject="Password Reset Successful",
-                template_name="password_reset_success.html",
-                template_data=template_data,
-            )
-
-            return {"message": "Password reset successful"}, 200
-
+            try:
+                delivery_id = queue_email(
+                    to_email=user.email,
+                    to_name=user.name,
+                    subject="Password Reset Successful",
+                    template_name="password_reset_success.html",
+                    template_data=template_data,
+                )
+            except Exception as e:
+                logger.error(f"Could not queue reset confirmation: {str(e)}")
+                delivery_id = None
+
+            return {
+                "message": "Password reset successful",
+                "delivery_id": delivery_id,
+            }, 200
+
+        except HashingBusy as e:
+            return busy_response(e)
         except Exception as e:
             logger.error(f"Password reset error: {str(e)}")
             return {"error": "Failed to reset password"}, 500
 
 
+class EmailDeliveryApi(Resource):
+    @jwt_required()
+    @role_required("admin")
+    def get(self, delivery_id):
+        """Delivery status of an email queued by the password reset flow"""
+        status = get_delivery_status(delivery_id)
+        if status is None:
+            return {"error": "Unknown or expired delivery id"}, 404
+        return {"delivery_id": delivery_id, **status}, 200
+
+
 def generate_reset_token(user_id):
     """Generate a secure reset token"""
     serializer = URLSafeTimedSerializer(current_app.config["SECRET_KEY"])
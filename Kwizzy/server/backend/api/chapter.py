@@ -1,11 +1,13 @@
 from flask_restful import Resource
-from ..models import Chapter, Subject
+from ..models import Chapter, Subject, Quiz
 from flask_jwt_extended import jwt_required
 from ..utils import role_required
 from flask import request
 from .. import db
 from sqlalchemy import desc
 from time import perf_counter_ns
+from ..services.response_cache import cached_response
+from ..services.analytics import affected_rollup, rebuild_rollup_rows
 
 
 class ChapterApi(Resource):
@@ -26,6 +28,7 @@ class ChapterApi(Resource):
         return [chapter.to_dict() for chapter in chapters]
 
     @jwt_required()
+    @cached_response("chapters", per_user=False)
     def get(self, chapter_id=None):
         try:
             # Get a specific chapter
@@ -178,7 +181,10 @@ class ChapterApi(Resource):
     def delete(self, chapter_id):
         try:
             chapter = Chapter.query.get_or_404(chapter_id)
+            rollup = affected_rollup(Quiz.chapter_id == chapter_id)
             db.session.delete(chapter)
+            db.session.flush()
+            rebuild_rollup_rows(rollup)
             db.session.commit()
 
             return {
@@ -1,146 +1,214 @@
 # api/chart_api.py
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required
-from ..utils import role_required
+from ..utils import role_required, IndianTimeZone
 from ..models import User, QuizResult, Quiz, Chapter, Subject
-from sqlalchemy import func, desc
+from sqlalchemy import func, select, case
 from datetime import datetime, timedelta
-from .. import db, cache
+from uuid import uuid4
+from .. import db, cache, celery
+import logging
+
+logger = logging.getLogger(__name__)
+
+# The admin dashboard is served from a snapshot kept in the shared cache.
+# It is rebuilt by a beat task, and marked stale whenever a new quiz result
+# arrives; the next dashboard read then queues a background rebuild.
+SNAPSHOT_KEY = "dashboard:snapshot"
+STALE_KEY = "dashboard:stale"
+REFRESH_LOCK_KEY = "dashboard:refreshing"
+# At most one background refresh is queued (or attempted, while the broker
+# is down) per this many seconds
+REFRESH_DEBOUNCE = 30
+
+PERFORMANCE_RANGES = {
+    "excellent (90-100)": (90, 100),
+    "good (70-89)": (70, 89),
+    "average (50-69)": (50, 69),
+    "below_average (0-49)": (0, 49),
+}
 
 
 class ChartDataApi(Resource):
     @jwt_required()
     @role_required("admin")
-    # @cache.memoize(timeout=300)
     def get(self, chart_type=None):
         try:
-            if chart_type == "performance":
-                return self.get_performance_data()
-            elif chart_type == "qualifications":
-                return self.get_qualification_data()
-            elif chart_type == "activity":
-                return self.get_activity_data()
-            elif chart_type == "subjects":
-                return self.get_subject_data()
-            else:
-                return self.get_all_chart_data()
+            snapshot = get_dashboard_snapshot()
+            if chart_type in ("performance", "qualifications", "activity", "subjects"):
+                return snapshot["data"][chart_type]
+            return {
+                **snapshot["data"],
+                "snapshot": {
+                    "version": snapshot["version"],
+                    "generated_at": snapshot["generated_at"],
+                    "stale": snapshot["stale"],
+                },
+            }
         except Exception as e:
             return {"error": str(e)}, 500
 
-    def get_performance_data(self):
-        """Get performance distribution data"""
-        try:
-            performance_ranges = {
-                "excellent (90-100)": (90, 100),
-                "good (70-89)": (70, 89),
-                "average (50-69)": (50, 69),
-                "below_average (0-49)": (0, 49),
-            }
 
-            performance_stats = {}
-            for range_name, (min_score, max_score) in performance_ranges.items():
-                count = (
-                    db.session.query(func.count(func.distinct(User.id)))
-                    .join(QuizResult)
-                    .filter(
-                        User.role == "student",
-                        (
-                            QuizResult.marks_scored * 100 / QuizResult.total_marks
-                        ).between(min_score, max_score),
-                    )
-                    .scalar()
-                )
-                performance_stats[range_name] = count
+def get_performance_data():
+    """Performance distribution, bucketed by a single CASE query"""
+    score = QuizResult.marks_scored * 100 / QuizResult.total_marks
+    buckets = [
+        func.count(func.distinct(case((score.between(low, high), User.id))))
+        for low, high in PERFORMANCE_RANGES.values()
+    ]
+    counts = db.session.execute(
+        select(*buckets)
+        .join(QuizResult, QuizResult.user_id == User.id)
+        .where(User.role == "student")
+    ).one()
 
-            return {
-                "labels": list(performance_ranges.keys()),
-                "data": list(performance_stats.values()),
-            }
-        except Exception as e:
-            return {"error": str(e)}, 500
+    return {
+        "labels": list(PERFORMANCE_RANGES.keys()),
+        "data": list(counts),
+    }
 
-    def get_qualification_data(self):
-        """Get qualification distribution data"""
-        try:
-            qualification_stats = (
-                db.session.query(User.qualification, func.count(User.id).label("count"))
-                .filter(User.role == "student")
-                .group_by(User.qualification)
-                .all()
-            )
 
-            return {
-                "labels": [stat[0] for stat in qualification_stats],
-                "data": [stat[1] for stat in qualification_stats],
-            }
-        except Exception as e:
-            return {"error": str(e)}, 500
+def get_qualification_data():
+    """Qualification distribution data"""
+    qualification_stats = (
+        db.session.query(User.qualification, func.count(User.id).label("count"))
+        .filter(User.role == "student")
+        .group_by(User.qualification)
+        .all()
+    )
 
-    def get_activity_data(self):
-        """Get student activity data"""
-        try:
-            total_students = User.query.filter_by(role="student").count()
-
-            active_students = (
-                User.query.join(QuizResult)
-                .filter(
-                    User.role == "student",
-                    QuizResult.completed_at >= (datetime.now() - timedelta(days=30)),
-                )
-                .distinct()
-                .count()
-            )
+    return {
+        "labels": [stat[0] for stat in qualification_stats],
+        "data": [stat[1] for stat in qualification_stats],
+    }
 
-            return {
+
+def get_catalogue_counts():
+    """Student, active student and catalogue totals in one query"""
+    active_students = (
+        select(func.count(func.distinct(QuizResult.user_id)))
+        .join(User, User.id == QuizResult.user_id)
+        .where(
+            User.role == "student",
+            QuizResult.completed_at >= (datetime.now() - timedelta(days=30)),
+        )
+        .scalar_subquery()
+    )
+    return db.session.execute(
+        select(
+            select(func.count(User.id))
+            .where(User.role == "student")
+            .scalar_subquery()
+            .label("total_students"),
+            active_students.label("active_students"),
+            select(func.count(Subject.id)).scalar_subquery().label("total_subjects"),
+            select(func.count(Chapter.id)).scalar_subquery().label("total_chapters"),
+            select(func.count(Quiz.id)).scalar_subquery().label("total_quizzes"),
+        )
+    ).one()
+
+
+def get_subject_data(counts):
+    """Subject-wise performance data"""
+    subject_stats = (
+        db.session.query(
+            Subject.name,
+            func.avg((QuizResult.marks_scored * 100.0) / QuizResult.total_marks).label(
+                "avg_score"
+            ),
+            func.count(func.distinct(QuizResult.user_id)).label("student_count"),
+        )
+        .join(Quiz, Quiz.id == QuizResult.quiz_id)
+        .join(Chapter, Chapter.id == Quiz.chapter_id)
+        .join(Subject, Subject.id == Chapter.subject_id)
+        .group_by(Subject.name)
+        .all()
+    )
+
+    return {
+        "labels": [stat[0] for stat in subject_stats],
+        "averageScores": [float(stat[1] or 0) for stat in subject_stats],
+        "studentCounts": [stat[2] for stat in subject_stats],
+        "totalSubjects": counts.total_subjects,
+        "totalChapters": counts.total_chapters,
+        "totalQuizzes": counts.total_quizzes,
+    }
+
+
+def compute_dashboard_snapshot():
+    """Recompute every admin chart aggregate in one pass"""
+    counts = get_catalogue_counts()
+    return {
+        "version": uuid4().hex[:16],
+        "generated_at": IndianTimeZone().strftime("%Y-%m-%d %H:%M:%S"),
+        "data": {
+            "performance": get_performance_data(),
+            "qualifications": get_qualification_data(),
+            "activity": {
                 "labels": ["Active", "Inactive"],
-                "data": [active_students, total_students - active_students],
-            }
-        except Exception as e:
-            return {"error": str(e)}, 500
+                "data": [
+                    counts.active_students,
+                    counts.total_students - counts.active_students,
+                ],
+            },
+            "subjects": get_subject_data(counts),
+        },
+    }
 
-    def get_subject_data(self):
-        """Get subject-wise performance data"""
-        try:
-            subject_stats = (
-                db.session.query(
-                    Subject.name,
-                    func.avg(
-                        (QuizResult.marks_scored * 100.0) / QuizResult.total_marks
-                    ).label("avg_score"),
-                    func.count(func.distinct(QuizResult.user_id)).label(
-                        "student_count"
-                    ),
-                )
-                .join(Quiz, Quiz.id == QuizResult.quiz_id)
-                .join(Chapter, Chapter.id == Quiz.chapter_id)
-                .join(Subject, Subject.id == Chapter.subject_id)
-                .group_by(Subject.name)
-                .all()
-            )
-            total_subjects = Subject.query.count()
-            total_chapters = Chapter.query.count()
-            total_quizzes = Quiz.query.count()
 
-            return {
-                "labels": [stat[0] for stat in subject_stats],
-                "averageScores": [float(stat[1] or 0) for stat in subject_stats],
-                "studentCounts": [stat[2] for stat in subject_stats],
-                "totalSubjects": total_subjects,
-                "totalChapters": total_chapters,
-                "totalQuizzes": total_quizzes,
-            }
-        except Exception as e:
-            return {"error": str(e)}, 500
+def store_dashboard_snapshot():
+    # Clear the flag first: results written while we compute mark it again
+    cache.delete(STALE_KEY)
+    snapshot = compute_dashboard_snapshot()
+    cache.set(SNAPSHOT_KEY, snapshot, timeout=0)
+    return snapshot
+
+
+def get_dashboard_snapshot():
+    """
+    Serve the stored snapshot right away, even when it is stale, and queue
+    a background refresh if it is. Only a missing snapshot is built inline.
+    """
+    snapshot = cache.get(SNAPSHOT_KEY)
+    if snapshot is None:
+        return {**store_dashboard_snapshot(), "stale": False}
+
+    stale = bool(cache.get(STALE_KEY))
+    if stale:
+        schedule_dashboard_refresh()
+    return {**snapshot, "stale": stale}
+
+
+def schedule_dashboard_refresh():
+    """Queue a snapshot rebuild unless one was queued moments ago"""
+    if not cache.add(REFRESH_LOCK_KEY, True, timeout=REFRESH_DEBOUNCE):
+        return
+    try:
+        # Give up quickly while the broker is unreachable (as queue_email);
+        # the lock stays until the debounce expires, so requests in the
+        # meantime do not try again, and the beat task still runs
+        refresh_dashboard_snapshot.apply_async(
+            retry_policy={"max_retries": 2, "interval_start": 0, "interval_step": 0.2}
+        )
+    except Exception as e:
+        logger.error(f"Could not queue dashboard refresh: {str(e)}")
+
+
+def mark_dashboard_stale():
+    """Call after committing a new quiz result"""
+    # Only flag the snapshot: submissions never wait on the broker
+    cache.set(STALE_KEY, True, timeout=0)
 
-    def get_all_chart_data(self):
-        """Get all chart data in one request"""
-        try:
-            return {
-                "performance": self.get_performance_data(),
-                "qualifications": self.get_qualification_data(),
-                "activity": self.get_activity_data(),
-                "subjects": self.get_subject_data(),
-            }
-        except Exception as e:
-            return {"error": str(e)}, 500
 
+# The snapshot lives in the cache; skipping the result backend keeps
+# apply_async from waiting on it when Redis is unreachable
+@celery.task(ignore_result=True)
+def refresh_dashboard_snapshot():
+    """Rebuild the admin dashboard snapshot"""
+    try:
+        snapshot = store_dashboard_snapshot()
+        logger.info(f"Dashboard snapshot {snapshot['version']} refreshed")
+        return {"status": "success", "version": snapshot["version"]}
+    except Exception as e:
+        logger.error(f"Error refreshing dashboard snapshot: {str(e)}")
+        return {"status": "error", "message": str(e)}
@@ -6,9 +6,11 @@ from .. import db, celery
 from flask import current_app, url_for, request
 import csv
 import os
-from datetime import datetime
+from datetime import datetime, date
+from sqlalchemy import select, func
 import logging
 from ..tasks.celery_tasks import send_export_notification
+from ..services.serializers import quiz_result_summary_options
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +20,9 @@ relative_path = os.getenv("UPLOAD_FOLDER").lstrip("./")
 CSV_FOLDER = os.path.join(app_root, relative_path, "csv")
 os.makedirs(CSV_FOLDER, exist_ok=True)
 
+# Rows fetched per round trip when streaming large exports
+EXPORT_BATCH_SIZE = 1000
+
 
 class UserQuizExportAPI(Resource):
     def __init__(self):
@@ -117,9 +122,7 @@ def generate_user_quiz_export(user_id):
 
         # Get user's quiz results
         results = (
-            QuizResult.query.join(Quiz)
-            .join(Chapter)
-            .join(Subject)
+            QuizResult.query.options(*quiz_result_summary_options(with_subject=True))
             .filter(QuizResult.user_id == user_id)
             .order_by(QuizResult.completed_at.desc())
             .all()
@@ -201,66 +204,9 @@ def generate_admin_quiz_export(admin_id):
         filename = f"admin_export_{timestamp}.csv"
         filepath = os.path.join(CSV_FOLDER, filename)
 
-        # Get all students
-        students = User.query.filter_by(role="student").all()
-
         # Write to CSV file
         with open(filepath, "w", newline="") as csvfile:
-            writer = csv.writer(csvfile)
-
-            # Write headers
-            writer.writerow(
-                [
-                    "S.No",
-                    "Name",
-                    "Email",
-                    "Total Quizzes",
-                    "Average Score (%)",
-                    "Best Score (%)",
-                    "Last Quiz Date",
-                    "Active Streak (days)",
-                    "Subjects Attempted",
-                    "Performance Level",
-                ]
-            )
-            index = 1
-            # Write data for each student
-            for student in students:
-
-                quiz_results = QuizResult.query.filter_by(user_id=student.id).all()
-
-                if quiz_results:
-                    total_quizzes = len(quiz_results)
-                    avg_score = (
-                        sum(
-                            (r.marks_scored / r.total_marks) * 100 for r in quiz_results
-                        )
-                        / total_quizzes
-                    )
-                    best_score = max(
-                        (r.marks_scored / r.total_marks) * 100 for r in quiz_results
-                    )
-                    last_quiz_date = max(r.completed_at for r in quiz_results)
-
-                    streak = calculate_streak(quiz_results)
-                    subjects = len(set(r.quiz.chapter.subject_id for r in quiz_results))
-                    performance_level = get_performance_level(avg_score)
-
-                    writer.writerow(
-                        [
-                            index,
-                            student.name,
-                            student.email,
-                            total_quizzes,
-                            f"{avg_score:.2f}",
-                            f"{best_score:.2f}",
-                            last_quiz_date.strftime("%Y-%m-%d"),
-                            streak,
-                            subjects,
-                            performance_level,
-                        ]
-                    )
-                    index += 1
+            write_admin_export(csvfile)
 
         # Generate download URL
         base_url = os.getenv("BASE_URL", "http://localhost:5000")
@@ -279,6 +225,125 @@ def generate_admin_quiz_export(admin_id):
         return {"status": "error", "message": str(e)}
 
 
+def write_admin_export(csvfile):
+    """Stream the per-student summary of all quiz activity into a CSV file"""
+    writer = csv.writer(csvfile)
+
+    # Write headers
+    writer.writerow(
+        [
+            "S.No",
+            "Name",
+            "Email",
+            "Total Quizzes",
+            "Average Score (%)",
+            "Best Score (%)",
+            "Last Quiz Date",
+            "Active Streak (days)",
+            "Subjects Attempted",
+            "Performance Level",
+        ]
+    )
+
+    streaks = iter_student_streaks()
+    streak_user_id, streak = next(streaks, (None, 0))
+
+    for index, row in enumerate(iter_student_summaries(), 1):
+        (
+            user_id,
+            name,
+            email,
+            total_quizzes,
+            avg_score,
+            best_score,
+            last_quiz_date,
+            subjects,
+        ) = row
+
+        # Both streams are ordered by user id, so the streak of this
+        # student is the next one (or further along) in the streak stream
+        while streak_user_id is not None and streak_user_id < user_id:
+            streak_user_id, streak = next(streaks, (None, 0))
+
+        avg_score = float(avg_score or 0)
+        writer.writerow(
+            [
+                index,
+                name,
+                email,
+                total_quizzes,
+                f"{avg_score:.2f}",
+                f"{float(best_score or 0):.2f}",
+                last_quiz_date.strftime("%Y-%m-%d"),
+                streak if streak_user_id == user_id else 0,
+                subjects,
+                get_performance_level(avg_score),
+            ]
+        )
+
+
+def iter_student_summaries(batch_size=EXPORT_BATCH_SIZE):
+    """
+    Aggregate every student's results in one grouped query, streamed in
+    batches: attempts, average and best score, last date and subjects.
+    """
+    score = QuizResult.marks_scored * 100.0 / QuizResult.total_marks
+    statement = (
+        select(
+            User.id,
+            User.name,
+            User.email,
+            func.count(QuizResult.id),
+            func.avg(score),
+            func.max(score),
+            func.max(QuizResult.completed_at),
+            func.count(func.distinct(Chapter.subject_id)),
+        )
+        .join(QuizResult, QuizResult.user_id == User.id)
+        .join(Quiz, Quiz.id == QuizResult.quiz_id)
+        .join(Chapter, Chapter.id == Quiz.chapter_id)
+        .where(User.role == "student")
+        .group_by(User.id, User.name, User.email)
+        .order_by(User.id)
+        .execution_options(yield_per=batch_size)
+    )
+    return db.session.execute(statement)
+
+
+def iter_student_streaks(batch_size=EXPORT_BATCH_SIZE):
+    """Yield (user_id, current streak) for every student, in user id order"""
+    day = func.date(QuizResult.completed_at)
+    statement = (
+        select(QuizResult.user_id, day)
+        .join(User, User.id == QuizResult.user_id)
+        .where(User.role == "student")
+        .distinct()
+        .order_by(QuizResult.user_id, day.desc())
+        .execution_options(yield_per=batch_size)
+    )
+
+    current_user_id = None
+    streak = 0
+    previous_day = None
+    counting = False
+    for user_id, quiz_day in db.session.execute(statement):
+        if isinstance(quiz_day, str):
+            quiz_day = date.fromisoformat(quiz_day)
+
+        if user_id != current_user_id:
+            if current_user_id is not None:
+                yield current_user_id, streak
+            current_user_id, streak, counting = user_id, 1, True
+        elif counting and (previous_day - quiz_day).days == 1:
+            streak += 1
+        else:
+            counting = False
+        previous_day = quiz_day
+
+    if current_user_id is not None:
+        yield current_user_id, streak
+
+
 # Helper functions
 def get_remarks(score):
     """Generate remarks based on score"""
@@ -292,23 +357,6 @@ def get_remarks(score):
         return "Needs improvement"
 
 
-def calculate_streak(quiz_results):
-    """Calculate current streak of consecutive days with quizzes"""
-    if not quiz_results:
-        return 0
-
-    dates = sorted(set(r.completed_at.date() for r in quiz_results), reverse=True)
-
-    streak = 1
-    for i in range(len(dates) - 1):
-        if (dates[i] - dates[i + 1]).days == 1:
-            streak += 1
-        else:
-            break
-
-    return streak
-
-
 def get_performance_level(avg_score):
     """Determine performance level based on average score"""
     if avg_score >= 90:
@@ -0,0 +1,24 @@
+from flask_restful import Resource
+from flask_jwt_extended import jwt_required
+from ..utils import role_required
+from ..services.answer_keys import answer_keys
+from ..services.response_cache import response_cache_stats
+from ..services.quiz_delivery import delivery_stats
+from ..services.password_hashing import password_hasher
+from ..services.token_blocklist import token_blocklist
+from ..services.rate_limit import rate_limiter
+
+
+class MetricsApi(Resource):
+    @jwt_required()
+    @role_required("admin")
+    def get(self):
+        """Expose in-process cache and pool counters of this worker"""
+        return {
+            "answer_keys": answer_keys.stats(),
+            "response_cache": response_cache_stats.stats(),
+            "quiz_delivery": delivery_stats.stats(),
+            "password_hashing": password_hasher.stats(),
+            "token_blocklist": token_blocklist.stats(),
+            "rate_limits": rate_limiter.stats(),
+        }, 200
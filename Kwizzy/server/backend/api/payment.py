@@ -1,19 +1,34 @@
 from flask_restful import Resource
-from ..models import PaymentHistory
+from ..models import PaymentHistory, User, Quiz
 from flask_jwt_extended import jwt_required
-from flask import request, send_file, current_app
+from flask import request, Response, stream_with_context
 from .. import db
+from ..utils import format_ist_datetime
+from ..services.pagination import (
+    InvalidCursor,
+    get_page_size,
+    get_cursor,
+    paginate_rows,
+    date_range_filters,
+)
+from sqlalchemy import select, func, tuple_
 import csv
-import os
-from uuid import uuid4
+import io
 from datetime import datetime
 
+# Rows fetched and written per chunk of a streamed export
+EXPORT_CHUNK_ROWS = 500
+
 
 class PaymentApi(Resource):
     @jwt_required()
     def post(self):
         try:
             data = request.json
+            if not db.session.get(User, data["user_id"]):
+                return {"error": "User not found"}, 404
+            if not db.session.get(Quiz, data["quiz_id"]):
+                return {"error": "Quiz not found"}, 404
 
             payment = PaymentHistory(
                 user_id=data["user_id"],
@@ -52,121 +67,182 @@ class PaymentApi(Resource):
 class TransactionHistoryAPI(Resource):
     @jwt_required()
     def get(self, user_id=None):
+        """
+        Latest payments first, one keyset page at a time.
+
+        Query parameters: page_size, cursor, status, quiz_id, date_from and
+        date_to (YYYY-MM-DD, inclusive). The first page also carries a
+        summary of all payments matching the filters.
+        """
         try:
-            if not user_id:
-                payments = PaymentHistory.query.all()
-                return {"payments": [payment.to_dict() for payment in payments]}, 200
-            payments = PaymentHistory.query.filter_by(user_id=user_id).all()
-            return {"payments": [payment.to_dict() for payment in payments]}, 200
+            page_size = get_page_size()
+            cursor = get_cursor(datetime, int)
+            filters = self.get_filters(user_id)
+
+            statement = payment_rows().where(*filters)
+            if cursor:
+                statement = statement.where(
+                    tuple_(PaymentHistory.created_at, PaymentHistory.id)
+                    < tuple_(*cursor)
+                )
+            rows = db.session.execute(
+                statement.order_by(
+                    PaymentHistory.created_at.desc(), PaymentHistory.id.desc()
+                ).limit(page_size + 1)
+            )
+            page, next_cursor = paginate_rows(
+                rows, page_size, lambda row: (row.created_at, row.id)
+            )
+
+            response = {
+                "payments": [serialize_payment(row) for row in page],
+                "next_cursor": next_cursor,
+                "page_size": page_size,
+            }
+            if not cursor:
+                response["summary"] = self.get_summary(filters)
+            return response, 200
+
+        except (InvalidCursor, ValueError) as e:
+            return {"error": f"Invalid query parameters: {str(e)}"}, 400
         except Exception as e:
             print("Error:", str(e))
             return {"error": str(e)}, 500
 
+    def get_filters(self, user_id=None):
+        """Translate the query string into filters on PaymentHistory"""
+        filters = []
+        if user_id:
+            filters.append(PaymentHistory.user_id == user_id)
+
+        status = request.args.get("status")
+        if status:
+            filters.append(PaymentHistory.status == status)
+
+        quiz_id = request.args.get("quiz_id", type=int)
+        if quiz_id:
+            filters.append(PaymentHistory.quiz_id == quiz_id)
+
+        filters.extend(date_range_filters(PaymentHistory.created_at))
+        return filters
+
+    def get_summary(self, filters):
+        """Totals of every payment matching the filters, grouped by status"""
+        by_status = db.session.execute(
+            select(
+                PaymentHistory.status,
+                func.count(PaymentHistory.id),
+                func.coalesce(func.sum(PaymentHistory.amount), 0),
+            )
+            .where(*filters)
+            .group_by(PaymentHistory.status)
+        ).all()
+
+        return {
+            "total_payments": sum(count for _, count, _ in by_status),
+            "total_amount": sum(amount for _, _, amount in by_status),
+            "by_status": {
+                status: {"count": count, "amount": amount}
+                for status, count, amount in by_status
+            },
+        }
+
 
 class TransactionExportAPI(Resource):
     @jwt_required()
     def get(self, student_id=None):
-        if student_id:
-            try:
-                # Create filename with timestamp
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = (
-                    f"transactions_{student_id}_{timestamp}_{uuid4().hex[:8]}.csv"
-                )
+        """Stream the transaction ledger as CSV while it is being read"""
+        try:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            if student_id:
+                filename = f"transactions_{student_id}_{timestamp}.csv"
+            else:
+                filename = f"transactions_{timestamp}.csv"
+
+            return Response(
+                stream_with_context(generate_transactions_csv(student_id)),
+                mimetype="text/csv",
+                headers={
+                    "Content-Disposition": f"attachment; filename={filename}",
+                    "X-Accel-Buffering": "no",
+                },
+            )
 
-                # Create filepath
-                csv_folder = os.path.join(current_app.config["UPLOAD_FOLDER"], "csv")
-                os.makedirs(csv_folder, exist_ok=True)
-                filepath = os.path.join(csv_folder, filename)
-
-                # Get transactions
-                transactions = PaymentHistory.query.filter_by(user_id=student_id).all()
-                # use to_dict() method to get the data in the required format
-                transactions = [payment.to_dict() for payment in transactions]
-                print(transactions)
-
-                # Write to CSV
-                with open(filepath, "w", newline="") as file:
-                    writer = csv.writer(file)
-                    writer.writerow(
-                        [
-                            "S.No",
-                            "Transaction ID",
-                            "Quiz Name",
-                            "Amount in Rs.",
-                            "Payment Date",
-                        ]
-                    )
-
-                    for index, transaction in enumerate(transactions, 1):
-                        writer.writerow(
-                            [
-                                index,
-                                transaction["transaction_id"],
-                                transaction["quiz"],
-                                transaction["amount"],
-                                transaction["created_at"],
-                            ]
-                        )
-
-                return send_file(
-                    filepath,
-                    as_attachment=True,
-                    download_name=filename,
-                    mimetype="text/csv",
-                )
+        except Exception as e:
+            print(f"Error exporting transactions: {str(e)}")
+            return {"error": str(e)}, 500
 
-            except Exception as e:
-                print(f"Error exporting transactions: {str(e)}")
-                return {"error": str(e)}, 500
-
-        else:
-            try:
-                # Create filename with timestamp
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"transactions_{timestamp}_{uuid4().hex[:8]}.csv"
-
-                # Create filepath
-                csv_folder = os.path.join(current_app.config["UPLOAD_FOLDER"], "csv")
-                os.makedirs(csv_folder, exist_ok=True)
-                filepath = os.path.join(csv_folder, filename)
-
-                # Get transactions
-                transactions = PaymentHistory.query.all()
-                # use to_dict() method to get the data in the required format
-                transactions = [payment.to_dict() for payment in transactions]
-
-                # Write to CSV
-                with open(filepath, "w", newline="") as file:
-                    writer = csv.writer(file)
-                    writer.writerow(
-                        [
-                            "S.No",
-                            "Transaction ID",
-                            "Quiz Name",
-                            "Amount in Rs.",
-                            "Payment Date",
-                        ]
-                    )
-
-                    for index, transaction in enumerate(transactions, 1):
-                        writer.writerow(
-                            [
-                                index,
-                                transaction["transaction_id"],
-                                transaction["quiz"],
-                                transaction["amount"],
-                                transaction["created_at"],
-                            ]
-                        )
-
-                return send_file(
-                    filepath,
-                    as_attachment=True,
-                    download_name=filename,
-                    mimetype="text/csv",
-                )
 
-            except Exception as e:
-                print(f"Error exporting transactions: {str(e)}")
-                return {"error": str(e)}, 500
+def payment_rows():
+    """Payments joined once with the names of their user and quiz"""
+    return (
+        select(
+            PaymentHistory.id,
+            User.name.label("user"),
+            Quiz.name.label("quiz"),
+            PaymentHistory.transaction_id,
+            PaymentHistory.amount,
+            PaymentHistory.status,
+            PaymentHistory.created_at,
+        )
+        .join(User, User.id == PaymentHistory.user_id)
+        .join(Quiz, Quiz.id == PaymentHistory.quiz_id)
+    )
+
+
+def serialize_payment(row):
+    """Same shape as PaymentHistory.to_dict, from a payment_rows() row"""
+    return {
+        "id": row.id,
+        "user": row.user,
+        "quiz": row.quiz,
+        "transaction_id": row.transaction_id,
+        "amount": row.amount,
+        "status": row.status,
+        "created_at": format_ist_datetime(row.created_at),
+    }
+
+
+def generate_transactions_csv(student_id=None):
+    """Yield the transactions CSV in chunks of EXPORT_CHUNK_ROWS rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
+
+    # Send the header before touching the database so the first byte
+    # reaches the client immediately
+    writer.writerow(
+        [
+            "S.No",
+            "Transaction ID",
+            "Quiz Name",
+            "Amount in Rs.",
+            "Payment Date",
+        ]
+    )
+    yield flush()
+
+    statement = payment_rows().order_by(PaymentHistory.id)
+    if student_id:
+        statement = statement.where(PaymentHistory.user_id == student_id)
+    rows = db.session.execute(statement.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+
+    for index, row in enumerate(rows, 1):
+        writer.writerow(
+            [
+                index,
+                row.transaction_id,
+                row.quiz,
+                row.amount,
+                format_ist_datetime(row.created_at),
+            ]
+        )
+        if index % EXPORT_CHUNK_ROWS == 0:
+            yield flush()
+
+    yield flush()
@@ -1,128 +1,142 @@
 from flask_restful import Resource
-from ..models import Quiz, Chapter, Question, Option
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from ..utils import role_required
+from ..models import Quiz, Chapter, Question, Option, QuizResult
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
+from ..utils import role_required, format_duration
 from flask import request
+from sqlalchemy import select, func
+from time import perf_counter
 from .. import db
+from ..services.answer_keys import answer_keys
+from ..services.analytics import affected_rollup, rebuild_rollup_rows
+from ..services.versions import get_version
+from ..services.response_cache import (
+    cached_response,
+    invalidate_tags,
+    not_modified,
+)
+from ..services.quiz_editor import InvalidQuizDocument, diff_quiz
+from ..services.quiz_delivery import (
+    QuizNotFound,
+    get_quiz_payload,
+    quiz_etag,
+    quiz_response,
+)
+from ..services.pagination import (
+    InvalidCursor,
+    get_page_size,
+    get_cursor,
+    paginate_rows,
+)
+
+
+def quiz_list_page(filters, limit):
+    """
+    One page of quizzes ordered by id, with question counts grouped over
+    just the quizzes of that page.
+    """
+    page = (
+        select(
+            Quiz.id,
+            Quiz.name,
+            Quiz.description,
+            Quiz.price,
+            Quiz.chapter_id,
+            Quiz.time_duration,
+            Quiz.one_attempt_only,
+            Quiz.deadline,
+        )
+        .where(*filters)
+        .order_by(Quiz.id)
+        .limit(limit)
+        .subquery()
+    )
+    question_counts = (
+        select(Question.quiz_id, func.count(Question.id).label("question_count"))
+        .where(Question.quiz_id.in_(select(page.c.id)))
+        .group_by(Question.quiz_id)
+        .subquery()
+    )
+    return (
+        select(
+            page,
+            func.coalesce(question_counts.c.question_count, 0).label("question_count"),
+        )
+        .outerjoin(question_counts, question_counts.c.quiz_id == page.c.id)
+        .order_by(page.c.id)
+    )
+
+
+def serialize_quiz_row(row):
+    return {
+        "id": row.id,
+        "name": row.name,
+        "description": row.description,
+        "price": row.price,
+        "chapter_id": row.chapter_id,
+        "time_duration": format_duration(row.time_duration),
+        "one_attempt_only": row.one_attempt_only,
+        "deadline": (row.deadline.strftime("%d-%m-%Y %H:%M") if row.deadline else None),
+        "question_count": row.question_count,
+    }
 
 
 class QuizApi(Resource):
     @jwt_required()
     def get(self, quiz_id=None, chapter_id=None):
+        if quiz_id:
+            return self.get_quiz(quiz_id)
+        return self.list_quizzes(chapter_id=chapter_id)
+
+    def get_quiz(self, quiz_id):
+        """Serve a quiz from its pre-serialized payload"""
         try:
-            # Get specific quiz
-            if quiz_id:
-                user_id = get_jwt_identity()
-                quiz = Quiz.query.get_or_404(quiz_id)
-                has_attempted = quiz.has_attempted(user_id)
-
-                time_in_seconds = quiz.time_duration
-                hours = time_in_seconds // 3600
-                minutes = (time_in_seconds % 3600) // 60
-                formatted_time = f"{hours:02d}:{minutes:02d}"
-                return {
-                    "id": quiz.id,
-                    "name": quiz.name,
-                    "description": quiz.description,
-                    "price": quiz.price,
-                    "chapter_id": quiz.chapter_id,
-                    "time_duration": formatted_time,
-                    "one_attempt_only": quiz.one_attempt_only,
-                    "has_attempted": has_attempted,
-                    "deadline": (
-                        quiz.deadline.strftime("%d-%m-%Y %H:%M")
-                        if quiz.deadline
-                        else None
-                    ),
-                    "questions": [
-                        {
-                            "id": q.id,
-                            "title": q.title,
-                            "text": q.text,
-                            "options": [
-                                {
-                                    "id": opt.id,
-                                    "text": opt.text,
-                                    "is_correct": (
-                                        opt.is_correct
-                                        if request.args.get("include_answers") == "true"
-                                        else None
-                                    ),
-                                }
-                                for opt in q.options
-                            ],
-                        }
-                        for q in quiz.questions
-                    ],
-                }, 200
-
-            if chapter_id:
-                # Get all quizzes in a chapter
-                quizzes = Quiz.query.filter(Quiz.chapter_id == chapter_id).all()
-                for quiz in quizzes:
-                    time_in_seconds = quiz.time_duration
-                    hours = time_in_seconds // 3600
-                    minutes = (time_in_seconds % 3600) // 60
-                    formatted_time = f"{hours:02d}:{minutes:02d}"
-                    quiz.time_duration = formatted_time
+            include_answers = (
+                request.args.get("include_answers") == "true"
+                and get_jwt().get("role") == "admin"
+            )
+            version = get_version("quiz", quiz_id)
+            has_attempted = db.session.query(
+                QuizResult.query.filter_by(
+                    user_id=get_jwt_identity(), quiz_id=quiz_id
+                ).exists()
+            ).scalar()
+
+            etag = quiz_etag(quiz_id, version, include_answers, has_attempted)
+            response = not_modified(etag)
+            if response is not None:
+                return response
+
+            payload = get_quiz_payload(quiz_id, version, include_answers)
+            return quiz_response(payload, has_attempted, etag)
+
+        except QuizNotFound:
+            return {"message": "Quiz not found"}, 404
+        except Exception as e:
+            print("Error:", str(e))
+            return {"message": "Error fetching quiz", "error": str(e)}, 500
 
-                return {
-                    "quizzes": [
-                        {
-                            "id": quiz.id,
-                            "name": quiz.name,
-                            "description": quiz.description,
-                            "price": quiz.price,
-                            "chapter_id": quiz.chapter_id,
-                            "time_duration": quiz.time_duration,
-                            "one_attempt_only": quiz.one_attempt_only,
-                            "deadline": (
-                                quiz.deadline.strftime("%d-%m-%Y %H:%M")
-                                if quiz.deadline
-                                else None
-                            ),
-                            "question_count": len(quiz.questions),
-                        }
-                        for quiz in quizzes
-                    ]
-                }, 200
-            # Get all quizzes with filters
-            chapter_id = request.args.get("chapter_id")
-
-            query = Quiz.query
-
-            if chapter_id:
-                query = query.filter(Quiz.chapter_id == chapter_id)
-            quizzes = query.all()
-
-            for quiz in quizzes:
-                time_in_seconds = quiz.time_duration
-                hours = time_in_seconds // 3600
-                minutes = (time_in_seconds % 3600) // 60
-                formatted_time = f"{hours:02d}:{minutes:02d}"
-                quiz.time_duration = formatted_time
+    @cached_response("quizzes", per_user=False)
+    def list_quizzes(self, chapter_id=None):
+        try:
+            # List quizzes, optionally of one chapter, a keyset page at a time
+            chapter_id = chapter_id or request.args.get("chapter_id", type=int)
+            page_size = get_page_size()
+            cursor = get_cursor(int)
+
+            filters = [Quiz.chapter_id == chapter_id] if chapter_id else []
+            if cursor:
+                filters.append(Quiz.id > cursor[0])
+            rows = db.session.execute(quiz_list_page(filters, page_size + 1))
+            page, next_cursor = paginate_rows(rows, page_size, lambda row: (row.id,))
 
             return {
-                "quizzes": [
-                    {
-                        "id": quiz.id,
-                        "name": quiz.name,
-                        "description": quiz.description,
-                        "price": quiz.price,
-                        "chapter_id": quiz.chapter_id,
-                        "one_attempt_only": quiz.one_attempt_only,
-                        "deadline": (
-                            quiz.deadline.strftime("%d-%m-%Y %H:%M")
-                            if quiz.deadline
-                            else None
-                        ),
-                        "time_duration": quiz.time_duration,
-                        "question_count": len(quiz.questions),
-                    }
-                    for quiz in quizzes
-                ]
+                "quizzes": [serialize_quiz_row(row) for row in page],
+                "next_cursor": next_cursor,
+                "page_size": page_size,
             }, 200
 
+        except InvalidCursor as e:
+            return {"message": "Invalid cursor", "error": str(e)}, 400
         except Exception as e:
             print("Error:", str(e))
             return {"message": "Error fetching quizzes", "error": str(e)}, 500
@@ -216,103 +230,49 @@ class QuizApi(Resource):
             if not data:
                 return {"message": "No input data provided"}, 400
 
-            db.session.begin_nested()
-
-            # Update basic quiz info
-            if "name" in data:
-                quiz.name = data["name"]
-            if "description" in data:
-                quiz.description = data["description"]
-            if "price" in data:
-                quiz.price = data["price"]
+            # Validate everything and diff the questions before writing
+            changes = {}
+            for field in ("name", "description", "price", "one_attempt_only"):
+                if field in data:
+                    changes[field] = data[field]
             if "deadline" in data:
-                quiz.deadline = Quiz.parse_deadline(data["deadline"])
-            if "one_attempt_only" in data:
-                quiz.one_attempt_only = data["one_attempt_only"]
+                changes["deadline"] = Quiz.parse_deadline(data["deadline"])
             if "time_duration" in data:
                 try:
-                    time_duration = data["time_duration"]
-                    hours, minutes = map(int, time_duration.split(":"))
-                    total_seconds = hours * 3600 + minutes * 60
-                    quiz.time_duration = total_seconds
+                    hours, minutes = map(int, data["time_duration"].split(":"))
+                    changes["time_duration"] = hours * 3600 + minutes * 60
                 except ValueError:
                     return {"message": "Invalid time format"}, 400
             if "chapter_id" in data:
-                if not Chapter.query.get(data["chapter_id"]):
+                if not db.session.get(Chapter, data["chapter_id"]):
                     return {"message": "Chapter not found"}, 404
-                quiz.chapter_id = data["chapter_id"]
+                changes["chapter_id"] = data["chapter_id"]
 
+            diff = None
             if "questions" in data:
-                old_questions = {q.id: q for q in quiz.questions}
-                # Delete all existing questions and their options
-                new_question_ids = {q.get("id") for q in data["questions"] if "id" in q}
-                for q_id, question in old_questions.items():
-                    if q_id not in new_question_ids:
-                        db.session.delete(question)
-                # Update or create questions
-                for q_data in data["questions"]:
-                    if "id" in q_data and q_data["id"] in old_questions:
-                        # Update existing question
-                        question = old_questions[q_data["id"]]
-                        question.title = q_data.get("title")
-                        question.text = q_data["text"]
-
-                        # Update options
-                        existing_options = {opt.id: opt for opt in question.options}
-                        new_option_ids = {
-                            opt.get("id") for opt in q_data["options"] if "id" in opt
-                        }
-
-                        # Delete removed options
-                        for opt_id, option in existing_options.items():
-                            if opt_id not in new_option_ids:
-                                db.session.delete(option)
-
-                        # Update or create options
-                        has_correct = False
-                        for opt_data in q_data["options"]:
-                            if "id" in opt_data and opt_data["id"] in existing_options:
-                                # Update existing option
-                                option = existing_options[opt_data["id"]]
-                                option.text = opt_data["text"]
-                                option.is_correct = opt_data["is_correct"]
-                            else:
-                                # Create new option
-                                option = Option(
-                                    text=opt_data["text"],
-                                    is_correct=opt_data["is_correct"],
-                                    question=question,
-                                )
-                                db.session.add(option)
-                            if option.is_correct:
-                                has_correct = True
-                    else:
-                        # Create new question
-                        question = Question(
-                            title=q_data.get("title"), text=q_data["text"], quiz=quiz
-                        )
-                        db.session.add(question)
-
-                        # Add options for new question
-                        has_correct = False
-                        for opt_data in q_data["options"]:
-                            option = Option(
-                                text=opt_data["text"],
-                                is_correct=opt_data["is_correct"],
-                                question=question,
-                            )
-                            db.session.add(option)
-                            if option.is_correct:
-                                has_correct = True
-
-                    if not has_correct:
-                        db.session.rollback()
-                        return {
-                            "message": f"Question '{question.text}' must have at least one correct option"
-                        }, 400
-
+                try:
+                    diff = diff_quiz(quiz.id, data["questions"])
+                except InvalidQuizDocument as e:
+                    return {"message": str(e)}, 400
+
+            # The write transaction starts here
+            start = perf_counter()
+            for field, value in changes.items():
+                setattr(quiz, field, value)
+            if diff is not None:
+                diff.apply(quiz.id)
             db.session.commit()
-            return {"message": "Quiz updated successfully"}, 200
+            write_ms = round((perf_counter() - start) * 1000, 2)
+
+            answer_keys.invalidate(quiz.id)
+            if diff is not None and diff.changed:
+                # Bulk statements bypass the response cache's session hooks
+                invalidate_tags("quizzes")
+            return {
+                "message": "Quiz updated successfully",
+                "changes": diff.summary() if diff is not None else None,
+                "write_ms": write_ms,
+            }, 200
 
         except Exception as e:
             db.session.rollback()
@@ -324,8 +284,12 @@ class QuizApi(Resource):
     def delete(self, quiz_id):
         try:
             quiz = Quiz.query.get_or_404(quiz_id)
+            rollup = affected_rollup(Quiz.id == quiz_id)
 
             db.session.delete(quiz)
+            db.session.flush()
+            rebuild_rollup_rows(rollup)
+            # The answer_keys session hooks bump the quiz's version on commit
             db.session.commit()
 
             return {"message": "Quiz deleted successfully"}, 200
@@ -0,0 +1,8 @@
+from ..services.bulk_import import ImportApi
+from ..services.quiz_import import QuizImporter
+
+
+class QuizImportApi(ImportApi):
+    """Upload a CSV/JSONL question bank and import it in the background"""
+
+    importer = QuizImporter.name
@@ -4,26 +4,28 @@ from ..models import QuizResult, UserAnswer
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from flask import request
 from .. import db
-from sqlalchemy.orm import joinedload
+from ..services.analytics import record_quiz_result
+from .chart_api import mark_dashboard_stale
+from ..services.serializers import quiz_result_review_options, serialize_quiz_results
 
 
 class QuizResultApi(Resource):
     def get_quiz_result_by_id(self, result_id):
         try:
-            # Use joinedload to load relationships efficiently
             quiz_result = QuizResult.query.options(
-                joinedload(QuizResult.quiz),
-                joinedload(QuizResult.user_answers).joinedload(
-                    UserAnswer.selected_option_rel
-                ),
+                *quiz_result_review_options()
             ).get_or_404(result_id)
-            return quiz_result.to_dict()
+            return serialize_quiz_results([quiz_result])[0]
         except Exception as e:
             return ({"error": f"Error fetching quiz result: {str(e)}"}), 500
 
     def get_user_quiz_results(self, user_id):
-        results = QuizResult.query.filter_by(user_id=user_id).all()
-        return [result.to_dict() for result in results]
+        results = (
+            QuizResult.query.options(*quiz_result_review_options())
+            .filter_by(user_id=user_id)
+            .all()
+        )
+        return serialize_quiz_results(results)
 
     @jwt_required()
     def get(self, result_id=None):
@@ -34,10 +36,12 @@ class QuizResultApi(Resource):
             user_role = claims.get("role")
 
             if result_id:
-                result = QuizResult.query.get_or_404(result_id)
+                result = QuizResult.query.options(
+                    *quiz_result_review_options()
+                ).get_or_404(result_id)
                 # Ensure user and admin can only access the results
                 if result.user_id == user_id or user_role == "admin":
-                    return self.get_quiz_result_by_id(result_id)
+                    return serialize_quiz_results([result])[0]
                 else:
                     return {"message": "Unauthorized to access this resource"}, 403
 
@@ -78,7 +82,9 @@ class QuizResultApi(Resource):
                 )
                 db.session.add(user_answer)
 
+            record_quiz_result(new_result)
             db.session.commit()
+            mark_dashboard_stale()
 
             return {
                 "message": "Quiz result created successfully",
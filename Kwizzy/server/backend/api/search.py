@@ -0,0 +1,57 @@
+from flask_restful import Resource
+from flask_jwt_extended import jwt_required
+from flask import request
+from ..services.search import SEARCH_KINDS, SearchUnavailable, search
+from ..services.pagination import (
+    InvalidCursor,
+    get_page_size,
+    get_cursor,
+    encode_cursor,
+)
+
+# Deep pages of a ranked list are rarely useful and get slower with depth
+MAX_SEARCH_OFFSET = 1000
+
+
+class SearchApi(Resource):
+    @jwt_required()
+    def get(self):
+        """
+        Ranked full-text search over subjects, chapters, quizzes and questions.
+
+        Query parameters: q, type (comma separated kinds), page_size, cursor.
+        """
+        try:
+            query = request.args.get("q", "").strip()
+            if not query:
+                return {"message": "Search query is required"}, 400
+
+            kinds = [kind for kind in request.args.get("type", "").split(",") if kind]
+            unknown = set(kinds) - set(SEARCH_KINDS)
+            if unknown:
+                return {
+                    "message": f"Unknown search type: {', '.join(sorted(unknown))}"
+                }, 400
+
+            page_size = get_page_size(default=20, maximum=50)
+            cursor = get_cursor(int)
+            offset = cursor[0] if cursor else 0
+            if not 0 <= offset <= MAX_SEARCH_OFFSET:
+                raise InvalidCursor("Cursor out of range")
+
+            hits = search(query, kinds, limit=page_size + 1, offset=offset)
+            next_offset = offset + page_size
+            has_more = len(hits) > page_size and next_offset <= MAX_SEARCH_OFFSET
+            return {
+                "results": hits[:page_size],
+                "next_cursor": encode_cursor(next_offset) if has_more else None,
+                "page_size": page_size,
+            }, 200
+
+        except InvalidCursor as e:
+            return {"message": "Invalid cursor", "error": str(e)}, 400
+        except SearchUnavailable as e:
+            return {"message": str(e)}, 501
+        except Exception as e:
+            print("Error:", str(e))
+            return {"message": "Error searching", "error": str(e)}, 500
@@ -1,21 +1,48 @@
 from flask_restful import Resource
 from flask import request
-from flask_caching import Cache
 from flask_jwt_extended import jwt_required
 from ..utils import role_required
-from ..models import User, QuizResult, Quiz, Chapter, Subject
-from sqlalchemy import func, desc
+from ..models import (
+    User,
+    QuizResult,
+    Quiz,
+    Chapter,
+    Subject,
+    StudentDailyStats,
+    UserAnswer,
+)
+from ..services.analytics import get_quiz_stats
+from ..services.serializers import quiz_result_summary_options
+from ..services.student_directory import (
+    SORT_COLUMNS,
+    count_students,
+    find_students,
+)
+from ..services.pagination import (
+    InvalidCursor,
+    get_page_size,
+    get_cursor,
+    paginate_rows,
+    date_range_filters,
+)
+from sqlalchemy import select, func, case, tuple_
 from datetime import datetime, timedelta
 from .. import db
-from .. import cache
+from ..services.response_cache import cached_response
 
 
 class Student(Resource):
-    def to_dict(self, user):
-        """Convert user object to dictionary with relevant student information"""
-        # Calculate quiz statistics
-        total_quizzes = len(user.quiz_results)
-        latest_activity = max([r.completed_at for r in user.quiz_results], default=None)
+    def to_dict(self, user, stats=None):
+        """
+        Convert a user (or a student directory row) to a dictionary with
+        relevant student information. stats carries attempts and
+        last_completed_at; it is read from the analytics rollup when not
+        given. The overall percentage is the one denormalized onto the user.
+        """
+        if stats is None:
+            stats = get_quiz_stats([user.id]).get(user.id)
+        total_quizzes = stats.attempts if stats else 0
+        latest_activity = stats.last_completed_at if stats else None
 
         return {
             "id": user.id,
@@ -31,9 +58,7 @@ class Student(Resource):
                     if latest_activity
                     else None
                 ),
-                "performance_percentage": self.calculate_performance_percentage(
-                    user.quiz_results
-                ),
+                "performance_percentage": user.performance,
             },
         }
 
@@ -41,7 +66,8 @@ class Student(Resource):
         """Get student's recent activity"""
         try:
             recent_results = (
-                QuizResult.query.filter_by(user_id=student_id)
+                QuizResult.query.options(*quiz_result_summary_options())
+                .filter_by(user_id=student_id)
                 .order_by(QuizResult.completed_at.desc())
                 .limit(8)
                 .all()
@@ -69,22 +95,20 @@ class Student(Resource):
     def get_subject_performance(self, student_id):
         """Get subject-wise performance breakdown"""
         try:
+            scored_attempts = func.sum(StudentDailyStats.scored_attempts)
             results = (
                 db.session.query(
                     Subject.name,
-                    func.avg(
-                        (QuizResult.marks_scored * 100.0) / QuizResult.total_marks
+                    (
+                        func.sum(StudentDailyStats.score_sum)
+                        / func.nullif(scored_attempts, 0)
                     ).label("average_score"),
-                    func.count(QuizResult.id).label("total_quizzes"),
-                )
-                .join(Quiz, Quiz.id == QuizResult.quiz_id)
-                .join(Chapter, Chapter.id == Quiz.chapter_id)
-                .join(Subject, Subject.id == Chapter.subject_id)
-                .filter(
-                    QuizResult.user_id == student_id,
-                    QuizResult.marks_scored.isnot(None),
+                    scored_attempts.label("total_quizzes"),
                 )
+                .join(StudentDailyStats, StudentDailyStats.subject_id == Subject.id)
+                .filter(StudentDailyStats.user_id == student_id)
                 .group_by(Subject.name)
+                .having(scored_attempts > 0)
                 .all()
             )
 
@@ -99,58 +123,85 @@ class Student(Resource):
         except Exception as e:
             return {"error": str(e)}
 
-    def calculate_performance_percentage(self, quiz_results):
-        """Calculate overall performance percentage"""
-        total_marks_scored = sum(r.marks_scored or 0 for r in quiz_results)
-        total_possible_marks = sum(r.total_marks or 0 for r in quiz_results)
-
-        if total_possible_marks == 0:
-            return 0
+    def get_detailed_performance(self, student_id, page_size, cursor):
+        """
+        One keyset page of a student's scored attempts, latest first, with
+        answer counts grouped in SQL over just that page's results. Honours
+        the date_from / date_to query parameters.
+        """
+        statement = (
+            select(
+                QuizResult.id,
+                QuizResult.quiz_id,
+                Quiz.name.label("quiz_name"),
+                QuizResult.marks_scored,
+                QuizResult.total_marks,
+                QuizResult.completed_at,
+            )
+            .join(Quiz, Quiz.id == QuizResult.quiz_id)
+            .where(
+                QuizResult.user_id == student_id,
+                QuizResult.marks_scored.isnot(None),  # Only completed quizzes
+                *date_range_filters(QuizResult.completed_at),
+            )
+        )
+        if cursor:
+            statement = statement.where(
+                tuple_(QuizResult.completed_at, QuizResult.id) < tuple_(*cursor)
+            )
+        rows = db.session.execute(
+            statement.order_by(
+                QuizResult.completed_at.desc(), QuizResult.id.desc()
+            ).limit(page_size + 1)
+        )
+        page, next_cursor = paginate_rows(
+            rows, page_size, lambda row: (row.completed_at, row.id)
+        )
 
-        return round((total_marks_scored / total_possible_marks) * 100, 2)
+        answer_counts = {
+            result_id: (total, correct)
+            for result_id, total, correct in db.session.execute(
+                select(
+                    UserAnswer.result_id,
+                    func.count(),
+                    func.coalesce(
+                        func.sum(case((UserAnswer.is_correct, 1), else_=0)), 0
+                    ),
+                )
+                .where(UserAnswer.result_id.in_([row.id for row in page]))
+                .group_by(UserAnswer.result_id)
+            )
+        }
 
-    def get_detailed_performance(self, user):
-        """Get detailed performance breakdown"""
         quiz_details = []
-        for result in user.quiz_results:
-            if result.marks_scored is not None:  # Only include completed quizzes
-                percentage = (
-                    (result.marks_scored / result.total_marks * 100)
-                    if result.total_marks > 0
-                    else 0
-                )
-                quiz_details.append(
-                    {
-                        "quiz_result_id": result.id,
-                        "quiz_id": result.quiz_id,
-                        "quiz_name": result.quiz.name,
-                        "marks_scored": result.marks_scored,
-                        "total_marks": result.total_marks,
-                        "percentage": round(percentage, 2),
-                        "completed_at": result.completed_at.strftime("%Y-%m-%d %H:%M"),
-                        "answers_breakdown": {
-                            "total_questions": len(result.user_answers),
-                            "correct_answers": len(
-                                [a for a in result.user_answers if a.is_correct]
-                            ),
-                            "incorrect_answers": len(
-                                [a for a in result.user_answers if not a.is_correct]
-                            ),
-                        },
-                    }
-                )
+        for row in page:
+            total_questions, correct_answers = answer_counts.get(row.id, (0, 0))
+            percentage = (
+                (row.marks_scored / row.total_marks * 100) if row.total_marks else 0
+            )
+            quiz_details.append(
+                {
+                    "quiz_result_id": row.id,
+                    "quiz_id": row.quiz_id,
+                    "quiz_name": row.quiz_name,
+                    "marks_scored": row.marks_scored,
+                    "total_marks": row.total_marks,
+                    "percentage": round(percentage, 2),
+                    "completed_at": row.completed_at.strftime("%Y-%m-%d %H:%M"),
+                    "answers_breakdown": {
+                        "total_questions": total_questions,
+                        "correct_answers": correct_answers,
+                        "incorrect_answers": total_questions - correct_answers,
+                    },
+                }
+            )
 
-        return quiz_details
+        return quiz_details, next_cursor
 
     @jwt_required()
-    @cache.memoize(timeout=30)
+    @cached_response("students", "student:{student_id}", per_user=False)
     def get(self, student_id=None):
         try:
-            cache_key = f"students_{student_id or 'all'}_{request.args.get('page', 1)}_{request.args.get('per_page', 10)}_{request.args.get('search', '').strip()}_{request.args.get('sort_by', 'name')}_{request.args.get('order', 'asc')}"
-            cached_data = cache.get(cache_key)
-
-            if cached_data:
-                return cached_data, 200
             if not self.validate_pagination_params(
                 request.args.get("page", 1), request.args.get("per_page", 10)
             ):
@@ -160,9 +211,15 @@ class Student(Resource):
                 if not student:
                     return {"message": "Student not found"}, 404
 
+                page_size = get_page_size()
+                details, next_cursor = self.get_detailed_performance(
+                    student.id, page_size, get_cursor(datetime, int)
+                )
                 return {
                     "student_info": self.to_dict(student),
-                    "detailed_performance": self.get_detailed_performance(student),
+                    "detailed_performance": details,
+                    "next_cursor": next_cursor,
+                    "page_size": page_size,
                 }, 200
 
             # Get all students with pagination and filters
@@ -172,59 +229,30 @@ class Student(Resource):
             sort_by = request.args.get("sort_by", "name")
             order = request.args.get("order", "asc")
 
-            query = User.query.filter_by(role="student")
-
-            if search:
-                query = query.filter(
-                    (User.name.ilike(f"%{search}%"))
-                    | (User.email.ilike(f"%{search}%"))
-                    | (User.qualification.ilike(f"%{search}%"))
-                )
-
-            # Apply sorting
-            if sort_by == "performance":
-                # Complex sorting by average performance
-                if order == "desc":
-                    query = query.order_by(
-                        desc(
-                            func.coalesce(
-                                func.avg(
-                                    (QuizResult.marks_scored * 100.0)
-                                    / QuizResult.total_marks
-                                ),
-                                0,
-                            )
-                        )
-                    )
-                else:
-                    query = query.order_by(
-                        func.coalesce(
-                            func.avg(
-                                (QuizResult.marks_scored * 100.0)
-                                / QuizResult.total_marks
-                            ),
-                            0,
-                        )
-                    )
-            else:
-                if order == "desc":
-                    query = query.order_by(desc(getattr(User, sort_by)))
-                else:
-                    query = query.order_by(getattr(User, sort_by))
-
-            pagination = query.paginate(page=page, per_page=per_page)
+            if sort_by not in SORT_COLUMNS:
+                return {"message": f"Cannot sort students by {sort_by}"}, 400
 
+            total = count_students(search)
+            rows = find_students(
+                search,
+                sort_by,
+                order == "desc",
+                per_page,
+                (page - 1) * per_page,
+                total,
+            )
             result = {
-                "students": [self.to_dict(student) for student in pagination.items],
-                "total": pagination.total,
-                "pages": pagination.pages,
+                "students": [self.to_dict(row, stats=row) for row in rows],
+                "total": total,
+                "pages": -(-total // per_page),
                 "current_page": page,
                 "per_page": per_page,
             }
 
-            cache.set(cache_key, result)
             return result, 200
 
+        except (InvalidCursor, ValueError) as e:
+            return {"error": f"Invalid query parameters: {str(e)}"}, 400
         except Exception as e:
             return (None, 500, f"Error fetching students: {str(e)}")
 
@@ -2,10 +2,17 @@
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..utils import role_required
-from ..models import User, QuizResult, Quiz, Chapter, Subject
+from ..models import User, QuizResult, Quiz, Chapter, Subject, StudentDailyStats
 from sqlalchemy import func, desc
 from datetime import datetime, timedelta
 from .. import db, cache
+from ..services.serializers import quiz_result_summary_options
+
+# Averages over the rollup weight every scored attempt equally
+AVERAGE_SCORE = func.sum(StudentDailyStats.score_sum) / func.nullif(
+    func.sum(StudentDailyStats.scored_attempts), 0
+)
+ATTEMPTS = func.sum(StudentDailyStats.attempts)
 
 
 class StudentChartsApi(Resource):
@@ -36,15 +43,11 @@ class StudentChartsApi(Resource):
             subject_stats = (
                 db.session.query(
                     Subject.name,
-                    func.avg(
-                        QuizResult.marks_scored * 100.0 / QuizResult.total_marks
-                    ).label("average_score"),
-                    func.count(QuizResult.id).label("attempts"),
+                    AVERAGE_SCORE.label("average_score"),
+                    ATTEMPTS.label("attempts"),
                 )
-                .join(Chapter, Subject.id == Chapter.subject_id)
-                .join(Quiz, Chapter.id == Quiz.chapter_id)
-                .join(QuizResult, Quiz.id == QuizResult.quiz_id)
-                .filter(QuizResult.user_id == student_id)
+                .join(StudentDailyStats, StudentDailyStats.subject_id == Subject.id)
+                .filter(StudentDailyStats.user_id == student_id)
                 .group_by(Subject.name)
                 .all()
             )
@@ -63,7 +66,7 @@ class StudentChartsApi(Resource):
         """Get last 10 quiz performances"""
         try:
             recent_results = (
-                QuizResult.query.join(Quiz)
+                QuizResult.query.options(*quiz_result_summary_options())
                 .filter(QuizResult.user_id == student_id)
                 .order_by(QuizResult.completed_at.desc())
                 .limit(10)
@@ -94,21 +97,15 @@ class StudentChartsApi(Resource):
             six_months_ago = datetime.now() - timedelta(days=180)
             monthly_stats = (
                 db.session.query(
-                    func.strftime("%Y-%m", QuizResult.completed_at).label("month"),
-                    func.avg(
-                        QuizResult.marks_scored * 100.0 / QuizResult.total_marks
-                    ).label("average_score"),
-                    func.count(QuizResult.id).label("quizzes_taken"),
-                    func.max(
-                        QuizResult.marks_scored * 100.0 / QuizResult.total_marks
-                    ).label("highest_score"),
-                    func.min(
-                        QuizResult.marks_scored * 100.0 / QuizResult.total_marks
-                    ).label("lowest_score"),
+                    func.strftime("%Y-%m", StudentDailyStats.day).label("month"),
+                    AVERAGE_SCORE.label("average_score"),
+                    ATTEMPTS.label("quizzes_taken"),
+                    func.max(StudentDailyStats.score_max).label("highest_score"),
+                    func.min(StudentDailyStats.score_min).label("lowest_score"),
                 )
                 .filter(
-                    QuizResult.user_id == student_id,
-                    QuizResult.completed_at >= six_months_ago,
+                    StudentDailyStats.user_id == student_id,
+                    StudentDailyStats.day >= six_months_ago.date(),
                 )
                 .group_by("month")
                 .order_by("month")
@@ -140,14 +137,14 @@ class StudentChartsApi(Resource):
             one_year_ago = datetime.now() - timedelta(days=365)
             daily_activity = (
                 db.session.query(
-                    func.date(QuizResult.completed_at).label("date"),
-                    func.count(QuizResult.id).label("count"),
+                    StudentDailyStats.day.label("date"),
+                    ATTEMPTS.label("count"),
                 )
                 .filter(
-                    QuizResult.user_id == student_id,
-                    QuizResult.completed_at >= one_year_ago,
+                    StudentDailyStats.user_id == student_id,
+                    StudentDailyStats.day >= one_year_ago.date(),
                 )
-                .group_by("date")
+                .group_by(StudentDailyStats.day)
                 .all()
             )
 
@@ -156,7 +153,7 @@ class StudentChartsApi(Resource):
                 try:
                     heatmap_data.append(
                         {
-                            "date": activity[0],
+                            "date": activity[0].strftime("%Y-%m-%d"),
                             "count": int(activity[1]),
                         }
                     )
@@ -180,17 +177,14 @@ class StudentChartsApi(Resource):
                 db.session.query(
                     Chapter.name,
                     Subject.name.label("subject_name"),
-                    func.avg(
-                        QuizResult.marks_scored * 100.0 / QuizResult.total_marks
-                    ).label("average_score"),
-                    func.count(QuizResult.id).label("attempts"),
+                    AVERAGE_SCORE.label("average_score"),
+                    ATTEMPTS.label("attempts"),
                 )
-                .join(Quiz, Chapter.id == Quiz.chapter_id)
-                .join(QuizResult, Quiz.id == QuizResult.quiz_id)
+                .join(StudentDailyStats, StudentDailyStats.chapter_id == Chapter.id)
                 .join(Subject, Chapter.subject_id == Subject.id)
-                .filter(QuizResult.user_id == student_id)
+                .filter(StudentDailyStats.user_id == student_id)
                 .group_by(Chapter.name, Subject.name)
-                .having(func.count(QuizResult.id) >= 1)
+                .having(ATTEMPTS >= 1)
                 .all()
             )
 
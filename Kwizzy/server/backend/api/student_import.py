@@ -0,0 +1,8 @@
+from ..services.bulk_import import ImportApi
+from ..services.student_import import StudentImporter
+
+
+class StudentImportApi(ImportApi):
+    """Upload a CSV/JSONL student roster and provision it in the background"""
+
+    importer = StudentImporter.name
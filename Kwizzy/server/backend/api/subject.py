@@ -2,14 +2,15 @@ from flask_restful import Resource
 from ..models import Subject, Chapter
 from flask_jwt_extended import jwt_required
 from ..utils import role_required, allowed_file
-from flask import request
+from flask import request, abort
 from .. import db
 import os
 from flask import current_app as app
 from werkzeug.utils import secure_filename
 from sqlalchemy import or_
-from .. import cache
 from time import perf_counter_ns
+from ..services.response_cache import cached_response
+from ..services.analytics import affected_rollup, rebuild_rollup_rows
 
 # create an image folder if it doesn't exists
 app_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -20,33 +21,39 @@ os.makedirs(IMAGE_FOLDER, exist_ok=True)
 
 class SubjectApi(Resource):
 
-    def __init__(self):
-        self.cache_timeout = 30
+    def get_subject_catalogue(self, *filters):
+        """Serialize subjects with their stats, all from a single query"""
+        rows = db.session.execute(
+            Subject.with_stats().where(*filters).order_by(Subject.id)
+        )
+        return [row[0].to_dict(stats=tuple(row)[1:]) for row in rows]
 
     def get_all_subjects(self):
         start = perf_counter_ns()
-        subject_list = Subject.query.all()
+        subject_list = self.get_subject_catalogue()
         end = perf_counter_ns()
         print(f"Time taken to fetch subjects: {(end - start) / 1_000_000} ms")
-        return [subject.to_dict() for subject in subject_list]
+        return subject_list
 
-    @cache.memoize(timeout=30)
     def get_subject_by_id(self, subject_id):
-        subject = Subject.query.get_or_404(subject_id)
-        return subject.to_dict()
+        subjects = self.get_subject_catalogue(Subject.id == subject_id)
+        if not subjects:
+            abort(404)
+        return subjects[0]
 
-    @cache.memoize(timeout=30)
     def search_subjects(self, search_query):
-        """Cached method to search subjects"""
-        subjects = Subject.query.filter(
+        """Search subjects by name or description"""
+        # Substring matches over every subject, as the catalogue always has;
+        # ranked word search lives at /api/search
+        return self.get_subject_catalogue(
             or_(
                 Subject.name.ilike(f"%{search_query}%"),
                 Subject.description.ilike(f"%{search_query}%"),
             )
-        ).all()
-        return [subject.to_dict() for subject in subjects]
+        )
 
     @jwt_required()
+    @cached_response("subjects", per_user=False)
     def get(self, subject_id=None):
         try:
             search_query = request.args.get("search", "").lower()
@@ -104,7 +111,6 @@ class SubjectApi(Resource):
             db.session.add(new_subject)
             db.session.commit()
 
-            self.invalidate_cache()
             return (
                 {
                     "message": "Subject created successfully",
@@ -139,9 +145,11 @@ class SubjectApi(Resource):
                 except Exception as e:
                     print(f"Error removing image: {e}")
 
+            rollup = affected_rollup(Chapter.subject_id == subject_id)
             db.session.delete(subject)
+            db.session.flush()
+            rebuild_rollup_rows(rollup)
             db.session.commit()
-            self.invalidate_cache()
 
             return {
                 "message": "Subject deleted successfully",
@@ -159,7 +167,6 @@ class SubjectApi(Resource):
     @jwt_required()
     @role_required("admin")
     def put(self, subject_id):
-        cache.clear()
         try:
             subject = Subject.query.get_or_404(subject_id)
 
@@ -224,7 +231,6 @@ class SubjectApi(Resource):
                 subject.subject_image = None
 
             db.session.commit()
-            self.invalidate_cache()
             return subject.to_dict(), 200
 
         except Exception as e:
@@ -235,9 +241,3 @@ class SubjectApi(Resource):
                 "error": str(e),
                 "error_type": type(e).__name__,
             }, 400
-
-    def invalidate_cache(self):
-        """Invalidate all subject-related caches"""
-        cache.delete_memoized(self.get_all_subjects)
-        cache.delete_memoized(self.get_subject_by_id)
-        cache.delete_memoized(self.search_subjects)
@@ -6,6 +6,11 @@ from flask import request
 from .. import db, cache
 from time import perf_counter_ns
 from ..utils import IndianTimeZone
+from ..services.grading import InvalidSubmission, grade_answers, save_user_answers
+from ..services.answer_keys import answer_keys
+from ..services.analytics import record_quiz_result
+from ..services.rate_limit import rate_limit
+from .chart_api import mark_dashboard_stale
 
 
 class UserAnswerApi(Resource):
@@ -13,6 +18,7 @@ class UserAnswerApi(Resource):
         self.cache_timeout = 300
 
     @jwt_required()
+    @rate_limit("user_answers")
     def post(self):
         """
         Expected request format:
@@ -55,42 +61,15 @@ class UserAnswerApi(Resource):
                     }
                 ), 403
 
-            # Calculate results
-            total_questions = len(quiz.questions)
-            correct_answers = 0
-            user_answers = []
-            completed = IndianTimeZone()
-            print("Completed at:", completed)
-            print("hi")
-
-            # Process each answer
-            for answer in data["answers"]:
-                question_id = answer.get("question_id")
-                selected_option_id = answer.get("selected_option_id")
-
-                if not question_id or not selected_option_id:
-                    continue
-
-                # Get the correct option for this question
-                question = Question.query.get(question_id)
-                if not question or question.quiz_id != quiz.id:
-                    return {"message": f"Invalid question_id: {question_id}"}, 400
-
-                correct_option = Option.query.filter_by(
-                    question_id=question_id, is_correct=True
-                ).first()
-
-                is_correct = correct_option and correct_option.id == selected_option_id
-                if is_correct:
-                    correct_answers += 1
-
-                user_answers.append(
-                    {
-                        "question_id": question_id,
-                        "selected_option": selected_option_id,
-                        "is_correct": is_correct,
-                    }
+            # Grade the whole submission against the quiz's answer key
+            answer_key = answer_keys.get(quiz.id)
+            try:
+                user_answers, correct_answers = grade_answers(
+                    answer_key, data["answers"]
                 )
+            except InvalidSubmission as e:
+                return {"message": str(e)}, 400
+            total_questions = len(answer_key)
 
             # Calculate percentage
             percentage = (
@@ -110,16 +89,11 @@ class UserAnswerApi(Resource):
             db.session.flush()  # Get the ID of quiz_result
 
             # Create user answers
-            for answer in user_answers:
-                user_answer = UserAnswer(
-                    result_id=quiz_result.id,
-                    question_id=answer["question_id"],
-                    selected_option=answer["selected_option"],
-                    is_correct=answer["is_correct"],
-                )
-                db.session.add(user_answer)
+            save_user_answers(quiz_result.id, user_answers)
+            record_quiz_result(quiz_result)
 
             db.session.commit()
+            mark_dashboard_stale()
 
             # Prepare detailed result response
             result = {
@@ -140,11 +114,7 @@ class UserAnswerApi(Resource):
                         "question_id": answer["question_id"],
                         "selected_option": answer["selected_option"],
                         "is_correct": answer["is_correct"],
-                        "correct_option": Option.query.filter_by(
-                            question_id=answer["question_id"], is_correct=True
-                        )
-                        .first()
-                        .id,
+                        "correct_option": answer["correct_option"],
                     }
                     for idx, answer in enumerate(user_answers)
                 ],
@@ -170,7 +140,10 @@ class UserAnswerApi(Resource):
             data = request.get_json()
 
             if "selected_option" in data:
-                answer.selected_option = data["selected_option"]
+                option = db.session.get(Option, data["selected_option"])
+                if option is None or option.question_id != answer.question_id:
+                    return {"message": "Invalid selected_option"}, 400
+                answer.selected_option = option.id
             if "is_correct" in data:
                 answer.is_correct = data["is_correct"]
 
@@ -211,12 +184,10 @@ class UserAnswerApi(Resource):
     def get_question_details(self, question_id):
         """Helper method to get question details including correct answer"""
         question = Question.query.get_or_404(question_id)
-        correct_option = Option.query.filter_by(
-            question_id=question_id, is_correct=True
-        ).first()
+        answer_key = answer_keys.get(question.quiz_id)
 
         return {
             "question_text": question.text,
-            "correct_option_id": correct_option.id if correct_option else None,
-            "correct_option_text": correct_option.text if correct_option else None,
+            "correct_option_id": answer_key.correct_option_id(question_id),
+            "correct_option_text": answer_key.correct_option_text(question_id),
         }
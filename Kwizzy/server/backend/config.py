@@ -15,4 +15,14 @@ class Config:
     MAIL_SERVER = os.getenv("MAIL_SERVER")
     MAIL_PORT = os.getenv("MAIL_PORT")
     MAIL_USE_TLS = os.getenv("MAIL_USE_TLS")
-    MAIL_USERNAME = os.getenv("MAIL_USERNAME")
\ No newline at end of file
+    MAIL_USERNAME = os.getenv("MAIL_USERNAME")
+    # Token buckets per route: (scope, capacity, seconds to refill it), see
+    # services/rate_limit.py. Whole classrooms often share one address, so
+    # the per-ip buckets are sized for a class rather than one person
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMITS = {
+        "login": [("ip", 30, 60)],
+        "register": [("ip", 10, 600)],
+        "forgot_password": [("ip", 5, 900)],
+        "user_answers": [("user", 10, 60), ("ip", 300, 60)],
+    }
\ No newline at end of file
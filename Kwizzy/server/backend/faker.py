@@ -11,6 +11,7 @@ from .models import (
     Option,
     QuizResult,
     UserAnswer,
+    PaymentHistory,
 )
 from faker import Faker
 import random
@@ -146,6 +147,8 @@ def seed_user_answers(quiz_results, questions, options):
 def seed_database():
     print("Seeding database...")
     with app.app_context():
+        # Bulk deletes skip ORM cascades, and SQLite enforces foreign keys
+        PaymentHistory.query.delete()
         UserAnswer.query.delete()
         QuizResult.query.delete()
         Option.query.delete()
@@ -7,9 +7,12 @@ from sqlalchemy import (
     Integer,
     String,
     Boolean,
+    Float,
     ForeignKey,
+    Index,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy import select, inspect
+from sqlalchemy.orm import relationship, backref
 from flask_login import UserMixin
 from . import db
 from .utils import IndianTimeZone, convert_to_ist, format_ist_datetime
@@ -18,6 +21,11 @@ from datetime import datetime
 
 class User(db.Model, UserMixin):
     __tablename__ = "users"
+    # Serve the admin student directory's sort orders straight from an index
+    __table_args__ = tuple(
+        Index(f"ix_users_role_{column}", "role", column, "id")
+        for column in ("name", "email", "qualification", "dob", "performance")
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String(50), nullable=False, unique=True)
     email = Column(String(50), nullable=False, unique=True)
@@ -26,11 +34,18 @@ class User(db.Model, UserMixin):
     role = Column(String(10), nullable=False, default="student")
     profile_pic = Column(String(255), nullable=True)
     password = Column(String(30), nullable=False)
+    # Overall percentage across all attempts, denormalized from the analytics
+    # rollup whenever a result is recorded
+    performance = Column(Float, nullable=False, default=0, server_default="0")
 
     quiz_results = relationship(
         "QuizResult", back_populates="user", cascade="all, delete-orphan"
     )
 
+    def cache_tags(self):
+        """Response cache tags invalidated when this row changes"""
+        return ["students", f"student:{self.id}"]
+
 
 class Subject(db.Model):
     __tablename__ = "subjects"
@@ -39,18 +54,59 @@ class Subject(db.Model):
     description = Column(String(120), nullable=False)
     subject_image = Column(String(255), nullable=True)
 
-    def to_dict(self):
-        quiz_count = sum(len(chapter.quizzes) for chapter in self.chapters)
+    @staticmethod
+    def with_stats():
+        """
+        Select subjects together with their quiz, chapter and distinct
+        student counts, computed by grouped subqueries in a single query
+        """
+        chapter_counts = (
+            select(Chapter.subject_id, func.count(Chapter.id).label("count"))
+            .group_by(Chapter.subject_id)
+            .subquery()
+        )
+        quiz_counts = (
+            select(Chapter.subject_id, func.count(Quiz.id).label("count"))
+            .join(Quiz, Quiz.chapter_id == Chapter.id)
+            .group_by(Chapter.subject_id)
+            .subquery()
+        )
         # Counting the number of distinct students who have attempted quizzes
-        # We join QuizResults with Quizzes, which are linked to Chapters
-        student_attempted_count = (
-            db.session.query(func.count(func.distinct(QuizResult.user_id)))
-            .join(Quiz, Quiz.id == QuizResult.quiz_id)
-            .join(Chapter, Chapter.id == Quiz.chapter_id)
-            .filter(Chapter.subject_id == self.id)
-            .scalar()
+        student_counts = (
+            select(
+                Chapter.subject_id,
+                func.count(func.distinct(QuizResult.user_id)).label("count"),
+            )
+            .join(Quiz, Quiz.chapter_id == Chapter.id)
+            .join(QuizResult, QuizResult.quiz_id == Quiz.id)
+            .group_by(Chapter.subject_id)
+            .subquery()
         )
-        chapter_count = len(self.chapters)
+        return (
+            select(
+                Subject,
+                func.coalesce(quiz_counts.c.count, 0).label("quiz_count"),
+                func.coalesce(chapter_counts.c.count, 0).label("chapter_count"),
+                func.coalesce(student_counts.c.count, 0).label("student_count"),
+            )
+            .outerjoin(quiz_counts, quiz_counts.c.subject_id == Subject.id)
+            .outerjoin(chapter_counts, chapter_counts.c.subject_id == Subject.id)
+            .outerjoin(student_counts, student_counts.c.subject_id == Subject.id)
+        )
+
+    def to_dict(self, stats=None):
+        """
+        stats is the (quiz_count, chapter_count, student_count) of a
+        with_stats() row; it is queried for this subject when omitted
+        """
+        if stats is None:
+            row = None
+            if self.id is not None:
+                row = db.session.execute(
+                    Subject.with_stats().where(Subject.id == self.id)
+                ).one_or_none()
+            stats = tuple(row)[1:] if row else (0, 0, 0)
+        quiz_count, chapter_count, student_attempted_count = stats
         return {
             "id": self.id,
             "name": self.name,
@@ -65,6 +121,9 @@ class Subject(db.Model):
         "Chapter", back_populates="subject", cascade="all, delete-orphan"
     )
 
+    def cache_tags(self):
+        return ["subjects"]
+
 
 class Chapter(db.Model):
     __tablename__ = "chapters"
@@ -91,6 +150,10 @@ class Chapter(db.Model):
     )
     subject = relationship("Subject", back_populates="chapters")
 
+    def cache_tags(self):
+        # Subjects report their chapter counts
+        return ["chapters", "subjects"]
+
 
 class Quiz(db.Model):
     __tablename__ = "quizzes"
@@ -106,7 +169,10 @@ class Quiz(db.Model):
     one_attempt_only = Column(Boolean, default=True)
 
     questions = relationship(
-        "Question", back_populates="quiz", cascade="all, delete-orphan"
+        "Question",
+        back_populates="quiz",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
     quiz_results = relationship(
         "QuizResult", back_populates="quiz", cascade="all, delete-orphan"
@@ -116,6 +182,19 @@ class Quiz(db.Model):
         "PaymentHistory", backref="quiz", cascade="all, delete-orphan"
     )
 
+    def cache_tags(self):
+        # Chapters and subjects report their quiz counts
+        tags = ["quizzes", "chapters", "subjects"]
+        # Student payloads list attempts by quiz name. Called after a flush,
+        # while the flushed changes are still in the attribute history
+        state = inspect(self)
+        renamed = (
+            state.attrs.name.history.has_changes() and self not in state.session.new
+        )
+        if state.deleted or renamed:
+            tags.append("students")
+        return tags
+
     def has_user_paid(self, user_id):
         return (
             PaymentHistory.query.filter_by(
@@ -159,6 +238,8 @@ class Quiz(db.Model):
 
 class Question(db.Model):
     __tablename__ = "questions"
+    # Serves per-quiz question lookups and counts
+    __table_args__ = (Index("ix_questions_quiz_id", "quiz_id"),)
     id = Column(Integer, primary_key=True, autoincrement=True)
     quiz_id = Column(
         Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), nullable=False
@@ -167,13 +248,21 @@ class Question(db.Model):
     text = Column(String(255), nullable=False)
 
     options = relationship(
-        "Option", back_populates="question", cascade="all, delete-orphan"
+        "Option",
+        back_populates="question",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
     quiz = relationship("Quiz", back_populates="questions")
 
+    def cache_tags(self):
+        # Quiz lists report question counts
+        return ["quizzes"]
+
 
 class Option(db.Model):
     __tablename__ = "options"
+    __table_args__ = (Index("ix_options_question_id", "question_id"),)
     id = Column(Integer, primary_key=True, autoincrement=True)
     question_id = Column(
         Integer, ForeignKey("questions.id", ondelete="CASCADE"), nullable=False
@@ -187,6 +276,13 @@ class Option(db.Model):
 # ||----------------------User Answer Model----------------------||#
 class UserAnswer(db.Model):
     __tablename__ = "user_answers"
+    # Serve ON DELETE CASCADE / SET NULL when questions and options go away
+    __table_args__ = (
+        Index("ix_user_answers_question_id", "question_id"),
+        Index("ix_user_answers_selected_option", "selected_option"),
+        # Answer counts per result are read from the index alone
+        Index("ix_user_answers_result_id_is_correct", "result_id", "is_correct"),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     result_id = Column(
         Integer, ForeignKey("quiz_results.id", ondelete="CASCADE"), nullable=False
@@ -200,7 +296,10 @@ class UserAnswer(db.Model):
     is_correct = Column(Boolean, default=False)
 
     quiz_result = relationship("QuizResult", back_populates="user_answers")
-    question = relationship("Question", backref="user_answers")
+    # The database cascades question deletes to their answers
+    question = relationship(
+        "Question", backref=backref("user_answers", passive_deletes=True)
+    )
     selected_option_rel = relationship("Option", foreign_keys=[selected_option])
 
     def to_dict(self):
@@ -217,13 +316,14 @@ class UserAnswer(db.Model):
                 if selected_option:
                     selected_option_text = selected_option.text
 
-            # Get correct option text
-            correct_option = Option.query.filter_by(
-                question_id=self.question_id, is_correct=True
-            ).first()
-            correct_option_text = (
-                correct_option.text if correct_option else "No correct option found"
-            )
+            # Get correct option text from the cached answer key
+            from .services.answer_keys import answer_keys
+
+            correct_option_text = None
+            if self.question:
+                answer_key = answer_keys.get(self.question.quiz_id)
+                correct_option_text = answer_key.correct_option_text(self.question_id)
+            correct_option_text = correct_option_text or "No correct option found"
 
             return {
                 "id": self.id,
@@ -252,6 +352,10 @@ class UserAnswer(db.Model):
 # ||----------------------Quiz Result Model----------------------||#
 class QuizResult(db.Model):
     __tablename__ = "quiz_results"
+    # Keyset pages of a student's attempts, latest first
+    __table_args__ = (
+        Index("ix_quiz_results_user_completed_at_id", "user_id", "completed_at", "id"),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     quiz_id = Column(
         Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), nullable=False
@@ -261,27 +365,25 @@ class QuizResult(db.Model):
     )
     marks_scored = Column(Integer, nullable=True)
     total_marks = Column(Integer, nullable=True)
-    completed_at = Column(DateTime, default=IndianTimeZone())
+    completed_at = Column(DateTime, default=IndianTimeZone)
 
     user = relationship("User", back_populates="quiz_results")
     quiz = relationship("Quiz", back_populates="quiz_results")
+    # Answers are loaded per query: see quiz_result_summary_options and
+    # quiz_result_review_options in services/serializers.py
     user_answers = relationship(
-        "UserAnswer", back_populates="quiz_result", cascade="all, delete", lazy="joined"
+        "UserAnswer", back_populates="quiz_result", cascade="all, delete", lazy="select"
     )
 
+    def cache_tags(self):
+        # Student stats, quiz attempt flags and subject student counts
+        return ["results", "students", f"student:{self.user_id}", "subjects"]
+
     def to_dict(self):
         try:
-            return {
-                "id": self.id,
-                "quiz_id": self.quiz_id,
-                "user_id": self.user_id,
-                "marks_scored": self.marks_scored,
-                "total_marks": self.total_marks,
-                "completed_at_formatted": format_ist_datetime(self.completed_at),
-                "user_answers": [answer.to_dict() for answer in self.user_answers],
-                "quiz_name": self.quiz.name if self.quiz else None,
-                "quiz_description": self.quiz.description if self.quiz else None,
-            }
+            from .services.serializers import serialize_quiz_results
+
+            return serialize_quiz_results([self])[0]
         except Exception as e:
             print(f"Error in QuizResult.to_dict(): {str(e)}")
             return {
@@ -297,15 +399,52 @@ class QuizResult(db.Model):
             }
 
 
+# ||----------------------Student Analytics Rollup----------------------||#
+class StudentDailyStats(db.Model):
+    """
+    Per-student quiz activity rolled up by (subject, chapter, day). Rows are
+    upserted in the same transaction that writes a QuizResult, so student
+    dashboards read a few rows per day instead of every attempt.
+    """
+
+    __tablename__ = "student_daily_stats"
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    subject_id = Column(
+        Integer, ForeignKey("subjects.id", ondelete="CASCADE"), primary_key=True
+    )
+    chapter_id = Column(
+        Integer, ForeignKey("chapters.id", ondelete="CASCADE"), primary_key=True
+    )
+    day = Column(Date, primary_key=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    # Attempts with a score; averages are score_sum / scored_attempts
+    scored_attempts = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Float, nullable=False, default=0)
+    score_max = Column(Float, nullable=True)
+    score_min = Column(Float, nullable=True)
+    marks_scored = Column(Integer, nullable=False, default=0)
+    total_marks = Column(Integer, nullable=False, default=0)
+    last_completed_at = Column(DateTime, nullable=True)
+
+
 class PaymentHistory(db.Model):
     __tablename__ = "payment_history"
+    # Composite indexes serving keyset pagination on (created_at, id)
+    __table_args__ = (
+        Index("ix_payment_history_created_at_id", "created_at", "id"),
+        Index("ix_payment_history_user_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_payment_history_quiz_created_at_id", "quiz_id", "created_at", "id"),
+        Index("ix_payment_history_status_created_at_id", "status", "created_at", "id"),
+    )
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     quiz_id = Column(Integer, ForeignKey("quizzes.id"), nullable=False)
     transaction_id = Column(String(100), nullable=False)
     amount = Column(Integer, nullable=False)
     status = Column(String(20), default="pending")
-    created_at = Column(DateTime, default=IndianTimeZone())
+    created_at = Column(DateTime, default=IndianTimeZone)
 
     def to_dict(self):
         quiz_details = Quiz.query.filter_by(id=self.quiz_id).first()
@@ -0,0 +1,254 @@
+"""
+Incremental per-student analytics.
+
+record_quiz_result() folds a new QuizResult into the student_daily_stats
+rollup inside the caller's transaction, so the rollup commits (or rolls
+back) together with the result. Deleting a quiz, chapter or subject takes
+its results away: the delete handlers find the rollup rows those results
+fed with affected_rollup() beforehand and regenerate just them with
+rebuild_rollup_rows() once the delete is flushed. rebuild_student_rollup()
+regenerates the whole table from quiz history. All of them keep
+users.performance, the overall percentage the student directory sorts by,
+in step with the rollup.
+
+The rollup is upserted with INSERT ... ON CONFLICT on SQLite and
+PostgreSQL. Other databases take a slower read-then-write path.
+"""
+
+from sqlalchemy import select, delete, insert, update, func, case, tuple_
+from sqlalchemy.dialects import sqlite, postgresql
+from .. import db
+from ..models import User, QuizResult, Quiz, Chapter, StudentDailyStats
+from .response_cache import invalidate_tags
+
+ROLLUP_KEY = ("user_id", "subject_id", "chapter_id", "day")
+UPSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+ROLLUP_COLUMNS = [
+    "user_id",
+    "subject_id",
+    "chapter_id",
+    "day",
+    "attempts",
+    "scored_attempts",
+    "score_sum",
+    "score_max",
+    "score_min",
+    "marks_scored",
+    "total_marks",
+    "last_completed_at",
+]
+
+
+def record_quiz_result(result):
+    """Add a flushed QuizResult to the rollup, without committing"""
+    quiz = db.session.execute(
+        select(Quiz.chapter_id, Chapter.subject_id)
+        .join(Chapter, Chapter.id == Quiz.chapter_id)
+        .where(Quiz.id == result.quiz_id)
+    ).one()
+
+    scored = result.marks_scored is not None and bool(result.total_marks)
+    score = result.marks_scored * 100.0 / result.total_marks if scored else None
+
+    values = {
+        "user_id": int(result.user_id),
+        "subject_id": quiz.subject_id,
+        "chapter_id": quiz.chapter_id,
+        "day": result.completed_at.date(),
+        "attempts": 1,
+        "scored_attempts": 1 if scored else 0,
+        "score_sum": score or 0,
+        "score_max": score,
+        "score_min": score,
+        "marks_scored": result.marks_scored or 0,
+        "total_marks": result.total_marks or 0,
+        "last_completed_at": result.completed_at,
+    }
+    upsert = UPSERT_DIALECTS.get(db.session.get_bind().dialect.name)
+    if upsert is None:
+        _merge_rollup_row(values)
+    else:
+        _upsert_rollup_row(upsert, values)
+    refresh_performance([values["user_id"]])
+
+
+def _upsert_rollup_row(upsert, values):
+    statement = upsert(StudentDailyStats).values(**values)
+    table, new = StudentDailyStats.__table__.c, statement.excluded
+    statement = statement.on_conflict_do_update(
+        index_elements=list(ROLLUP_KEY),
+        set_={
+            "attempts": table.attempts + new.attempts,
+            "scored_attempts": table.scored_attempts + new.scored_attempts,
+            "score_sum": table.score_sum + new.score_sum,
+            # Two-argument max()/min() treat NULL differently per database
+            "score_max": case(
+                (table.score_max.is_(None), new.score_max),
+                (new.score_max > table.score_max, new.score_max),
+                else_=table.score_max,
+            ),
+            "score_min": case(
+                (table.score_min.is_(None), new.score_min),
+                (new.score_min < table.score_min, new.score_min),
+                else_=table.score_min,
+            ),
+            "marks_scored": table.marks_scored + new.marks_scored,
+            "total_marks": table.total_marks + new.total_marks,
+            "last_completed_at": case(
+                (
+                    table.last_completed_at < new.last_completed_at,
+                    new.last_completed_at,
+                ),
+                else_=table.last_completed_at,
+            ),
+        },
+    )
+    db.session.execute(statement)
+
+
+def _merge_rollup_row(values):
+    """The upsert as a locked read and a write, for databases without one"""
+    row = db.session.scalars(
+        select(StudentDailyStats)
+        .filter_by(**{column: values[column] for column in ROLLUP_KEY})
+        .with_for_update()
+    ).first()
+    if row is None:
+        db.session.add(StudentDailyStats(**values))
+        return
+    row.attempts += values["attempts"]
+    row.scored_attempts += values["scored_attempts"]
+    row.score_sum += values["score_sum"]
+    score = values["score_max"]
+    if score is not None:
+        row.score_max = score if row.score_max is None else max(row.score_max, score)
+        row.score_min = score if row.score_min is None else min(row.score_min, score)
+    row.marks_scored += values["marks_scored"]
+    row.total_marks += values["total_marks"]
+    # Results carry IST-aware times; the column stores the naive wall time
+    completed_at = values["last_completed_at"].replace(tzinfo=None)
+    if row.last_completed_at is None or row.last_completed_at < completed_at:
+        row.last_completed_at = completed_at
+
+
+def refresh_performance(user_ids=None):
+    """
+    Recompute users.performance from the rollup, for the given students or
+    for everyone, without committing
+    """
+    totals = select(
+        func.coalesce(
+            func.round(
+                func.sum(StudentDailyStats.marks_scored)
+                * 100.0
+                / func.nullif(func.sum(StudentDailyStats.total_marks), 0),
+                2,
+            ),
+            0,
+        )
+    ).where(StudentDailyStats.user_id == User.id)
+    statement = update(User).values(performance=totals.scalar_subquery())
+    if user_ids is not None:
+        statement = statement.where(User.id.in_(user_ids))
+    db.session.execute(statement.execution_options(synchronize_session=False))
+
+
+def _rollup_select(*criteria):
+    """The rollup rows of the QuizResults matching criteria, aggregated"""
+    scored = (QuizResult.marks_scored.isnot(None)) & (QuizResult.total_marks > 0)
+    score = case((scored, QuizResult.marks_scored * 100.0 / QuizResult.total_marks))
+    day = func.date(QuizResult.completed_at)
+
+    return (
+        select(
+            QuizResult.user_id,
+            Chapter.subject_id,
+            Quiz.chapter_id,
+            day,
+            func.count(QuizResult.id),
+            func.count(score),
+            func.coalesce(func.sum(score), 0),
+            func.max(score),
+            func.min(score),
+            func.coalesce(func.sum(QuizResult.marks_scored), 0),
+            func.coalesce(func.sum(QuizResult.total_marks), 0),
+            func.max(QuizResult.completed_at),
+        )
+        .join(Quiz, Quiz.id == QuizResult.quiz_id)
+        .join(Chapter, Chapter.id == Quiz.chapter_id)
+        .where(*criteria)
+        .group_by(QuizResult.user_id, Chapter.subject_id, Quiz.chapter_id, day)
+    )
+
+
+def affected_rollup(*criteria):
+    """
+    The (user id, chapter id) pairs whose rollup rows count QuizResults
+    matching criteria, on QuizResult, Quiz or Chapter. Call before deleting
+    those results.
+    """
+    return db.session.execute(
+        select(QuizResult.user_id, Quiz.chapter_id)
+        .join(Quiz, Quiz.id == QuizResult.quiz_id)
+        .join(Chapter, Chapter.id == Quiz.chapter_id)
+        .where(*criteria)
+        .distinct()
+    ).all()
+
+
+def rebuild_rollup_rows(pairs):
+    """
+    Regenerate the rollup rows of the given (user id, chapter id) pairs from
+    the QuizResults left, and those users' performance, without committing
+    """
+    if not pairs:
+        return
+    pairs = [tuple(pair) for pair in pairs]
+    db.session.execute(
+        delete(StudentDailyStats).where(
+            tuple_(StudentDailyStats.user_id, StudentDailyStats.chapter_id).in_(pairs)
+        )
+    )
+    db.session.execute(
+        insert(StudentDailyStats).from_select(
+            ROLLUP_COLUMNS,
+            _rollup_select(tuple_(QuizResult.user_id, Quiz.chapter_id).in_(pairs)),
+        )
+    )
+    refresh_performance(sorted({user_id for user_id, _ in pairs}))
+
+
+def rebuild_student_rollup():
+    """Regenerate the rollup from every QuizResult with one INSERT ... SELECT"""
+    db.session.execute(delete(StudentDailyStats))
+    db.session.execute(
+        insert(StudentDailyStats).from_select(ROLLUP_COLUMNS, _rollup_select())
+    )
+    refresh_performance()
+    db.session.commit()
+    # The rollup is written with Core statements, which carry no cache tags
+    invalidate_tags("students")
+    return db.session.scalar(select(func.count()).select_from(StudentDailyStats))
+
+
+def get_quiz_stats(user_ids):
+    """
+    Lifetime totals per student from the rollup, for a batch of students.
+
+    Returns {user_id: row} where row has attempts, marks_scored, total_marks
+    and last_completed_at. Students with no attempts are left out.
+    """
+    if not user_ids:
+        return {}
+    rows = db.session.execute(
+        select(
+            StudentDailyStats.user_id,
+            func.sum(StudentDailyStats.attempts).label("attempts"),
+            func.sum(StudentDailyStats.marks_scored).label("marks_scored"),
+            func.sum(StudentDailyStats.total_marks).label("total_marks"),
+            func.max(StudentDailyStats.last_completed_at).label("last_completed_at"),
+        )
+        .where(StudentDailyStats.user_id.in_(user_ids))
+        .group_by(StudentDailyStats.user_id)
+    )
+    return {row.user_id: row for row in rows}
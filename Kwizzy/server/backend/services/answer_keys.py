@@ -0,0 +1,114 @@
+"""
+Versioned answer-key cache.
+
+Answer keys are cached per quiz in a small in-process LRU in front of the
+shared Flask-Caching (Redis) cache. Entries are keyed by the quiz's content
+version, so editing a quiz's questions or options only has to bump that
+version for every worker to stop using the old key. Deleted quizzes get a
+new version from session hooks below, including those removed by a subject
+or chapter cascade, so nothing keyed by their version (answer keys,
+delivery payloads, ETags) is served after the delete commits.
+"""
+
+import os
+import logging
+from collections import OrderedDict
+from threading import Lock
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from .. import cache
+from ..models import Quiz
+from .grading import load_answer_key
+from .versions import get_version, bump_version
+
+logger = logging.getLogger(__name__)
+
+REMOTE_TIMEOUT = 3600
+PENDING_DELETED_QUIZZES = "deleted_quizzes"
+KEY_FORMAT = 2
+
+
+class AnswerKeyStore:
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.local_hits = 0
+        self.remote_hits = 0
+        self.misses = 0
+
+    def get(self, quiz_id):
+        """Return the AnswerKey of a quiz, loading it from the database on a miss"""
+        version = get_version("quiz", quiz_id)
+        local_key = (quiz_id, version)
+
+        with self._lock:
+            answer_key = self._entries.get(local_key)
+            if answer_key is not None:
+                self._entries.move_to_end(local_key)
+                self.local_hits += 1
+                return answer_key
+
+        # The format number keeps keys pickled by older code from being read
+        remote_key = f"answer_key:{KEY_FORMAT}:{quiz_id}:{version}"
+        answer_key = cache.get(remote_key)
+        if answer_key is not None:
+            self.remote_hits += 1
+        else:
+            self.misses += 1
+            answer_key = load_answer_key(quiz_id)
+            cache.set(remote_key, answer_key, timeout=REMOTE_TIMEOUT)
+
+        with self._lock:
+            self._entries[local_key] = answer_key
+            self._entries.move_to_end(local_key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return answer_key
+
+    def invalidate(self, quiz_id):
+        """Mark the cached answer key of a quiz as stale on every worker"""
+        bump_version("quiz", quiz_id)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == quiz_id]:
+                del self._entries[key]
+
+    def stats(self):
+        lookups = self.local_hits + self.remote_hits + self.misses
+        return {
+            "local_hits": self.local_hits,
+            "remote_hits": self.remote_hits,
+            "misses": self.misses,
+            "hit_rate": (
+                round((self.local_hits + self.remote_hits) / lookups, 4)
+                if lookups
+                else 0
+            ),
+            "entries": len(self._entries),
+            "maxsize": self.maxsize,
+        }
+
+
+answer_keys = AnswerKeyStore(maxsize=int(os.getenv("ANSWER_KEY_CACHE_SIZE", 256)))
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_deleted_quizzes(session, flush_context):
+    for instance in session.deleted:
+        if isinstance(instance, Quiz):
+            session.info.setdefault(PENDING_DELETED_QUIZZES, set()).add(instance.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_deleted_quizzes(session):
+    for quiz_id in session.info.pop(PENDING_DELETED_QUIZZES, ()):
+        try:
+            answer_keys.invalidate(quiz_id)
+        except Exception as e:
+            logger.error(f"Could not invalidate deleted quiz {quiz_id}: {str(e)}")
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_deleted_quizzes(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop(PENDING_DELETED_QUIZZES, None)
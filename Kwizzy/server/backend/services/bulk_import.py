@@ -0,0 +1,258 @@
+"""
+Machinery shared by the bulk import pipelines.
+
+An importer is a BatchImporter subclass that parses and validates one record
+at a time and writes them a committed batch at a time; everything else is
+here. ImportApi takes the upload and starts the import_file Celery task,
+which runs the file through the importer, reports progress after every
+batch and answers status polls.
+
+Uploads are read one record at a time, so an import's memory use depends on
+its batch size rather than on the size of the file.
+"""
+
+import csv
+import json
+import os
+import logging
+from uuid import uuid4
+from flask import request
+from flask_restful import Resource
+from flask_jwt_extended import jwt_required
+from .. import celery
+from ..utils import role_required
+
+logger = logging.getLogger(__name__)
+
+# Rows inserted per executemany round trip and per committed batch
+IMPORT_BATCH_SIZE = 1000
+# Per-row errors kept in a report; the rest are only counted
+MAX_REPORTED_ERRORS = 200
+IMPORT_FORMATS = ("csv", "jsonl")
+
+# Uploads wait here until the import task has read them
+app_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+relative_path = os.getenv("UPLOAD_FOLDER").lstrip("./")
+IMPORT_FOLDER = os.path.join(app_root, relative_path, "imports")
+os.makedirs(IMPORT_FOLDER, exist_ok=True)
+
+# BatchImporter.name -> subclass, for the import task to look up
+IMPORTERS = {}
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def detect_format(filename, requested=None):
+    """Pick csv or jsonl from an explicit format or the file extension"""
+    fmt = (requested or os.path.splitext(filename or "")[1].lstrip(".")).lower()
+    if fmt == "ndjson":
+        fmt = "jsonl"
+    if fmt not in IMPORT_FORMATS:
+        raise ImportFormatError("Upload a .csv or .jsonl file")
+    return fmt
+
+
+def iter_records(stream, fmt):
+    """
+    Yield (line number, record dict) from a text stream. Lines that cannot
+    be parsed are yielded as (line number, ValueError) so the caller can
+    report them and carry on.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, {
+                key.strip(): value.strip() if isinstance(value, str) else value
+                for key, value in record.items()
+                if key
+            }
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f"Invalid JSON: {e}")
+            continue
+        if not isinstance(record, dict):
+            yield line_number, ValueError("Each line must be a JSON object")
+            continue
+        yield line_number, record
+
+
+def require_text(record, field, max_length, required=True):
+    value = record.get(field)
+    value = "" if value is None else str(value).strip()
+    if not value:
+        if required:
+            raise ValueError(f"{field} is required")
+        return None
+    if len(value) > max_length:
+        raise ValueError(f"{field} is longer than {max_length} characters")
+    return value
+
+
+def parse_bool(value, default):
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("1", "true", "yes", "y"):
+        return True
+    if text in ("0", "false", "no", "n"):
+        return False
+    raise ValueError(f"Invalid boolean '{value}'")
+
+
+class ImportReport:
+    """Counters and per-row errors of one import run"""
+
+    def __init__(self):
+        self.rows = 0
+        self.created = {}
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": line_number, "error": message})
+
+    def count(self, name, amount):
+        self.created[name] = self.created.get(name, 0) + amount
+
+    def to_dict(self):
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "error_count": self.error_count,
+            "errors": self.errors,
+            "errors_truncated": self.error_count > len(self.errors),
+        }
+
+
+class BatchImporter:
+    """
+    Reads records into pending with add(), which raises ValueError for a
+    row it rejects, and writes them with write_batch(), which commits.
+    Subclasses set name and implement both.
+    """
+
+    name = None
+
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE, progress=None):
+        self.batch_size = batch_size
+        self.progress = progress
+        self.report = ImportReport()
+        self.pending = []
+
+    def run(self, stream, fmt):
+        for line_number, record in iter_records(stream, fmt):
+            self.report.rows += 1
+            if isinstance(record, Exception):
+                self.report.add_error(line_number, str(record))
+                continue
+            try:
+                self.add(record, line_number)
+            except ValueError as e:
+                self.report.add_error(line_number, str(e))
+                continue
+            if len(self.pending) >= self.batch_size:
+                self.flush()
+        self.flush()
+        return self.report.to_dict()
+
+    def add(self, record, line_number):
+        raise NotImplementedError
+
+    def write_batch(self):
+        raise NotImplementedError
+
+    def flush(self):
+        if not self.pending:
+            return
+        self.write_batch()
+        self.pending = []
+        if self.progress:
+            self.progress(self.report.to_dict())
+
+
+def register_importer(importer):
+    IMPORTERS[importer.name] = importer
+    return importer
+
+
+@celery.task(bind=True)
+def import_file(self, importer, path, fmt):
+    """Run an uploaded file through an importer, reporting progress per batch"""
+
+    def report_progress(report):
+        # Progress is best effort; it must not abort the import
+        try:
+            self.update_state(state="PROGRESS", meta=report)
+        except Exception as e:
+            logger.warning(f"Could not report import progress: {str(e)}")
+
+    try:
+        with open(path, newline="", encoding="utf-8-sig") as stream:
+            report = IMPORTERS[importer](progress=report_progress).run(stream, fmt)
+        logger.info(f"Import of {importer} finished: {report['created']}")
+        return {"status": "success", **report}
+    except Exception as e:
+        logger.error(f"Error importing {importer}: {str(e)}")
+        return {"status": "error", "message": str(e)}
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class ImportApi(Resource):
+    """POST starts importing an upload with the importer; GET reports on it"""
+
+    importer = None
+
+    @jwt_required()
+    @role_required("admin")
+    def post(self):
+        """Upload a CSV/JSONL file and import it in the background"""
+        try:
+            upload = request.files.get("file")
+            if not upload or not upload.filename:
+                return {"message": "A CSV or JSONL file is required"}, 400
+            fmt = detect_format(upload.filename, request.form.get("format"))
+
+            path = os.path.join(IMPORT_FOLDER, f"{uuid4().hex}.{fmt}")
+            upload.save(path)
+            task = import_file.delay(self.importer, path, fmt)
+
+            return {
+                "message": "Import started successfully",
+                "task_id": str(task.id),
+            }, 202
+
+        except ImportFormatError as e:
+            return {"message": str(e)}, 400
+        except Exception as e:
+            logger.error(f"Error starting import of {self.importer}: {str(e)}")
+            return {"error": str(e)}, 500
+
+    @jwt_required()
+    @role_required("admin")
+    def get(self):
+        """Get progress or the final report of an import task"""
+        task_id = request.args.get("task_id")
+        if not task_id:
+            return {"error": "Task ID is required"}, 400
+
+        task = celery.AsyncResult(task_id)
+        return {
+            "task_id": task_id,
+            "status": task.status,
+            "progress": task.info if task.status == "PROGRESS" else None,
+            "result": task.result if task.ready() else None,
+        }
@@ -0,0 +1,91 @@
+"""
+Transactional email providers.
+
+EMAIL_PROVIDER picks how EmailService delivers mail:
+
+    brevo (default): the Brevo transactional API, subject to the daily
+    EmailRateLimiter quota of its free tier.
+
+    stub: nothing leaves the process. Messages are logged and kept in a
+    small outbox, after a fixed EMAIL_STUB_LATENCY_MS delay, so tests and
+    benchmarks see a deterministic provider.
+"""
+
+import os
+import logging
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class EmailDeliveryError(RuntimeError):
+    """The provider did not accept a message; delivery may be retried"""
+
+
+class BrevoProvider:
+    name = "brevo"
+    rate_limited = True
+
+    def __init__(self):
+        import sib_api_v3_sdk
+        from sib_api_v3_sdk.rest import ApiException
+
+        configuration = sib_api_v3_sdk.Configuration()
+        configuration.api_key["api-key"] = os.getenv("BREVO_API_KEY")
+        self.sdk = sib_api_v3_sdk
+        self.api_exception = ApiException
+        self.api = sib_api_v3_sdk.TransactionalEmailsApi(
+            sib_api_v3_sdk.ApiClient(configuration)
+        )
+
+    def send(self, to_email, to_name, subject, html_content):
+        message = self.sdk.SendSmtpEmail(
+            to=[{"email": to_email, "name": to_name}],
+            html_content=html_content,
+            sender={"name": "Kwizzy", "email": os.getenv("MAIL_DEFAULT_SENDER")},
+            subject=subject,
+        )
+        try:
+            self.api.send_transac_email(message)
+        except self.api_exception as e:
+            raise EmailDeliveryError(f"Brevo rejected the message: {e}") from e
+
+
+class StubProvider:
+    name = "stub"
+    rate_limited = False
+
+    def __init__(self, latency_ms=0):
+        self.latency = latency_ms / 1000
+        self.outbox = deque(maxlen=100)
+
+    def send(self, to_email, to_name, subject, html_content):
+        if self.latency:
+            time.sleep(self.latency)
+        self.outbox.append(
+            {
+                "to_email": to_email,
+                "to_name": to_name,
+                "subject": subject,
+                "html_content": html_content,
+            }
+        )
+        logger.info(f"Stub email to {to_email}: {subject}")
+
+
+_provider = None
+
+
+def get_email_provider():
+    """The provider selected by EMAIL_PROVIDER, created once per process"""
+    global _provider
+    if _provider is None:
+        name = os.getenv("EMAIL_PROVIDER", "brevo").lower()
+        if name == "stub":
+            _provider = StubProvider(int(os.getenv("EMAIL_STUB_LATENCY_MS", 0)))
+        elif name == "brevo":
+            _provider = BrevoProvider()
+        else:
+            raise ValueError(f"Unknown EMAIL_PROVIDER '{name}'")
+    return _provider
@@ -0,0 +1,133 @@
+from sqlalchemy import select, insert
+from .. import db
+from ..models import Question, Option, UserAnswer
+
+
+class InvalidSubmission(Exception):
+    """Raised when a submission references a question or option outside the quiz"""
+
+    def __init__(self, question_id, option_id=None):
+        if option_id is None:
+            message = f"Invalid question_id: {question_id}"
+        else:
+            message = (
+                f"Invalid selected_option_id {option_id} for question {question_id}"
+            )
+        super().__init__(message)
+        self.question_id = question_id
+        self.option_id = option_id
+
+
+class AnswerKey:
+    """The options and correct options of every question in a quiz"""
+
+    def __init__(self, quiz_id, options, correct_options, correct_text):
+        self.quiz_id = quiz_id
+        # {question_id: frozenset(all option ids)}
+        self.options = options
+        # {question_id: frozenset(correct option ids)}
+        self.correct_options = correct_options
+        # {question_id: text of the first correct option}
+        self.correct_text = correct_text
+
+    def __len__(self):
+        return len(self.correct_options)
+
+    def __contains__(self, question_id):
+        return question_id in self.correct_options
+
+    def correct_option_id(self, question_id):
+        correct = self.correct_options.get(question_id)
+        return min(correct) if correct else None
+
+    def correct_option_text(self, question_id):
+        return self.correct_text.get(question_id)
+
+
+def load_answer_key(quiz_id):
+    """Load the answer key of a quiz from the database in one query"""
+    rows = db.session.execute(
+        select(Question.id, Option.id, Option.text, Option.is_correct)
+        .outerjoin(Option, Option.question_id == Question.id)
+        .where(Question.quiz_id == quiz_id)
+        .order_by(Question.id, Option.id)
+    )
+
+    options = {}
+    correct_options = {}
+    correct_text = {}
+    for question_id, option_id, option_text, is_correct in rows:
+        question_options = options.setdefault(question_id, set())
+        correct = correct_options.setdefault(question_id, set())
+        if option_id is not None:
+            question_options.add(option_id)
+        if is_correct:
+            correct.add(option_id)
+            correct_text.setdefault(question_id, option_text)
+
+    return AnswerKey(
+        quiz_id,
+        {question_id: frozenset(ids) for question_id, ids in options.items()},
+        {question_id: frozenset(ids) for question_id, ids in correct_options.items()},
+        correct_text,
+    )
+
+
+def grade_answers(answer_key, answers):
+    """
+    Grade submitted answers against an answer key in memory.
+
+    Answers without a question or a selected option are skipped, like an
+    unanswered question. Questions and options that are not part of the
+    quiz raise InvalidSubmission, before anything is written. Returns the
+    graded answers and the correct count.
+    """
+    graded = []
+    correct_answers = 0
+
+    for answer in answers:
+        question_id = answer.get("question_id")
+        selected_option_id = answer.get("selected_option_id")
+
+        if not question_id or not selected_option_id:
+            continue
+
+        if question_id not in answer_key:
+            raise InvalidSubmission(question_id)
+        if selected_option_id not in answer_key.options[question_id]:
+            raise InvalidSubmission(question_id, selected_option_id)
+        correct_options = answer_key.correct_options[question_id]
+
+        is_correct = selected_option_id in correct_options
+        if is_correct:
+            correct_answers += 1
+
+        graded.append(
+            {
+                "question_id": question_id,
+                "selected_option": selected_option_id,
+                "is_correct": is_correct,
+                "correct_option": answer_key.correct_option_id(question_id),
+            }
+        )
+
+    return graded, correct_answers
+
+
+def save_user_answers(result_id, graded):
+    """Bulk insert graded answers for a quiz result with a single executemany"""
+    if not graded:
+        return
+
+    db.session.execute(
+        insert(UserAnswer),
+        [
+            {
+                "result_id": result_id,
+                "question_id": answer["question_id"],
+                "selected_option": answer["selected_option"],
+                "is_correct": answer["is_correct"],
+            }
+            for answer in graded
+        ],
+    )
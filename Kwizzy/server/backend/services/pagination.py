@@ -0,0 +1,98 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is the sort key of the last row of a page, encoded as an opaque
+URL-safe token. The next page is everything strictly after that key, which
+an index on the sort columns serves in constant time at any depth.
+"""
+
+import base64
+import json
+from datetime import date, datetime, timedelta
+from flask import request
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def get_page_size(default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Read page_size from the query string, capped at maximum"""
+    page_size = request.args.get("page_size", default, type=int)
+    return max(1, min(page_size, maximum))
+
+
+def encode_cursor(*values):
+    """Encode the sort key of the last row of a page"""
+    values = [
+        value.isoformat() if isinstance(value, (date, datetime)) else value
+        for value in values
+    ]
+    token = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(token).decode().rstrip("=")
+
+
+def decode_cursor(cursor, *types):
+    """
+    Decode a cursor into its sort key, converting each value with the
+    matching entry of types (datetime values are parsed from ISO format).
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise InvalidCursor("Malformed cursor")
+        return [
+            (
+                None
+                if value is None
+                else (
+                    datetime.fromisoformat(value)
+                    if value_type is datetime
+                    else value_type(value)
+                )
+            )
+            for value, value_type in zip(values, types)
+        ]
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Malformed cursor") from e
+
+
+def get_cursor(*types):
+    """Decode the cursor query parameter, or return None on the first page"""
+    cursor = request.args.get("cursor")
+    return decode_cursor(cursor, *types) if cursor else None
+
+
+def date_range_filters(column):
+    """
+    Filters on column from the date_from and date_to query parameters
+    (YYYY-MM-DD, both inclusive). Raises ValueError on malformed dates.
+    """
+    filters = []
+    date_from = request.args.get("date_from")
+    if date_from:
+        filters.append(column >= datetime.strptime(date_from, "%Y-%m-%d"))
+
+    date_to = request.args.get("date_to")
+    if date_to:
+        filters.append(
+            column < datetime.strptime(date_to, "%Y-%m-%d") + timedelta(days=1)
+        )
+    return filters
+
+
+def paginate_rows(rows, page_size, cursor_key):
+    """
+    Split rows fetched with limit(page_size + 1) into a page and the cursor
+    of the next page (None on the last page). cursor_key maps a row to its
+    sort key.
+    """
+    rows = list(rows)
+    has_more = len(rows) > page_size
+    page = rows[:page_size]
+    next_cursor = encode_cursor(*cursor_key(page[-1])) if has_more else None
+    return page, next_cursor
@@ -0,0 +1,184 @@
+"""
+Password hashing off the request thread.
+
+Hashing and verifying passwords is deliberately slow, CPU-bound work. Run
+on a request thread it holds the GIL and starves every other request served
+by the same process, so Login and Register hand it to a small process pool
+instead.
+
+The pool admits at most workers + queue_limit jobs at a time. A request
+that finds it full fails fast with HashingBusy (the API answers 503 with
+Retry-After) rather than queueing behind a login storm.
+
+Pool workers also run at a lower scheduling priority (PASSWORD_HASH_NICE),
+so when logins and other requests compete for the same cores the kernel
+serves the requests first.
+
+Background jobs hash in bulk with bulk_password_hasher.hash_many, which
+spreads a batch over a pool with a worker per core and is not subject to
+the admission limit.
+
+Hashes use PASSWORD_HASH_METHOD. A successful login with a hash made by any
+other method or work factor is rehashed in the same job, so raising the work
+factor only needs a config change.
+"""
+
+import os
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from functools import lru_cache
+from itertools import repeat
+from threading import BoundedSemaphore, Lock
+from werkzeug.security import generate_password_hash, check_password_hash
+
+logger = logging.getLogger(__name__)
+
+RETRY_AFTER = 1
+
+
+class HashingBusy(RuntimeError):
+    pass
+
+
+@lru_cache(maxsize=None)
+def method_prefix(method):
+    """The parameter prefix werkzeug writes for method, e.g. scrypt:32768:8:1"""
+    return generate_password_hash("", method).split("$", 1)[0]
+
+
+def lower_priority(increment):
+    """Pool initializer: yield the CPU to request handling processes"""
+    try:
+        os.nice(increment)
+    except (AttributeError, OSError) as e:
+        logger.warning(f"Could not lower password hashing priority: {str(e)}")
+
+
+def hash_job(password, method):
+    return generate_password_hash(password, method)
+
+
+def verify_job(stored, password, method):
+    """Return (matches, new hash if the stored one is outdated)"""
+    if not check_password_hash(stored, password):
+        return False, None
+    if stored.split("$", 1)[0] != method_prefix(method):
+        return True, generate_password_hash(password, method)
+    return True, None
+
+
+class PasswordHasher:
+    def __init__(
+        self, workers=2, queue_limit=8, method="scrypt", timeout=10, niceness=10
+    ):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.method = method
+        self.timeout = timeout
+        self.niceness = niceness
+        self._slots = BoundedSemaphore(workers + queue_limit)
+        self._lock = Lock()
+        self._executor = None
+        self._pid = None
+        self.jobs = 0
+        self.rejected = 0
+        self.rehashed = 0
+
+    def _get_executor(self):
+        # A forked server worker must not reuse its parent's pool
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context(
+                    "fork" if "fork" in methods else None
+                )
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=context,
+                    initializer=lower_priority if self.niceness else None,
+                    initargs=(self.niceness,),
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, job, *args):
+        if not self.workers:
+            return job(*args)
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashingBusy("Too many logins in progress, please retry shortly")
+        try:
+            future = self._get_executor().submit(job, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        with self._lock:
+            self.jobs += 1
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise HashingBusy("Password hashing timed out, please retry shortly")
+
+    def hash(self, password):
+        """Hash a new password with the configured method"""
+        return self._run(hash_job, password, self.method)
+
+    def hash_many(self, passwords):
+        """Hash a batch of passwords across every pool worker, in order"""
+        if not self.workers:
+            return [hash_job(password, self.method) for password in passwords]
+        # A few chunks per worker keeps them all busy to the end of the batch
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        hashes = list(
+            self._get_executor().map(
+                hash_job, passwords, repeat(self.method), chunksize=chunksize
+            )
+        )
+        with self._lock:
+            self.jobs += len(hashes)
+        return hashes
+
+    def verify(self, stored, password):
+        """
+        Check password against a stored hash. Returns (matches, new_hash);
+        new_hash is set when the stored hash should be replaced.
+        """
+        matches, new_hash = self._run(verify_job, stored, password, self.method)
+        if new_hash:
+            with self._lock:
+                self.rehashed += 1
+        return matches, new_hash
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "jobs": self.jobs,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+        }
+
+
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+
+password_hasher = PasswordHasher(
+    workers=HASH_WORKERS,
+    # Enough to absorb a burst, short enough that a queued login still
+    # finishes within a couple of seconds
+    queue_limit=int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", 4 * HASH_WORKERS)),
+    method=os.getenv("PASSWORD_HASH_METHOD", "scrypt"),
+    timeout=float(os.getenv("PASSWORD_HASH_TIMEOUT", 10)),
+    niceness=int(os.getenv("PASSWORD_HASH_NICE", 10)),
+)
+
+# Used by Celery jobs such as student provisioning, outside any request
+bulk_password_hasher = PasswordHasher(
+    workers=int(os.getenv("PASSWORD_HASH_BULK_WORKERS", os.cpu_count() or 1)),
+    queue_limit=0,
+    method=password_hasher.method,
+    niceness=password_hasher.niceness,
+)
@@ -0,0 +1,140 @@
+"""
+Pre-serialized quiz delivery payloads.
+
+A quiz's questions and options are serialized to JSON once per quiz content
+version, in two variants: answers stripped for students and with is_correct
+for admins. Writers already bump the version through answer_keys.invalidate()
+after QuizApi, QuestionApi and OptionApi commits, so a payload is rebuilt
+only after its quiz changes. Serving a quiz then costs two cache reads and
+the caller's has_attempted lookup.
+
+The version also makes up the quiz's ETag, so a client revalidating an
+unchanged quiz gets a 304 without the payload being read at all.
+"""
+
+import json
+from threading import Lock
+from flask import Response
+from sqlalchemy.orm import selectinload
+from .. import db, cache
+from ..models import Quiz, Question
+from ..utils import format_duration
+from .response_cache import validators
+
+PAYLOAD_TIMEOUT = 24 * 3600
+PUBLIC = "public"
+WITH_ANSWERS = "answers"
+
+
+class QuizNotFound(LookupError):
+    pass
+
+
+class DeliveryStats:
+    def __init__(self):
+        self._lock = Lock()
+        self.hits = 0
+        self.builds = 0
+
+    def record(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self):
+        lookups = self.hits + self.builds
+        return {
+            "hits": self.hits,
+            "builds": self.builds,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+        }
+
+
+delivery_stats = DeliveryStats()
+
+
+def serialize_quiz(quiz, include_answers):
+    return {
+        "id": quiz.id,
+        "name": quiz.name,
+        "description": quiz.description,
+        "price": quiz.price,
+        "chapter_id": quiz.chapter_id,
+        "time_duration": format_duration(quiz.time_duration),
+        "one_attempt_only": quiz.one_attempt_only,
+        "deadline": (
+            quiz.deadline.strftime("%d-%m-%Y %H:%M") if quiz.deadline else None
+        ),
+        "questions": [
+            {
+                "id": question.id,
+                "title": question.title,
+                "text": question.text,
+                "options": [
+                    {
+                        "id": option.id,
+                        "text": option.text,
+                        "is_correct": option.is_correct if include_answers else None,
+                    }
+                    for option in question.options
+                ],
+            }
+            for question in quiz.questions
+        ],
+    }
+
+
+def build_payloads(quiz_id):
+    """Serialize both variants of a quiz; returns {variant: JSON bytes}"""
+    quiz = db.session.get(
+        Quiz,
+        quiz_id,
+        options=[selectinload(Quiz.questions).selectinload(Question.options)],
+        populate_existing=True,
+    )
+    if quiz is None:
+        raise QuizNotFound(quiz_id)
+    return {
+        variant: json.dumps(
+            serialize_quiz(quiz, variant == WITH_ANSWERS), separators=(",", ":")
+        ).encode()
+        for variant in (PUBLIC, WITH_ANSWERS)
+    }
+
+
+def get_quiz_payload(quiz_id, version, include_answers=False):
+    """
+    Return the JSON bytes of a quiz at the given content version, building
+    and caching both variants on a miss. Raises QuizNotFound for unknown
+    quizzes.
+    """
+    variant = WITH_ANSWERS if include_answers else PUBLIC
+    key = f"quiz_payload:{quiz_id}:{version}:{{}}"
+
+    payload = cache.get(key.format(variant))
+    if payload is not None:
+        delivery_stats.record("hits")
+        return payload
+
+    delivery_stats.record("builds")
+    payloads = build_payloads(quiz_id)
+    cache.set_many(
+        {key.format(name): body for name, body in payloads.items()},
+        timeout=PAYLOAD_TIMEOUT,
+    )
+    return payloads[variant]
+
+
+def quiz_etag(quiz_id, version, include_answers, has_attempted):
+    variant = WITH_ANSWERS if include_answers else PUBLIC
+    return f"quiz-{quiz_id}-{version}-{variant}-{int(bool(has_attempted))}"
+
+
+def quiz_response(payload, has_attempted, etag):
+    """Splice the caller's has_attempted flag into a cached payload"""
+    flag = b',"has_attempted":' + (b"true" if has_attempted else b"false") + b"}"
+    return Response(
+        payload[:-1] + flag,
+        status=200,
+        mimetype="application/json",
+        headers=validators(etag),
+    )
@@ -0,0 +1,239 @@
+"""
+Set-based quiz question edits.
+
+QuizApi.put receives the full list of a quiz's questions and options. The
+editor reads the stored questions and options with two queries, diffs them
+against the submitted document in memory, and applies the result with a
+handful of bulk statements:
+
+    DELETE questions / options that were left out (the database cascades
+    to their options and user answers, and nulls selected options),
+    executemany UPDATEs for changed rows, and executemany INSERTs for new
+    ones.
+
+All reads and validation happen before the first write, so the write
+transaction (and SQLite's write lock) only spans the bulk statements.
+"""
+
+from sqlalchemy import select, insert, update, delete, bindparam
+from .. import db
+from ..models import Question, Option
+
+question_table = Question.__table__
+option_table = Option.__table__
+
+
+class InvalidQuizDocument(ValueError):
+    pass
+
+
+def load_questions(quiz_id):
+    """Stored questions of a quiz as {id: {"title", "text", "options"}}"""
+    questions = {
+        row.id: {"title": row.title, "text": row.text, "options": {}}
+        for row in db.session.execute(
+            select(Question.id, Question.title, Question.text).where(
+                Question.quiz_id == quiz_id
+            )
+        )
+    }
+    if questions:
+        rows = db.session.execute(
+            select(Option.id, Option.question_id, Option.text, Option.is_correct)
+            .join(Question, Question.id == Option.question_id)
+            .where(Question.quiz_id == quiz_id)
+        )
+        for row in rows:
+            questions[row.question_id]["options"][row.id] = {
+                "text": row.text,
+                "is_correct": bool(row.is_correct),
+            }
+    return questions
+
+
+def parse_document(questions):
+    """Validate submitted questions, returning them in a normalised form"""
+    if not isinstance(questions, list):
+        raise InvalidQuizDocument("questions must be a list")
+
+    parsed = []
+    for q_data in questions:
+        if not isinstance(q_data, dict) or not q_data.get("text"):
+            raise InvalidQuizDocument("Every question needs text")
+        options = q_data.get("options")
+        if not isinstance(options, list) or not all(
+            isinstance(opt, dict) and "text" in opt for opt in options
+        ):
+            raise InvalidQuizDocument(f"Question '{q_data['text']}' needs options")
+        options = [
+            {
+                "id": opt.get("id"),
+                "text": opt["text"],
+                "is_correct": bool(opt.get("is_correct")),
+            }
+            for opt in options
+        ]
+        if not any(opt["is_correct"] for opt in options):
+            raise InvalidQuizDocument(
+                f"Question '{q_data['text']}' must have at least one correct option"
+            )
+        parsed.append(
+            {
+                "id": q_data.get("id"),
+                "title": q_data.get("title"),
+                "text": q_data["text"],
+                "options": options,
+            }
+        )
+    return parsed
+
+
+class QuizDiff:
+    """The changes that turn the stored questions into the submitted ones"""
+
+    def __init__(self, stored, submitted):
+        self.deleted_questions = []
+        self.updated_questions = []
+        self.new_questions = []
+        self.unchanged_questions = 0
+        self.deleted_options = []
+        self.updated_options = []
+        self.new_options = []
+        self.unchanged_options = 0
+
+        kept = set()
+        for question in submitted:
+            existing = stored.get(question["id"])
+            if existing is None or question["id"] in kept:
+                # Unknown ids (and repeats) are created, as before
+                self.new_questions.append(question)
+                continue
+            kept.add(question["id"])
+            if (question["title"], question["text"]) != (
+                existing["title"],
+                existing["text"],
+            ):
+                self.updated_questions.append(
+                    {
+                        "b_id": question["id"],
+                        "title": question["title"],
+                        "text": question["text"],
+                    }
+                )
+            else:
+                self.unchanged_questions += 1
+            self.diff_options(question, existing["options"])
+
+        self.deleted_questions = [qid for qid in stored if qid not in kept]
+
+    def diff_options(self, question, stored_options):
+        kept = set()
+        for option in question["options"]:
+            existing = stored_options.get(option["id"])
+            if existing is None or option["id"] in kept:
+                self.new_options.append(
+                    {
+                        "question_id": question["id"],
+                        "text": option["text"],
+                        "is_correct": option["is_correct"],
+                    }
+                )
+                continue
+            kept.add(option["id"])
+            if (option["text"], option["is_correct"]) != (
+                existing["text"],
+                existing["is_correct"],
+            ):
+                self.updated_options.append(
+                    {
+                        "b_id": option["id"],
+                        "text": option["text"],
+                        "is_correct": option["is_correct"],
+                    }
+                )
+            else:
+                self.unchanged_options += 1
+        self.deleted_options.extend(oid for oid in stored_options if oid not in kept)
+
+    @property
+    def changed(self):
+        return bool(
+            self.deleted_questions
+            or self.updated_questions
+            or self.new_questions
+            or self.deleted_options
+            or self.updated_options
+            or self.new_options
+        )
+
+    def summary(self):
+        return {
+            "questions": {
+                "added": len(self.new_questions),
+                "updated": len(self.updated_questions),
+                "deleted": len(self.deleted_questions),
+                "unchanged": self.unchanged_questions,
+            },
+            "options": {
+                "added": len(self.new_options)
+                + sum(len(q["options"]) for q in self.new_questions),
+                "updated": len(self.updated_options),
+                "deleted": len(self.deleted_options),
+                "unchanged": self.unchanged_options,
+            },
+        }
+
+    def apply(self, quiz_id):
+        """Issue the bulk statements; the caller commits"""
+        if self.deleted_questions:
+            db.session.execute(
+                delete(question_table).where(
+                    question_table.c.id.in_(self.deleted_questions)
+                )
+            )
+        if self.deleted_options:
+            db.session.execute(
+                delete(option_table).where(option_table.c.id.in_(self.deleted_options))
+            )
+        if self.updated_questions:
+            db.session.execute(
+                update(question_table)
+                .where(question_table.c.id == bindparam("b_id"))
+                .values(title=bindparam("title"), text=bindparam("text")),
+                self.updated_questions,
+            )
+        if self.updated_options:
+            db.session.execute(
+                update(option_table)
+                .where(option_table.c.id == bindparam("b_id"))
+                .values(text=bindparam("text"), is_correct=bindparam("is_correct")),
+                self.updated_options,
+            )
+
+        new_options = list(self.new_options)
+        if self.new_questions:
+            question_ids = db.session.scalars(
+                insert(question_table).returning(
+                    question_table.c.id, sort_by_parameter_order=True
+                ),
+                [
+                    {"quiz_id": quiz_id, "title": q["title"], "text": q["text"]}
+                    for q in self.new_questions
+                ],
+            ).all()
+            new_options.extend(
+                {
+                    "question_id": question_id,
+                    "text": option["text"],
+                    "is_correct": option["is_correct"],
+                }
+                for question_id, question in zip(question_ids, self.new_questions)
+                for option in question["options"]
+            )
+        if new_options:
+            db.session.execute(insert(option_table), new_options)
+
+
+def diff_quiz(quiz_id, questions):
+    """Validate submitted questions and diff them against the stored quiz"""
+    return QuizDiff(load_questions(quiz_id), parse_document(questions))
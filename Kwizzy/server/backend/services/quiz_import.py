@@ -0,0 +1,207 @@
+"""
+Bulk quiz import.
+
+Every record describes one question together with the quiz it belongs to:
+
+    chapter_id, quiz_name, quiz_description, time_duration (HH:MM), price,
+    one_attempt_only, deadline, question_title, question_text, and either
+    option_1 ... option_N plus correct_option (1-based), or, in JSONL,
+    options: [{"text": ..., "is_correct": ...}, ...]
+
+Records sharing (chapter_id, quiz_name) form one quiz; its settings are
+read from its first record. Each question must have exactly one correct
+option. Valid records are inserted in batches of Core executemany
+statements, one committed transaction per batch.
+"""
+
+from sqlalchemy import select, insert
+from .. import db
+from ..models import Chapter, Quiz, Question, Option
+from .bulk_import import (
+    IMPORT_BATCH_SIZE,
+    BatchImporter,
+    parse_bool,
+    register_importer,
+    require_text,
+)
+from .response_cache import invalidate_tags
+from .answer_keys import answer_keys
+
+MAX_OPTIONS = 10
+
+# Plain tables rather than the mapped classes: Core executemany skips the
+# ORM's per-row bulk bookkeeping
+quiz_table = Quiz.__table__
+question_table = Question.__table__
+option_table = Option.__table__
+# Quiz lists report question counts; chapters and subjects their quiz counts
+IMPORT_TAGS = ("quizzes", "chapters", "subjects")
+
+
+def parse_duration(value):
+    """HH:MM to seconds, like QuizApi.post"""
+    hours, minutes = map(int, str(value).split(":"))
+    return hours * 3600 + minutes * 60
+
+
+def parse_quiz(record, chapter_ids):
+    """Validate the quiz settings of a record into Quiz column values"""
+    try:
+        chapter_id = int(record.get("chapter_id"))
+    except (TypeError, ValueError):
+        raise ValueError("chapter_id must be an integer")
+    if chapter_id not in chapter_ids:
+        raise ValueError(f"Chapter {chapter_id} not found")
+
+    try:
+        time_duration = parse_duration(record.get("time_duration") or "00:00")
+    except ValueError:
+        raise ValueError("time_duration must be HH:MM")
+
+    try:
+        price = int(record.get("price") or 0)
+    except (TypeError, ValueError):
+        raise ValueError("price must be an integer")
+
+    deadline = record.get("deadline")
+    return {
+        "name": require_text(record, "quiz_name", 50),
+        "description": require_text(record, "quiz_description", 120),
+        "chapter_id": chapter_id,
+        "time_duration": time_duration,
+        "price": price,
+        "one_attempt_only": parse_bool(record.get("one_attempt_only"), True),
+        "deadline": Quiz.parse_deadline(deadline) if deadline else None,
+    }
+
+
+def parse_options(record):
+    """Return [(text, is_correct)], checking there is exactly one correct option"""
+    if "options" in record:
+        options = record["options"]
+        if not isinstance(options, list):
+            raise ValueError("options must be a list")
+        parsed = [
+            (
+                str(option.get("text", "")).strip(),
+                parse_bool(option.get("is_correct"), False),
+            )
+            for option in options
+            if isinstance(option, dict)
+        ]
+        if len(parsed) != len(options):
+            raise ValueError("Each option must be an object with text and is_correct")
+    else:
+        texts = [
+            str(record.get(f"option_{i}") or "").strip()
+            for i in range(1, MAX_OPTIONS + 1)
+        ]
+        texts = [text for text in texts if text]
+        try:
+            correct = int(record.get("correct_option"))
+        except (TypeError, ValueError):
+            raise ValueError("correct_option must be the number of an option")
+        parsed = [(text, i == correct) for i, text in enumerate(texts, start=1)]
+
+    if len(parsed) < 2:
+        raise ValueError("A question needs at least two options")
+    if any(not text for text, _ in parsed):
+        raise ValueError("Options cannot be empty")
+    correct_count = sum(is_correct for _, is_correct in parsed)
+    if correct_count != 1:
+        raise ValueError(
+            f"A question must have exactly one correct option, found {correct_count}"
+        )
+    return parsed
+
+
+@register_importer
+class QuizImporter(BatchImporter):
+    name = "quizzes"
+
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE, progress=None):
+        super().__init__(batch_size, progress)
+        self.chapter_ids = set(db.session.scalars(select(Chapter.id)))
+        # (chapter_id, quiz name) -> id of quizzes created by this import
+        self.quiz_ids = {}
+        # (chapter_id, quiz name) -> row on which an invalid quiz was rejected
+        self.rejected = {}
+        self.new_quizzes = {}
+
+    def add(self, record, line_number):
+        key = (
+            str(record.get("chapter_id")).strip(),
+            str(record.get("quiz_name")).strip(),
+        )
+        if key in self.rejected:
+            raise ValueError(f"Quiz was rejected on row {self.rejected[key]}")
+
+        question = {
+            "title": require_text(record, "question_title", 100, required=False),
+            "text": require_text(record, "question_text", 255),
+        }
+        options = parse_options(record)
+
+        if key not in self.quiz_ids and key not in self.new_quizzes:
+            try:
+                self.new_quizzes[key] = parse_quiz(record, self.chapter_ids)
+            except ValueError:
+                self.rejected[key] = line_number
+                raise
+        self.pending.append((key, question, options))
+
+    def write_batch(self):
+        try:
+            if self.new_quizzes:
+                keys = list(self.new_quizzes)
+                ids = db.session.scalars(
+                    insert(quiz_table).returning(
+                        quiz_table.c.id, sort_by_parameter_order=True
+                    ),
+                    [self.new_quizzes[key] for key in keys],
+                ).all()
+                self.quiz_ids.update(zip(keys, ids))
+
+            question_ids = db.session.scalars(
+                insert(question_table).returning(
+                    question_table.c.id, sort_by_parameter_order=True
+                ),
+                [
+                    {"quiz_id": self.quiz_ids[key], **question}
+                    for key, question, _ in self.pending
+                ],
+            ).all()
+            option_rows = [
+                {"question_id": question_id, "text": text, "is_correct": is_correct}
+                for question_id, (_, _, options) in zip(question_ids, self.pending)
+                for text, is_correct in options
+            ]
+            db.session.execute(insert(option_table), option_rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            for key in self.new_quizzes:
+                self.quiz_ids.pop(key, None)
+            raise
+
+        # Core inserts bypass the session hooks of the response cache, and a
+        # later batch may fail, so invalidate what this batch committed now
+        invalidate_tags(*IMPORT_TAGS)
+        # Quizzes from earlier batches may already be cached without the
+        # questions this batch added to them
+        for key in {key for key, _, _ in self.pending} - set(self.new_quizzes):
+            answer_keys.invalidate(self.quiz_ids[key])
+
+        self.report.count("quizzes", len(self.new_quizzes))
+        self.report.count("questions", len(question_ids))
+        self.report.count("options", len(option_rows))
+        self.new_quizzes = {}
+
+
+def import_quizzes(stream, fmt, batch_size=IMPORT_BATCH_SIZE, progress=None):
+    """
+    Import quizzes from a CSV or JSONL text stream and return a report of
+    what was created and which rows were rejected. progress, if given, is
+    called with the report so far after every committed batch.
+    """
+    return QuizImporter(batch_size, progress).run(stream, fmt)
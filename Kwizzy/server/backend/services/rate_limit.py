@@ -0,0 +1,213 @@
+"""
+Request rate limiting.
+
+RATE_LIMITS in the config maps a route name to its rules. Each rule is
+(scope, capacity, period): every client of the scope gets a token bucket of
+capacity requests, refilled evenly over period seconds. A request takes one
+token from each of its buckets and is refused with a 429 when any of them
+is empty. Scopes are
+
+    ip      the client address (request.remote_addr; run behind ProxyFix
+            when a reverse proxy sits in front of the app)
+    user    the JWT identity; skipped when the request carries no token
+
+Buckets live in Redis so all workers share them. One Lua script refills,
+checks and takes from every bucket of a request atomically, against the
+Redis clock. When Redis cannot be reached the limiter falls back to buckets
+in this process and tries Redis again after REDIS_RETRY_INTERVAL seconds;
+limits then apply per worker rather than across them.
+RATE_LIMIT_STORAGE=memory keeps the buckets in process from the start.
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from functools import wraps
+import redis
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ratelimit"
+REDIS_RETRY_INTERVAL = 30
+
+# KEYS: one bucket per rule; ARGV: capacity and period (ms) of each rule.
+# Returns {allowed, milliseconds until a token is available}
+TOKEN_BUCKET_SCRIPT = """
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local levels = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local period = tonumber(ARGV[2 * i])
+    local bucket = redis.call("HMGET", key, "tokens", "updated")
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * capacity / period)
+    if tokens < 1 then
+        wait = math.max(wait, math.ceil((1 - tokens) * period / capacity))
+    end
+    levels[i] = tokens
+end
+if wait > 0 then
+    return {0, wait}
+end
+for i, key in ipairs(KEYS) do
+    redis.call("HSET", key, "tokens", tostring(levels[i] - 1), "updated", now)
+    -- A bucket left alone for a whole period is full again
+    redis.call("PEXPIRE", key, ARGV[2 * i])
+end
+return {1, 0}
+"""
+
+
+class LocalBuckets:
+    """The token bucket script over an in-process, LRU bounded dict"""
+
+    def __init__(self, maxsize=10_000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, buckets):
+        now = time.monotonic() * 1000
+        with self._lock:
+            levels = []
+            wait = 0
+            for key, capacity, period in buckets:
+                tokens, updated = self._buckets.get(key, (capacity, now))
+                tokens = min(capacity, tokens + (now - updated) * capacity / period)
+                if tokens < 1:
+                    wait = max(wait, math.ceil((1 - tokens) * period / capacity))
+                levels.append(tokens)
+            if wait:
+                return False, wait
+            for (key, _, _), tokens in zip(buckets, levels):
+                # Evicting a bucket refills it, so the bound errs on the lenient side
+                self._buckets[key] = (tokens - 1, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+            return True, 0
+
+
+class RateLimiter:
+    def __init__(self, storage="redis", local_maxsize=10_000):
+        self.storage = storage
+        self.client = None
+        self._script = None
+        self._local = LocalBuckets(local_maxsize)
+        self._redis_down_until = 0
+        self.counts = Counter()
+        self.redis_errors = 0
+        self.local_checks = 0
+
+    def get_client(self):
+        if self.client is None:
+            self.client = redis.Redis(
+                host=os.getenv("REDIS_HOST", "localhost"),
+                port=int(os.getenv("REDIS_PORT", 6379)),
+                db=int(os.getenv("REDIS_DB", 0)),
+                socket_timeout=0.2,
+                socket_connect_timeout=0.2,
+            )
+        return self.client
+
+    def take(self, buckets):
+        """
+        Take a token from each (key, capacity, period in ms) bucket if all
+        have one. Returns (allowed, milliseconds until they would).
+        """
+        if self.storage == "redis" and time.monotonic() >= self._redis_down_until:
+            try:
+                client = self.get_client()
+                if self._script is None:
+                    # Runs by EVALSHA, loading the script again after a flush
+                    self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+                args = []
+                for _, capacity, period in buckets:
+                    args += [capacity, period]
+                allowed, wait = self._script(
+                    keys=[key for key, _, _ in buckets], args=args, client=client
+                )
+                return bool(allowed), int(wait)
+            except redis.RedisError as e:
+                self.redis_errors += 1
+                self._redis_down_until = time.monotonic() + REDIS_RETRY_INTERVAL
+                logger.warning(f"Rate limiting in process, Redis failed: {str(e)}")
+        self.local_checks += 1
+        return self._local.take(buckets)
+
+    def hit(self, route, rules):
+        """Count a request against the rules of route; seconds to wait if refused"""
+        buckets = []
+        for scope, capacity, period in rules:
+            identity = scope_identity(scope)
+            if identity is not None:
+                key = f"{KEY_PREFIX}:{route}:{scope}:{identity}"
+                buckets.append((key, capacity, int(period * 1000)))
+        if not buckets:
+            return 0
+
+        allowed, wait = self.take(buckets)
+        if allowed:
+            self.counts[route, "allowed"] += 1
+            return 0
+        self.counts[route, "limited"] += 1
+        return max(1, math.ceil(wait / 1000))
+
+    def stats(self):
+        routes = {}
+        for (route, outcome), count in self.counts.items():
+            routes.setdefault(route, {"allowed": 0, "limited": 0})[outcome] = count
+        redis_up = (
+            self.storage == "redis" and time.monotonic() >= self._redis_down_until
+        )
+        return {
+            "storage": "redis" if redis_up else "memory",
+            "routes": routes,
+            "redis_errors": self.redis_errors,
+            "local_checks": self.local_checks,
+        }
+
+
+def scope_identity(scope):
+    if scope == "ip":
+        return request.remote_addr
+    if scope == "user":
+        try:
+            return get_jwt_identity()
+        except RuntimeError:
+            # No @jwt_required ran for this request
+            return None
+    raise ValueError(f"Unknown rate limit scope '{scope}'")
+
+
+rate_limiter = RateLimiter(storage=os.getenv("RATE_LIMIT_STORAGE", "redis").lower())
+
+
+def rate_limit(route):
+    """Refuse requests over the RATE_LIMITS policy of route with a 429"""
+
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            rules = current_app.config["RATE_LIMITS"].get(route)
+            if rules and current_app.config["RATE_LIMIT_ENABLED"]:
+                retry_after = rate_limiter.hit(route, rules)
+                if retry_after:
+                    return (
+                        {"message": "Too many requests, please try again later"},
+                        429,
+                        {"Retry-After": str(retry_after)},
+                    )
+            return fn(*args, **kwargs)
+
+        return decorator
+
+    return wrapper
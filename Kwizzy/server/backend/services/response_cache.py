@@ -0,0 +1,194 @@
+"""
+Tag-invalidated response cache for Flask-RESTful resources.
+
+cached_response() caches the JSON body of successful GET responses. Keys are
+built from the endpoint, view arguments, query string and the caller's JWT
+role (and identity, unless the resource opts out), so admins and students,
+or two students, never share an entry.
+
+Each entry is also keyed by the version tokens of its tags ("subjects",
+"student:42", ...). Models list the tags they affect in cache_tags(); the
+session hooks below collect those tags during a flush and bump them once the
+transaction commits, which makes every dependent entry unreachable.
+
+Entries are stored with a strong ETag (a hash of the JSON body). Requests
+whose If-None-Match still holds it get an empty 304, so repeat views of an
+unchanged catalogue cost neither serialization nor bandwidth.
+"""
+
+import hashlib
+import json
+import logging
+from functools import wraps
+from string import Formatter
+from threading import Lock
+from flask import request, Response
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from .. import cache
+from .versions import get_versions, bump_version
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 300
+PENDING_TAGS = "cache_tags"
+# Responses depend on the bearer token, and must be revalidated before reuse
+CACHE_CONTROL = "private, no-cache"
+
+
+class ResponseCacheStats:
+    def __init__(self):
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def record(self, counter, amount=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+            "invalidated_tags": self.invalidations,
+        }
+
+
+response_cache_stats = ResponseCacheStats()
+
+
+def _format_tags(tags, values):
+    """
+    Fill the tag templates from the view arguments and the caller's identity.
+    Templates referring to a missing argument (e.g. "student:{student_id}" on
+    the list route) are skipped.
+    """
+    resolved = []
+    for tag in tags:
+        fields = [field for _, field, _, _ in Formatter().parse(tag) if field]
+        if all(values.get(field) is not None for field in fields):
+            resolved.append(tag.format(**values))
+    return resolved
+
+
+def _cache_key(tags, per_user):
+    claims = get_jwt()
+    scope = [claims.get("role")]
+    if per_user:
+        scope.append(get_jwt_identity())
+
+    versions = get_versions("tag", tags)
+    fingerprint = json.dumps(
+        [
+            request.path,
+            sorted(request.args.items(multi=True)),
+            scope,
+            [versions[tag] for tag in tags],
+        ],
+        separators=(",", ":"),
+    )
+    digest = hashlib.sha1(fingerprint.encode()).hexdigest()
+    return f"response:{request.endpoint}:{digest}"
+
+
+def payload_etag(body):
+    """Strong ETag of a JSON-serializable body"""
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+
+def validators(etag):
+    """Headers that let clients cache a response and revalidate it"""
+    return {"ETag": f'"{etag}"', "Cache-Control": CACHE_CONTROL}
+
+
+def not_modified(etag):
+    """A 304 response if the request's If-None-Match holds etag, else None"""
+    if request.if_none_match.contains_weak(etag):
+        return Response(status=304, headers=validators(etag))
+    return None
+
+
+def conditional_response(body, etag):
+    response = not_modified(etag)
+    if response is not None:
+        return response
+    return body, 200, validators(etag)
+
+
+def cached_response(*tags, timeout=DEFAULT_TIMEOUT, per_user=True):
+    """
+    Cache the 200 responses of a resource method and answer conditional
+    requests for them. Apply it below
+    @jwt_required(). Tags may use the view arguments and {identity}, e.g.
+    @cached_response("students", "student:{student_id}").
+
+    Pass per_user=False when the response only depends on the caller's role.
+    """
+
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            resolved = _format_tags(tags, {**kwargs, "identity": get_jwt_identity()})
+            try:
+                key = _cache_key(resolved, per_user)
+                cached = cache.get(key)
+            except Exception as e:
+                # A cache outage must not take the endpoint down with it
+                logger.error(f"Response cache unavailable: {str(e)}")
+                return fn(*args, **kwargs)
+
+            if cached is not None:
+                response_cache_stats.record("hits")
+                etag, body = cached
+                return conditional_response(body, etag)
+
+            response_cache_stats.record("misses")
+            result = fn(*args, **kwargs)
+            body, status = result[:2] if isinstance(result, tuple) else (result, 200)
+            if status != 200 or not isinstance(body, (dict, list)):
+                return result
+
+            etag = payload_etag(body)
+            cache.set(key, (etag, body), timeout=timeout)
+            return conditional_response(body, etag)
+
+        return decorator
+
+    return wrapper
+
+
+def invalidate_tags(*tags):
+    """Bump tags right away; for writes that bypass the ORM session"""
+    for tag in set(tags):
+        bump_version("tag", tag)
+    response_cache_stats.record("invalidations", len(set(tags)))
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_tags(session, flush_context):
+    tags = session.info.setdefault(PENDING_TAGS, set())
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        cache_tags = getattr(instance, "cache_tags", None)
+        if cache_tags is not None:
+            tags.update(tag for tag in cache_tags() if tag)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_tags(session):
+    tags = session.info.pop(PENDING_TAGS, None)
+    if tags:
+        try:
+            invalidate_tags(*tags)
+        except Exception as e:
+            logger.error(f"Could not invalidate cached responses: {str(e)}")
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_tags(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop(PENDING_TAGS, None)
@@ -0,0 +1,299 @@
+"""
+Full-text search over subjects, chapters, quizzes and questions.
+
+Every searchable row is mirrored into a search_index table: an FTS5 virtual
+table on SQLite, or a table with a weighted tsvector column and a GIN index
+on PostgreSQL. Database triggers keep the mirror current, so ORM writes,
+Core bulk statements and ON DELETE cascades are all covered without any
+application hooks. Installing the index fills it from the existing rows.
+
+An entry's id is (source row id) * len(SOURCES) + source code, which lets
+the triggers address it by primary key.
+
+A query ranks every matching entry and reads the requested page off the
+top, and snippets are only built for that page.
+"""
+
+import logging
+import re
+from sqlalchemy import text, bindparam, inspect
+from .. import db
+
+logger = logging.getLogger(__name__)
+
+# kind: (code, table, parent id column, title expression, body expression)
+SOURCES = {
+    "subject": (0, "subjects", "NULL", "{row}.name", "{row}.description"),
+    "chapter": (1, "chapters", "{row}.subject_id", "{row}.name", "{row}.description"),
+    "quiz": (2, "quizzes", "{row}.chapter_id", "{row}.name", "{row}.description"),
+    "question": (
+        3,
+        "questions",
+        "{row}.quiz_id",
+        "coalesce({row}.title, '')",
+        "{row}.text",
+    ),
+}
+SEARCH_KINDS = tuple(SOURCES)
+TITLE_WEIGHT = 10.0
+# The last word is matched as a prefix (search as you type) once it is this long
+MIN_PREFIX_LENGTH = 3
+SNIPPET_WORDS = 12
+WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class SearchUnavailable(RuntimeError):
+    pass
+
+
+def entry_values(kind, row):
+    """Column values of the index entry for a source row ('new' / 'old' / table)"""
+    code, _, parent, title, body = SOURCES[kind]
+    return {
+        "id": f"{row}.id * {len(SOURCES)} + {code}",
+        "kind": f"'{kind}'",
+        "entity_id": f"{row}.id",
+        "parent_id": parent.format(row=row),
+        "title": title.format(row=row),
+        "body": body.format(row=row),
+    }
+
+
+def search_terms(query):
+    """Words of a user query; punctuation never reaches the query syntax"""
+    return WORD.findall(query.lower())[:10]
+
+
+def prefix_term(term, prefix_format, exact_format):
+    if len(term) >= MIN_PREFIX_LENGTH:
+        return prefix_format.format(term)
+    return exact_format.format(term)
+
+
+def make_snippet(body, terms):
+    """
+    Up to SNIPPET_WORDS words of body around the first match, with matching
+    words wrapped in <b> tags. Built here rather than by the database, whose
+    highlighters re-read the whole match set for every row of a prefix query.
+    """
+    words = list(WORD.finditer(body or ""))
+    exact = set(terms[:-1])
+    prefix = terms[-1] if len(terms[-1]) >= MIN_PREFIX_LENGTH else None
+    if prefix is None:
+        exact.add(terms[-1])
+
+    def matches(word):
+        word = word.lower()
+        return word in exact or (prefix is not None and word.startswith(prefix))
+
+    if not words:
+        return ""
+    hit = next((i for i, word in enumerate(words) if matches(word.group())), 0)
+    # Lead in with a little context before the first match
+    first = max(0, min(hit - SNIPPET_WORDS // 4, len(words) - SNIPPET_WORDS))
+    window = words[first : first + SNIPPET_WORDS]
+    start, end = window[0].start(), window[-1].end()
+
+    parts, position = [], start
+    for word in window:
+        if matches(word.group()):
+            parts += [body[position : word.start()], f"<b>{word.group()}</b>"]
+            position = word.end()
+    parts.append(body[position:end])
+    prefix_dots = "..." if start > 0 else ""
+    suffix_dots = "..." if end < len(body.rstrip()) else ""
+    return prefix_dots + "".join(parts) + suffix_dots
+
+
+class SqliteSearch:
+    id_column = "rowid"
+
+    def install_statements(self):
+        yield (
+            "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+            "kind UNINDEXED, entity_id UNINDEXED, parent_id UNINDEXED, title, body, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4')"
+        )
+        # Rank by bm25 with titles weighted above bodies
+        yield (
+            "INSERT INTO search_index (search_index, rank) "
+            f"VALUES ('rank', 'bm25(0, 0, 0, {TITLE_WEIGHT}, 1)')"
+        )
+        for kind, (_, table, *_) in SOURCES.items():
+            old, new = entry_values(kind, "old"), entry_values(kind, "new")
+            insert = self.insert_entry(new)
+            delete = f"DELETE FROM search_index WHERE rowid = {old['id']};"
+            yield (
+                f"CREATE TRIGGER IF NOT EXISTS search_{table}_insert "
+                f"AFTER INSERT ON {table} BEGIN {insert} END"
+            )
+            yield (
+                f"CREATE TRIGGER IF NOT EXISTS search_{table}_update "
+                f"AFTER UPDATE ON {table} BEGIN {delete} {insert} END"
+            )
+            yield (
+                f"CREATE TRIGGER IF NOT EXISTS search_{table}_delete "
+                f"AFTER DELETE ON {table} BEGIN {delete} END"
+            )
+
+    def insert_entry(self, values):
+        return (
+            f"INSERT INTO search_index ({self.id_column}, {', '.join(list(values)[1:])}) "
+            f"VALUES ({', '.join(values.values())});"
+        )
+
+    def match_query(self, terms):
+        quoted = [f'"{term}"' for term in terms[:-1]]
+        return " ".join(quoted + [prefix_term(terms[-1], '"{}"*', '"{}"')])
+
+    def rank_statement(self, kinds):
+        kind_filter = "AND kind IN :kinds" if kinds else ""
+        # Rank every match, so page 1 holds the best; ties break on rowid so
+        # offset pages never overlap
+        return (
+            "SELECT rowid AS id, kind, entity_id, parent_id, title, -rank AS score "
+            f"FROM search_index WHERE search_index MATCH :query {kind_filter} "
+            "ORDER BY rank, rowid LIMIT :limit OFFSET :offset"
+        )
+
+    def body_statement(self):
+        return (
+            f"SELECT {self.id_column} AS id, body FROM search_index "
+            f"WHERE {self.id_column} IN :ids"
+        )
+
+
+class PostgresSearch(SqliteSearch):
+    id_column = "id"
+
+    def install_statements(self):
+        yield (
+            "CREATE TABLE IF NOT EXISTS search_index ("
+            "id bigint PRIMARY KEY, kind varchar(16) NOT NULL, "
+            "entity_id integer NOT NULL, parent_id integer, "
+            "title text NOT NULL, body text NOT NULL, "
+            "document tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('simple', title), 'A') || "
+            "setweight(to_tsvector('simple', body), 'B')) STORED)"
+        )
+        yield (
+            "CREATE INDEX IF NOT EXISTS ix_search_index_document "
+            "ON search_index USING GIN (document)"
+        )
+        for kind, (_, table, *_) in SOURCES.items():
+            insert = self.insert_entry(entry_values(kind, "NEW"))
+            old_id = entry_values(kind, "OLD")["id"]
+            yield (
+                f"CREATE OR REPLACE FUNCTION search_{table}_sync() RETURNS trigger AS $$ "
+                "BEGIN "
+                f"IF TG_OP <> 'INSERT' THEN DELETE FROM search_index WHERE id = {old_id}; "
+                "END IF; "
+                f"IF TG_OP <> 'DELETE' THEN {insert} END IF; "
+                "RETURN NULL; "
+                "END $$ LANGUAGE plpgsql"
+            )
+            yield f"DROP TRIGGER IF EXISTS search_{table}_sync ON {table}"
+            yield (
+                f"CREATE TRIGGER search_{table}_sync "
+                f"AFTER INSERT OR UPDATE OR DELETE ON {table} "
+                f"FOR EACH ROW EXECUTE FUNCTION search_{table}_sync()"
+            )
+
+    def match_query(self, terms):
+        return " & ".join(terms[:-1] + [prefix_term(terms[-1], "{}:*", "{}")])
+
+    def rank_statement(self, kinds):
+        kind_filter = "AND kind IN :kinds" if kinds else ""
+        return (
+            "SELECT id, kind, entity_id, parent_id, title, "
+            "ts_rank(document, to_tsquery('simple', :query)) AS score "
+            "FROM search_index "
+            f"WHERE document @@ to_tsquery('simple', :query) {kind_filter} "
+            "ORDER BY score DESC, id LIMIT :limit OFFSET :offset"
+        )
+
+
+BACKENDS = {"sqlite": SqliteSearch, "postgresql": PostgresSearch}
+
+
+def get_backend():
+    dialect = db.engine.dialect.name
+    if dialect not in BACKENDS:
+        raise SearchUnavailable(f"Full-text search is not supported on {dialect}")
+    return BACKENDS[dialect]()
+
+
+def install_search_index():
+    """
+    Create the index and its triggers if they do not exist yet. A new index
+    is filled from the source tables in the same transaction.
+    """
+    try:
+        backend = get_backend()
+    except SearchUnavailable as e:
+        logger.warning(str(e))
+        return
+    with db.engine.begin() as connection:
+        exists = inspect(connection).has_table("search_index")
+        for statement in backend.install_statements():
+            connection.exec_driver_sql(statement)
+        if not exists:
+            fill_search_index(backend, connection)
+
+
+def fill_search_index(backend, connection):
+    connection.exec_driver_sql("DELETE FROM search_index")
+    for kind, (_, table, *_) in SOURCES.items():
+        values = entry_values(kind, table)
+        columns = [backend.id_column, *list(values)[1:]]
+        connection.exec_driver_sql(
+            f"INSERT INTO search_index ({', '.join(columns)}) "
+            f"SELECT {', '.join(values.values())} FROM {table}"
+        )
+
+
+def rebuild_search_index():
+    """Refill the index from the source tables; returns the entry count"""
+    backend = get_backend()
+    with db.engine.begin() as connection:
+        fill_search_index(backend, connection)
+        return connection.exec_driver_sql("SELECT count(*) FROM search_index").scalar()
+
+
+def search(query, kinds=None, limit=20, offset=0):
+    """
+    Ranked hits for a free-text query, best first. Every word must match;
+    the last one may match as a prefix. Returns a list of dicts with kind, id, parent_id, title,
+    snippet and score.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    backend = get_backend()
+    query = backend.match_query(terms)
+    statement = text(backend.rank_statement(kinds))
+    params = {"query": query, "limit": limit, "offset": offset}
+    if kinds:
+        statement = statement.bindparams(bindparam("kinds", expanding=True))
+        params["kinds"] = list(kinds)
+    rows = db.session.execute(statement, params).all()
+    if not rows:
+        return []
+
+    bodies = dict(
+        db.session.execute(
+            text(backend.body_statement()).bindparams(bindparam("ids", expanding=True)),
+            {"ids": [row.id for row in rows]},
+        ).all()
+    )
+    return [
+        {
+            "kind": row.kind,
+            "id": row.entity_id,
+            "parent_id": row.parent_id,
+            "title": row.title,
+            "snippet": make_snippet(bodies.get(row.id), terms),
+            "score": round(float(row.score), 4),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,117 @@
+"""
+Batch serializers for quiz results.
+
+QuizResult.to_dict used to issue two option queries per answer. These
+helpers serialize a batch of already-loaded results and resolve every
+option text they need with a single query, emitting the same JSON.
+
+QuizResult.user_answers is never loaded by default. Queries pick one of two
+projections instead:
+
+    summary: the result's scores plus its quiz (and optionally chapter and
+    subject) names, one row per result. Touching user_answers raises, so a
+    list view cannot silently fall back to a query per result.
+
+    review: everything serialize_quiz_results reads, answers included, with
+    the answers fetched by a second IN query rather than joined.
+"""
+
+from sqlalchemy import select, or_, and_
+from sqlalchemy.orm import joinedload, selectinload, raiseload
+from .. import db
+from ..models import Chapter, Option, Quiz, QuizResult, Subject, UserAnswer
+from ..utils import format_ist_datetime
+
+
+def quiz_result_summary_options(with_subject=False):
+    """Loader options for list views that never read a result's answers"""
+    quiz = joinedload(QuizResult.quiz).load_only(Quiz.name, Quiz.chapter_id)
+    if with_subject:
+        quiz = (
+            quiz.joinedload(Quiz.chapter)
+            .load_only(Chapter.name, Chapter.subject_id)
+            .joinedload(Chapter.subject)
+            .load_only(Subject.name)
+        )
+    return quiz, raiseload(QuizResult.user_answers)
+
+
+def quiz_result_review_options():
+    """Loader options that load everything serialize_quiz_results reads"""
+    return (
+        joinedload(QuizResult.quiz),
+        selectinload(QuizResult.user_answers).joinedload(UserAnswer.question),
+    )
+
+
+def load_option_texts(answers):
+    """
+    Resolve option texts for a batch of answers in one query.
+
+    Returns ({option_id: text} for the selected options, {question_id: text}
+    of the first correct option of every answered question).
+    """
+    selected_ids = {a.selected_option for a in answers if a.selected_option}
+    question_ids = {a.question_id for a in answers}
+    if not question_ids:
+        return {}, {}
+
+    rows = db.session.execute(
+        select(Option.id, Option.question_id, Option.text, Option.is_correct)
+        .where(
+            or_(
+                Option.id.in_(selected_ids),
+                and_(Option.question_id.in_(question_ids), Option.is_correct.is_(True)),
+            )
+        )
+        .order_by(Option.id)
+    )
+
+    selected_text = {}
+    correct_text = {}
+    for option_id, question_id, text, is_correct in rows:
+        if option_id in selected_ids:
+            selected_text[option_id] = text
+        if is_correct:
+            correct_text.setdefault(question_id, text)
+    return selected_text, correct_text
+
+
+def serialize_user_answer(answer, selected_text, correct_text):
+    return {
+        "id": answer.id,
+        "result_id": answer.result_id,
+        "question_text": (
+            answer.question.text if answer.question else "Error loading question"
+        ),
+        "selected_option": answer.selected_option,
+        "selected_option_text": selected_text.get(answer.selected_option)
+        or "No answer selected",
+        "correct_option_text": correct_text.get(answer.question_id)
+        or "No correct option found",
+        "is_correct": answer.is_correct,
+    }
+
+
+def serialize_quiz_results(results):
+    """Serialize quiz results exactly like QuizResult.to_dict, in bulk"""
+    answers = [answer for result in results for answer in result.user_answers]
+    selected_text, correct_text = load_option_texts(answers)
+
+    return [
+        {
+            "id": result.id,
+            "quiz_id": result.quiz_id,
+            "user_id": result.user_id,
+            "marks_scored": result.marks_scored,
+            "total_marks": result.total_marks,
+            "completed_at_formatted": format_ist_datetime(result.completed_at),
+            "user_answers": [
+                serialize_user_answer(answer, selected_text, correct_text)
+                for answer in result.user_answers
+            ],
+            "quiz_name": result.quiz.name if result.quiz else None,
+            "quiz_description": result.quiz.description if result.quiz else None,
+        }
+        for result in results
+    ]
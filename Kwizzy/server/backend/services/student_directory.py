@@ -0,0 +1,213 @@
+"""
+Search, sort and count for the admin student directory.
+
+Search keeps the semantics of ILIKE '%term%' on name, email and
+qualification, but answers it from an index:
+
+    SQLite: an external-content FTS5 table over the students in users, with
+    the trigram tokenizer, kept current by triggers. A quoted phrase of three
+    or more characters matches exactly the rows containing it,
+    case-insensitively. The table is filled with the existing students when
+    it is first installed.
+
+    PostgreSQL: pg_trgm GIN indexes on the three columns, which the planner
+    uses for the ILIKE filter directly.
+
+Terms shorter than a trigram fall back to a plain ILIKE scan.
+
+Sorting is served by the (role, column, id) indexes on users. A page is
+read with one query that joins each student's attempt count and last
+activity, grouped from the analytics rollup rows of just that page. Totals are
+cached against the "students" response cache tag, so paging through the
+directory does not recount half a million rows per page.
+"""
+
+import logging
+from sqlalchemy import Integer, func, inspect, or_, select, text
+from .. import db, cache
+from ..models import User, StudentDailyStats
+from .versions import get_version
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("name", "email", "qualification")
+SORT_COLUMNS = ("name", "email", "qualification", "dob", "performance")
+PAGE_COLUMNS = ("id", "profile_pic") + SORT_COLUMNS
+TRIGRAM = 3
+# Up to this many matches, a page is sorted out of the index matches. Above
+# it matches are dense enough that walking the sort index and filtering with
+# ILIKE fills a page after a few hundred rows.
+SORT_MATCHES_LIMIT = 5000
+TOTAL_TIMEOUT = 300
+
+
+def sqlite_statements():
+    columns = ", ".join(COLUMNS)
+    new = ", ".join(f"new.{column}" for column in COLUMNS)
+    old = ", ".join(f"old.{column}" for column in COLUMNS)
+    insert = (
+        f"INSERT INTO student_directory (rowid, {columns}) "
+        f"SELECT new.id, {new} WHERE new.role = 'student';"
+    )
+    delete = (
+        f"INSERT INTO student_directory (student_directory, rowid, {columns}) "
+        f"SELECT 'delete', old.id, {old} WHERE old.role = 'student';"
+    )
+    yield (
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS student_directory USING fts5({columns}, "
+        "content = 'users', content_rowid = 'id', tokenize = 'trigram')"
+    )
+    yield (
+        "CREATE TRIGGER IF NOT EXISTS student_directory_insert "
+        f"AFTER INSERT ON users BEGIN {insert} END"
+    )
+    yield (
+        "CREATE TRIGGER IF NOT EXISTS student_directory_update "
+        f"AFTER UPDATE OF {columns}, role ON users BEGIN {delete} {insert} END"
+    )
+    yield (
+        "CREATE TRIGGER IF NOT EXISTS student_directory_delete "
+        f"AFTER DELETE ON users BEGIN {delete} END"
+    )
+
+
+def postgres_statements():
+    yield "CREATE EXTENSION IF NOT EXISTS pg_trgm"
+    for column in COLUMNS:
+        yield (
+            f"CREATE INDEX IF NOT EXISTS ix_users_{column}_trgm "
+            f"ON users USING GIN ({column} gin_trgm_ops)"
+        )
+
+
+INSTALLERS = {"sqlite": sqlite_statements, "postgresql": postgres_statements}
+
+
+def install_student_directory():
+    """
+    Create the directory index if it does not exist yet. A new SQLite index
+    is filled with the existing students in the same transaction.
+    """
+    dialect = db.engine.dialect.name
+    if dialect not in INSTALLERS:
+        logger.warning(f"No student directory index for {dialect}")
+        return
+    with db.engine.begin() as connection:
+        exists = inspect(connection).has_table("student_directory")
+        for statement in INSTALLERS[dialect]():
+            connection.exec_driver_sql(statement)
+        if dialect == "sqlite" and not exists:
+            fill_student_directory(connection)
+
+
+def fill_student_directory(connection):
+    # Not the FTS5 'rebuild' command, which would index every user, admins too
+    columns = ", ".join(COLUMNS)
+    connection.exec_driver_sql(
+        "INSERT INTO student_directory (student_directory) VALUES ('delete-all')"
+    )
+    connection.exec_driver_sql(
+        f"INSERT INTO student_directory (rowid, {columns}) "
+        f"SELECT id, {columns} FROM users WHERE role = 'student'"
+    )
+
+
+def rebuild_student_directory():
+    """Re-read every student into the SQLite directory index"""
+    if db.engine.dialect.name != "sqlite":
+        return
+    with db.engine.begin() as connection:
+        fill_student_directory(connection)
+
+
+def uses_trigram_table(search):
+    return db.engine.dialect.name == "sqlite" and len(search) >= TRIGRAM
+
+
+def _matches(search):
+    """Ids of the students matching search in the SQLite directory index"""
+    return (
+        text(
+            "SELECT rowid AS id FROM student_directory "
+            "WHERE student_directory MATCH :phrase"
+        )
+        .bindparams(phrase='"' + search.replace('"', '""') + '"')
+        .columns(id=Integer)
+        .subquery("matches")
+    )
+
+
+def _ilike(search):
+    return or_(*(getattr(User, column).ilike(f"%{search}%") for column in COLUMNS))
+
+
+def _count(search):
+    if search and uses_trigram_table(search):
+        return db.session.scalar(select(func.count()).select_from(_matches(search)))
+    query = select(func.count()).select_from(User).where(User.role == "student")
+    if search:
+        query = query.where(_ilike(search))
+    return db.session.scalar(query)
+
+
+def count_students(search=""):
+    """Number of students matching search, cached until a student changes"""
+    key = f"student_directory:total:{get_version('tag', 'students')}:{search}"
+    total = cache.get(key)
+    if total is None:
+        total = _count(search)
+        cache.set(key, total, timeout=TOTAL_TIMEOUT)
+    return total
+
+
+def _order(columns, sort_by, descending):
+    # Break ties on id so pages never overlap; the users indexes on
+    # (role, column, id) serve either direction
+    order = (getattr(columns, sort_by), columns.id)
+    return [column.desc() for column in order] if descending else order
+
+
+def find_students(search, sort_by, descending, limit, offset, total):
+    """
+    One page of the students matching search (all students if empty),
+    sorted by one of SORT_COLUMNS. total is the match count from
+    count_students, which picks the cheaper plan.
+
+    Rows carry PAGE_COLUMNS, attempts and last_completed_at.
+    """
+    query = select(*(getattr(User, column) for column in PAGE_COLUMNS))
+    if search and uses_trigram_table(search) and total <= SORT_MATCHES_LIMIT:
+        # The index holds only students. Filtering on role as well lets SQLite
+        # drive the join from the role index and run the MATCH once per student
+        matches = _matches(search)
+        query = query.join(matches, matches.c.id == User.id)
+    else:
+        query = query.where(User.role == "student")
+        if search:
+            query = query.where(_ilike(search))
+    page = (
+        query.order_by(*_order(User, sort_by, descending))
+        .limit(limit)
+        .offset(offset)
+        .subquery()
+    )
+
+    # Aggregate the rollup rows of just this page's students
+    def rollup(aggregate):
+        return (
+            select(aggregate)
+            .where(StudentDailyStats.user_id == page.c.id)
+            .scalar_subquery()
+        )
+
+    return db.session.execute(
+        select(
+            page,
+            func.coalesce(rollup(func.sum(StudentDailyStats.attempts)), 0).label(
+                "attempts"
+            ),
+            rollup(func.max(StudentDailyStats.last_completed_at)).label(
+                "last_completed_at"
+            ),
+        ).order_by(*_order(page.c, sort_by, descending))
+    ).all()
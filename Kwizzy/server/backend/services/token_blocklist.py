@@ -0,0 +1,238 @@
+"""
+JWT revocation.
+
+Revoked tokens live in Redis, in two sorted sets shared by every worker:
+
+    jwt:revoked_tokens  jti -> the token's expiry; logout revokes one token
+    jwt:revoked_users   user id -> cutoff; every token of that user issued
+                        before the cutoff is revoked (password reset, role
+                        change)
+
+Entries are dropped once no token they cover can still be valid.
+
+Asking Redis on every request would add a round trip to each call. Each
+worker instead keeps a copy of the (small) user cutoffs and a Bloom filter
+of the revoked jtis, both reloaded by a background thread whenever the sets'
+version counter moves (checked every JWT_BLOCKLIST_SYNC_SECONDS). Most
+tokens are not revoked, and the filter answers "definitely not revoked" for
+them in a few microseconds. Only filter hits, revoked tokens and the odd
+false positive, are confirmed in Redis.
+
+A revocation made on another worker therefore takes effect here within one
+sync interval. If Redis cannot be reached, the local copy keeps its last
+contents and filter hits are treated as revoked.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+import redis
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from ..models import User
+
+logger = logging.getLogger(__name__)
+
+TOKENS_KEY = "jwt:revoked_tokens"
+USERS_KEY = "jwt:revoked_users"
+VERSION_KEY = "jwt:revoked_version"
+# Longest lifetime of any token we issue (refresh tokens)
+MAX_TOKEN_LIFETIME = 30 * 24 * 3600
+PENDING_REVOCATIONS = "revoked_users"
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.01):
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        # Double hashing: two 64 bit halves of one digest give every position
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        bits = self.bits
+        return all(
+            bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class TokenBlocklist:
+    def __init__(self, sync_interval=5, capacity=100_000, error_rate=0.01):
+        self.sync_interval = sync_interval
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.client = None
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._cutoffs = {}
+        self._version = None
+        self._lock = threading.Lock()
+        self._pid = None
+        self.checks = 0
+        self.lookups = 0
+        self.revoked = 0
+        self.syncs = 0
+        self.sync_errors = 0
+
+    def get_client(self):
+        if self.client is None:
+            self.client = redis.Redis(
+                host=os.getenv("REDIS_HOST", "localhost"),
+                port=int(os.getenv("REDIS_PORT", 6379)),
+                db=int(os.getenv("REDIS_DB", 0)),
+                socket_timeout=1,
+            )
+        return self.client
+
+    # Revocation
+
+    def revoke_token(self, jti, expires_at):
+        """Revoke one token until its expiry (a unix timestamp)"""
+        self._publish(TOKENS_KEY, jti, expires_at)
+        self._bloom.add(jti)
+
+    def revoke_user(self, user_id, cutoff=None):
+        """Revoke every token of a user issued before cutoff (default now)"""
+        # iat has whole-second resolution; tokens issued later in this second
+        # stay valid, so a fresh login right after a reset is not rejected
+        cutoff = int(time.time()) if cutoff is None else cutoff
+        self._publish(USERS_KEY, str(user_id), cutoff)
+        self._cutoffs[str(user_id)] = cutoff
+
+    def _publish(self, key, member, score):
+        pipe = self.get_client().pipeline()
+        pipe.zadd(key, {member: score})
+        pipe.incr(VERSION_KEY)
+        pipe.execute()
+
+    # Checks
+
+    def is_revoked(self, jwt_payload):
+        """Whether a decoded token has been revoked"""
+        self._ensure_synced()
+        self.checks += 1
+        cutoff = self._cutoffs.get(jwt_payload.get("sub"))
+        if cutoff is not None and jwt_payload.get("iat", 0) < cutoff:
+            self.revoked += 1
+            return True
+        jti = jwt_payload.get("jti")
+        if jti is None or jti not in self._bloom:
+            return False
+
+        self.lookups += 1
+        try:
+            revoked = self.get_client().zscore(TOKENS_KEY, jti) is not None
+        except redis.RedisError as e:
+            logger.error(f"Could not confirm token revocation: {str(e)}")
+            revoked = True
+        if revoked:
+            self.revoked += 1
+        return revoked
+
+    # Synchronisation
+
+    def _ensure_synced(self):
+        # One sync thread per process; a forked server worker starts its own
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self.sync()
+            thread = threading.Thread(
+                target=self._sync_loop, name="token-blocklist-sync", daemon=True
+            )
+            thread.start()
+            self._pid = os.getpid()
+
+    def _sync_loop(self):
+        while True:
+            time.sleep(self.sync_interval)
+            self.sync()
+
+    def sync(self):
+        """Rebuild the filter from Redis if anything was revoked since the last sync"""
+        try:
+            client = self.get_client()
+            version = client.get(VERSION_KEY)
+            if self.syncs and version == self._version:
+                return
+            now = int(time.time())
+            pipe = client.pipeline()
+            pipe.zremrangebyscore(TOKENS_KEY, "-inf", now)
+            pipe.zremrangebyscore(USERS_KEY, "-inf", now - MAX_TOKEN_LIFETIME)
+            pipe.zrange(TOKENS_KEY, 0, -1)
+            pipe.zrange(USERS_KEY, 0, -1, withscores=True)
+            _, _, jtis, cutoffs = pipe.execute()
+        except redis.RedisError as e:
+            self.sync_errors += 1
+            logger.warning(f"Could not sync the token blocklist: {str(e)}")
+            return
+
+        bloom = BloomFilter(max(self.capacity, 2 * len(jtis)), self.error_rate)
+        for jti in jtis:
+            bloom.add(jti.decode())
+        self._bloom = bloom
+        self._cutoffs = {user_id.decode(): int(cutoff) for user_id, cutoff in cutoffs}
+        self._version = version
+        self.syncs += 1
+
+    def stats(self):
+        return {
+            "checks": self.checks,
+            "redis_lookups": self.lookups,
+            "revoked": self.revoked,
+            "revoked_tokens": self._bloom.count,
+            "revoked_users": len(self._cutoffs),
+            "syncs": self.syncs,
+            "sync_errors": self.sync_errors,
+        }
+
+
+token_blocklist = TokenBlocklist(
+    sync_interval=float(os.getenv("JWT_BLOCKLIST_SYNC_SECONDS", 5)),
+    capacity=int(os.getenv("JWT_BLOCKLIST_CAPACITY", 100_000)),
+)
+
+
+# Role changes revoke the user's tokens, whichever code path makes them:
+# role_required trusts the role claim embedded in the token
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_role_changes(session, flush_context):
+    for instance in session.dirty:
+        if (
+            isinstance(instance, User)
+            and inspect(instance).attrs.role.history.has_changes()
+        ):
+            session.info.setdefault(PENDING_REVOCATIONS, set()).add(instance.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _revoke_committed_role_changes(session):
+    for user_id in session.info.pop(PENDING_REVOCATIONS, ()):
+        try:
+            token_blocklist.revoke_user(user_id)
+        except redis.RedisError as e:
+            logger.error(f"Could not revoke tokens of user {user_id}: {str(e)}")
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_role_changes(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop(PENDING_REVOCATIONS, None)
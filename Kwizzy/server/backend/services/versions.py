@@ -0,0 +1,49 @@
+"""
+Content versions for cached data.
+
+Every cacheable entity (a quiz, a subject, ...) has a version token kept in
+the shared cache. Writers bump the token after committing, and readers fold
+it into their cache keys, so stale entries are never read again and simply
+expire. Tokens are random rather than counters, so a flushed cache can never
+hand out a version that an in-process cache has already seen.
+"""
+
+from uuid import uuid4
+from .. import cache
+
+
+def _version_key(kind, entity_id):
+    return f"version:{kind}:{entity_id}"
+
+
+def _new_token():
+    return uuid4().hex[:16]
+
+
+def get_version(kind, entity_id):
+    """Return the current version token of an entity, creating one if missing"""
+    key = _version_key(kind, entity_id)
+    version = cache.get(key)
+    if version is None:
+        # add() only sets the key if no other worker created it meanwhile
+        cache.add(key, _new_token(), timeout=0)
+        version = cache.get(key)
+    return version
+
+
+def get_versions(kind, entity_ids):
+    """Return {entity_id: version token} for several entities at once"""
+    entity_ids = list(entity_ids)
+    keys = [_version_key(kind, entity_id) for entity_id in entity_ids]
+    versions = dict(zip(entity_ids, cache.get_many(*keys))) if keys else {}
+    for entity_id, version in versions.items():
+        if version is None:
+            versions[entity_id] = get_version(kind, entity_id)
+    return versions
+
+
+def bump_version(kind, entity_id):
+    """Give an entity a new version token; call after the write is committed"""
+    version = _new_token()
+    cache.set(_version_key(kind, entity_id), version, timeout=0)
+    return version
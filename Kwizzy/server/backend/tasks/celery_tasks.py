@@ -1,13 +1,15 @@
 from __future__ import print_function
-from .. import celery
+from .. import celery, cache
 from ..models import User, QuizResult, Quiz
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import os
 import logging
+from uuid import uuid4
 from jinja2 import Environment, FileSystemLoader
 from ..utils import IndianTimeZone, EmailRateLimiter
-
+from ..services.serializers import quiz_result_summary_options
+from ..services.email_providers import EmailDeliveryError, get_email_provider
 
 template_dir = os.path.join(os.path.dirname(__file__), "templates")
 jinja_env = Environment(loader=FileSystemLoader(template_dir))
@@ -15,15 +17,10 @@ jinja_env = Environment(loader=FileSystemLoader(template_dir))
 logger = logging.getLogger(__name__)
 
 load_dotenv()
-import sib_api_v3_sdk
-from sib_api_v3_sdk.rest import ApiException
-
-configuration = sib_api_v3_sdk.Configuration()
-configuration.api_key["api-key"] = os.getenv("BREVO_API_KEY")
 
-api_instance = sib_api_v3_sdk.TransactionalEmailsApi(
-    sib_api_v3_sdk.ApiClient(configuration)
-)
+# How long a queued email's delivery status can be looked up
+DELIVERY_STATUS_TIMEOUT = 24 * 3600
+DELIVERY_MAX_RETRIES = 3
 
 
 class EmailService:
@@ -31,39 +28,102 @@ class EmailService:
         self.rate_limiter = EmailRateLimiter()
 
     @staticmethod
-    def send_email(to_email, to_name, subject, template_name, template_data):
-        try:
-            # Create rate limiter instance
-            rate_limiter = EmailRateLimiter()
-
-            # Check if we can send more emails
-            if not rate_limiter.can_send_email():
-                logger.warning(
-                    f"Daily email limit reached. Cannot send email to {to_email}"
-                )
-                return False
+    def deliver(to_email, to_name, subject, template_name, template_data):
+        """
+        Render a template and hand it to the configured provider. Returns
+        "sent", or "rate_limited" when the daily quota is used up; raises
+        EmailDeliveryError when the provider rejects the message.
+        """
+        provider = get_email_provider()
+        rate_limiter = EmailRateLimiter() if provider.rate_limited else None
+
+        # Check if we can send more emails
+        if rate_limiter and not rate_limiter.can_send_email():
+            logger.warning(
+                f"Daily email limit reached. Cannot send email to {to_email}"
+            )
+            return "rate_limited"
 
-            # Render HTML template
-            template = jinja_env.get_template(f"{template_name}")
+        # Render HTML template
+        template = jinja_env.get_template(f"{template_name}")
+        html_content = template.render(**template_data)
 
-            # Render HTML content
-            html_content = template.render(**template_data)
+        provider.send(to_email, to_name, subject, html_content)
+        if rate_limiter:
+            rate_limiter.increment_count()
+        logger.info(f"Email sent successfully to {to_email}")
+        return "sent"
 
-            sender = {"name": "Kwizzy", "email": os.getenv("MAIL_DEFAULT_SENDER")}
+    @staticmethod
+    def send_email(to_email, to_name, subject, template_name, template_data):
+        try:
+            return (
+                EmailService.deliver(
+                    to_email, to_name, subject, template_name, template_data
+                )
+                == "sent"
+            )
+        except EmailDeliveryError as e:
+            logger.error(f"Failed to send email: {e}")
+            return False
 
-            to = [{"email": to_email, "name": to_name}]
 
-            send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
-                to=to, html_content=html_content, sender=sender, subject=subject
+def set_delivery_status(delivery_id, status, **details):
+    cache.set(
+        f"email_delivery:{delivery_id}",
+        {
+            "status": status,
+            "updated_at": IndianTimeZone().strftime("%Y-%m-%d %H:%M:%S"),
+            **details,
+        },
+        timeout=DELIVERY_STATUS_TIMEOUT,
+    )
+
+
+def get_delivery_status(delivery_id):
+    return cache.get(f"email_delivery:{delivery_id}")
+
+
+def queue_email(to_email, to_name, subject, template_name, template_data):
+    """Enqueue an email and return its delivery id"""
+    # The id is known before the task exists, so its "queued" status can
+    # never overwrite the status written by a fast worker
+    delivery_id = uuid4().hex
+    set_delivery_status(delivery_id, "queued")
+    send_transactional_email.apply_async(
+        args=(to_email, to_name, subject, template_name, template_data),
+        task_id=delivery_id,
+        # Fail the request quickly rather than hang while the broker is down
+        retry_policy={"max_retries": 2, "interval_start": 0, "interval_step": 0.2},
+    )
+    return delivery_id
+
+
+# Status is kept under the delivery id; skipping the result backend also
+# keeps apply_async from waiting on it when Redis is unreachable
+@celery.task(bind=True, max_retries=DELIVERY_MAX_RETRIES, ignore_result=True)
+def send_transactional_email(
+    self, to_email, to_name, subject, template_name, template_data
+):
+    """Deliver one email, retrying provider failures with backoff"""
+    delivery_id = self.request.id
+    attempts = self.request.retries + 1
+    try:
+        status = EmailService.deliver(
+            to_email, to_name, subject, template_name, template_data
+        )
+    except EmailDeliveryError as e:
+        if self.request.retries < self.max_retries:
+            set_delivery_status(
+                delivery_id, "retrying", attempts=attempts, error=str(e)
             )
-            api_response = api_instance.send_transac_email(send_smtp_email)
-            rate_limiter.increment_count()
-            logger.info(f"Email sent successfully to {to_email}")
-            return True
+            raise self.retry(exc=e, countdown=30 * 2**self.request.retries)
+        logger.error(f"Giving up on email to {to_email}: {e}")
+        set_delivery_status(delivery_id, "failed", attempts=attempts, error=str(e))
+        return {"status": "error", "message": str(e)}
 
-        except ApiException as e:
-            logger.error(f"Failed to send email: {e}")
-            return False
+    set_delivery_status(delivery_id, status, attempts=attempts)
+    return {"status": "success" if status == "sent" else "error", "delivery": status}
 
 
 @celery.task
@@ -121,7 +181,7 @@ def send_daily_reminders():
                     failed_sends += 1
                     logger.error(f"Failed to send reminder to {student.email}")
 
-            except ApiException as e:
+            except EmailDeliveryError as e:
                 failed_sends += 1
                 logger.error(f"Failed to send reminder to {student.email}: {str(e)}")
                 continue
@@ -197,7 +257,9 @@ def generate_monthly_activity_report():
                     break
                 # Get student's quiz activity for previous month
                 monthly_quiz_results = (
-                    QuizResult.query.join(Quiz)
+                    QuizResult.query.options(
+                        *quiz_result_summary_options(with_subject=True)
+                    )
                     .filter(
                         QuizResult.user_id == student.id,
                         QuizResult.completed_at >= first_day_previous,
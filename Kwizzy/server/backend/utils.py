@@ -53,6 +53,13 @@ def convert_to_ist(utc_dt):
     return ist_dt
 
 
+def format_duration(seconds):
+    """Render a duration in seconds as HH:MM"""
+    hours = seconds // 3600
+    minutes = (seconds % 3600) // 60
+    return f"{hours:02d}:{minutes:02d}"
+
+
 # Format datetime to string in IST
 def format_ist_datetime(dt):
     """Formats datetime to IST string"""
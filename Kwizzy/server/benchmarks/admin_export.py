@@ -0,0 +1,109 @@
+"""
+Admin CSV export over a large student body.
+
+Seeds students with a handful of quiz results each using bulk inserts, then
+times write_admin_export and reports peak Python memory, which should stay
+bounded regardless of the number of students.
+
+    python -m benchmarks.admin_export [--students 100000] [--results 3]
+"""
+
+import argparse
+import io
+import random
+import tracemalloc
+from datetime import date, datetime, timedelta
+from time import perf_counter
+from sqlalchemy import insert
+from .common import create_bench_app
+
+SEED_BATCH = 10_000
+
+
+def seed(db, models, students, results_per_student):
+    User, Subject, Chapter, Quiz, QuizResult = models
+    quiz_ids = []
+    for s in range(3):
+        subject = Subject(name=f"Subject {s}", description="Benchmark data")
+        chapter = Chapter(name=f"Chapter {s}", description="", subject=subject)
+        quizzes = [
+            Quiz(name=f"Quiz {s}.{q}", description="", chapter=chapter)
+            for q in range(5)
+        ]
+        db.session.add_all([subject, chapter, *quizzes])
+        db.session.flush()
+        quiz_ids.extend(quiz.id for quiz in quizzes)
+    db.session.commit()
+
+    rng = random.Random(42)
+    now = datetime.now()
+    for start in range(0, students, SEED_BATCH):
+        count = min(SEED_BATCH, students - start)
+        user_ids = db.session.scalars(
+            insert(User).returning(User.id, sort_by_parameter_order=True),
+            [
+                {
+                    "name": f"student {start + i}",
+                    "email": f"student{start + i}@kwizzy.local",
+                    "dob": date(2000, 1, 1),
+                    "qualification": "Bachelors",
+                    "role": "student",
+                    "password": "unused",
+                }
+                for i in range(count)
+            ],
+        ).all()
+        db.session.execute(
+            insert(QuizResult),
+            [
+                {
+                    "quiz_id": rng.choice(quiz_ids),
+                    "user_id": user_id,
+                    "marks_scored": rng.randint(0, 10),
+                    "total_marks": 10,
+                    "completed_at": now - timedelta(days=rng.randint(0, 10)),
+                }
+                for user_id in user_ids
+                for _ in range(results_per_student)
+            ],
+        )
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--students", type=int, default=100_000)
+    parser.add_argument("--results", type=int, default=3)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    from backend import db
+    from backend.models import User, Subject, Chapter, Quiz, QuizResult
+    from backend.api.csv import write_admin_export
+
+    with app.app_context():
+        start = perf_counter()
+        seed(db, (User, Subject, Chapter, Quiz, QuizResult), args.students, args.results)
+        print(f"seeded {args.students} students in {perf_counter() - start:.1f} s")
+
+        class NullWriter(io.TextIOBase):
+            def write(self, text):
+                return len(text)
+
+        start = perf_counter()
+        write_admin_export(NullWriter())
+        elapsed = perf_counter() - start
+
+        # Memory is traced in a second pass as tracing slows the export down
+        tracemalloc.start()
+        write_admin_export(NullWriter())
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(
+            f"exported {args.students} students in {elapsed:.2f} s, "
+            f"peak memory {peak / 1024 / 1024:.1f} MiB"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Shared setup for the benchmark scripts.
+
+Benchmarks run against a throwaway SQLite database and an in-process cache
+so they never touch the development database. Run them from Kwizzy/server:
+
+    python -m benchmarks.grading
+"""
+
+import os
+import tempfile
+from statistics import mean
+from time import perf_counter
+
+
+def create_bench_app():
+    """Import the Flask app against a scratch database and return it"""
+    db_path = os.path.join(tempfile.mkdtemp(prefix="kwizzy-bench-"), "bench.db")
+    os.environ.setdefault("SQLALCHEMY_DATABASE_URI", f"sqlite:///{db_path}")
+    os.environ.setdefault("CACHE_TYPE", "SimpleCache")
+    os.environ.setdefault("UPLOAD_FOLDER", "./static/uploads/subjects")
+    os.environ.setdefault("SECRET_KEY", "kwizzy-benchmark-secret-key-0123456789")
+    os.environ.setdefault(
+        "JWT_SECRET_KEY", "kwizzy-benchmark-jwt-secret-key-0123456789"
+    )
+    # Benchmarks drive endpoints from a single address, far past its limits
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    from backend import app
+
+    return app
+
+
+def auth_header(user_id, role):
+    """Build an Authorization header for the given user"""
+    from flask_jwt_extended import create_access_token
+
+    token = create_access_token(identity=str(user_id), additional_claims={"role": role})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def timed(fn, repeat):
+    """Run fn repeat times and return the per-call latencies in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = perf_counter()
+        fn()
+        samples.append((perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(label, samples):
+    """Format latency samples as a single report line"""
+    return (
+        f"{label:<24} mean {mean(samples):8.2f} ms   "
+        f"p50 {percentile(samples, 50):8.2f} ms   "
+        f"p99 {percentile(samples, 99):8.2f} ms"
+    )
@@ -0,0 +1,104 @@
+"""
+Submission latency for UserAnswerApi.post as quizzes grow.
+
+Seeds quizzes with 10, 100 and 1000 questions, submits a full answer sheet
+against each and reports latency together with the number of SQL statements
+issued per submission. Both should stay flat as the question count grows.
+
+    python -m benchmarks.grading [--repeat 20]
+"""
+
+import argparse
+from datetime import date
+from sqlalchemy import event, insert
+from .common import create_bench_app, auth_header, timed, summarize
+
+QUIZ_SIZES = (10, 100, 1000)
+OPTIONS_PER_QUESTION = 4
+
+
+def seed_quiz(db, models, chapter_id, size):
+    """Create a quiz with `size` questions using bulk inserts"""
+    Quiz, Question, Option = models
+    quiz = Quiz(
+        name=f"Bench {size}",
+        description=f"{size} questions",
+        chapter_id=chapter_id,
+        time_duration=3600,
+        one_attempt_only=False,
+    )
+    db.session.add(quiz)
+    db.session.flush()
+
+    question_ids = db.session.scalars(
+        insert(Question).returning(Question.id, sort_by_parameter_order=True),
+        [{"quiz_id": quiz.id, "text": f"Question {i}"} for i in range(size)],
+    ).all()
+    option_ids = db.session.scalars(
+        insert(Option).returning(Option.id, sort_by_parameter_order=True),
+        [
+            {"question_id": question_id, "text": f"Option {j}", "is_correct": j == 0}
+            for question_id in question_ids
+            for j in range(OPTIONS_PER_QUESTION)
+        ],
+    ).all()
+    db.session.commit()
+
+    answers = [
+        {
+            "question_id": question_id,
+            "selected_option_id": option_ids[i * OPTIONS_PER_QUESTION],
+        }
+        for i, question_id in enumerate(question_ids)
+    ]
+    return quiz.id, answers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    from backend import db
+    from backend.models import User, Subject, Chapter, Quiz, Question, Option
+
+    with app.app_context():
+        student = User(
+            name="bench student",
+            email="bench@kwizzy.local",
+            dob=date(2000, 1, 1),
+            qualification="Bachelors",
+            password="unused",
+        )
+        subject = Subject(name="Benchmarks", description="Benchmark data")
+        chapter = Chapter(name="Grading", description="Grading", subject=subject)
+        db.session.add_all([student, subject, chapter])
+        db.session.commit()
+
+        headers = auth_header(student.id, "student")
+        client = app.test_client()
+
+        statements = [0]
+
+        @event.listens_for(db.engine, "before_cursor_execute")
+        def count_statements(*_):
+            statements[0] += 1
+
+        for size in QUIZ_SIZES:
+            quiz_id, answers = seed_quiz(db, (Quiz, Question, Option), chapter.id, size)
+            payload = {"quiz_id": quiz_id, "answers": answers}
+
+            def submit():
+                response = client.post("/api/user-answers", json=payload, headers=headers)
+                assert response.status_code == 201, response.get_json()
+
+            submit()  # warm up
+            statements[0] = 0
+            samples = timed(submit, args.repeat)
+            per_call = statements[0] / args.repeat
+            print(f"{summarize(f'{size} questions', samples)}   {per_call:.0f} queries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Latency of an unrelated endpoint during a login storm.
+
+Times /api/student/<id>/activity alone, then again while background threads
+hammer /api/login, and reports how the logins fared (successes and 503s).
+Run it with the pool and with hashing on the request thread to compare:
+
+    python -m benchmarks.login_storm [--storm-threads 16]
+    PASSWORD_HASH_WORKERS=0 python -m benchmarks.login_storm
+"""
+
+import argparse
+import threading
+from collections import Counter
+from datetime import date
+from .common import create_bench_app, auth_header, timed, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--storm-threads", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    from backend import db
+    from backend.models import User
+    from backend.services.password_hashing import password_hasher
+
+    with app.app_context():
+        student = User(
+            name="bench student",
+            email="bench@kwizzy.local",
+            dob=date(2000, 1, 1),
+            qualification="Bachelors",
+            password=password_hasher.hash("bench-password"),
+        )
+        db.session.add(student)
+        db.session.commit()
+        student_id = student.id
+        headers = auth_header(student_id, "student")
+
+    client = app.test_client()
+
+    def fetch():
+        response = client.get(f"/api/student/{student_id}/activity", headers=headers)
+        assert response.status_code == 200, response.get_json()
+
+    print(f"hashing workers: {password_hasher.workers or 'request thread'}")
+    print(summarize("activity, idle", timed(fetch, args.repeat)))
+
+    stop = threading.Event()
+    outcomes = Counter()
+
+    def storm():
+        storm_client = app.test_client()
+        while not stop.is_set():
+            response = storm_client.post(
+                "/api/login",
+                json={"email": "bench@kwizzy.local", "password": "bench-password"},
+            )
+            outcomes[response.status_code] += 1
+            if response.status_code == 503:
+                # Well-behaved clients back off as told
+                stop.wait(float(response.headers["Retry-After"]))
+
+    threads = [threading.Thread(target=storm) for _ in range(args.storm_threads)]
+    for thread in threads:
+        thread.start()
+    try:
+        print(summarize("activity, login storm", timed(fetch, args.repeat)))
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    print(f"logins: {dict(outcomes)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Latency of /api/auth/forgot-password.
+
+Uses the stub email provider with EMAIL_STUB_LATENCY_MS of simulated
+provider latency. Times the request with the mail sent inline (Celery in
+eager mode, as before the mail was queued) and with it queued on an
+in-memory broker, where the response no longer waits for the provider.
+
+    python -m benchmarks.password_reset [--provider-latency-ms 300]
+"""
+
+import argparse
+import os
+from datetime import date
+from .common import create_bench_app, timed, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--provider-latency-ms", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    os.environ["EMAIL_PROVIDER"] = "stub"
+    os.environ["EMAIL_STUB_LATENCY_MS"] = str(args.provider_latency_ms)
+    app = create_bench_app()
+    from backend import db, celery
+    from backend.models import User
+
+    celery.conf.broker_url = "memory://"
+    with app.app_context():
+        db.session.add(
+            User(
+                name="bench student",
+                email="bench@kwizzy.local",
+                dob=date(2000, 1, 1),
+                qualification="Bachelors",
+                password="unused",
+            )
+        )
+        db.session.commit()
+
+    client = app.test_client()
+
+    def request():
+        response = client.post(
+            "/api/auth/forgot-password", json={"email": "bench@kwizzy.local"}
+        )
+        assert response.status_code == 200, response.get_json()
+
+    print(f"stub provider latency: {args.provider_latency_ms} ms")
+    celery.conf.task_always_eager = True
+    print(summarize("sent inline", timed(request, args.repeat)))
+    celery.conf.task_always_eager = False
+    print(summarize("queued", timed(request, args.repeat)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Listing latency for the QuizApi catalogue routes.
+
+Seeds a catalogue of quizzes, then walks /api/quizzes page by page and
+reports per-page latency and the number of SQL statements per page, which
+should stay constant however large the catalogue is.
+
+    python -m benchmarks.quiz_catalogue [--quizzes 10000] [--page-size 200]
+"""
+
+import argparse
+from datetime import date
+from time import perf_counter
+from sqlalchemy import event, insert
+from .common import create_bench_app, auth_header, summarize
+
+QUESTIONS_PER_QUIZ = 5
+
+
+def seed_catalogue(db, models, chapter_id, count):
+    """Bulk-insert `count` quizzes with QUESTIONS_PER_QUIZ questions each"""
+    Quiz, Question = models
+    quiz_ids = db.session.scalars(
+        insert(Quiz).returning(Quiz.id, sort_by_parameter_order=True),
+        [
+            {
+                "name": f"Quiz {i}",
+                "description": "Benchmark quiz",
+                "chapter_id": chapter_id,
+                "time_duration": 1800,
+                "one_attempt_only": False,
+            }
+            for i in range(count)
+        ],
+    ).all()
+    db.session.execute(
+        insert(Question),
+        [
+            {"quiz_id": quiz_id, "text": f"Question {j}"}
+            for quiz_id in quiz_ids
+            for j in range(QUESTIONS_PER_QUIZ)
+        ],
+    )
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--quizzes", type=int, default=10_000)
+    parser.add_argument("--page-size", type=int, default=200)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    from backend import db, cache
+    from backend.models import User, Subject, Chapter, Quiz, Question
+
+    with app.app_context():
+        admin = User(
+            name="bench admin",
+            email="admin@kwizzy.local",
+            dob=date(2000, 1, 1),
+            qualification="Bachelors",
+            role="admin",
+            password="unused",
+        )
+        subject = Subject(name="Benchmarks", description="Benchmark data")
+        chapter = Chapter(name="Catalogue", description="Catalogue", subject=subject)
+        db.session.add_all([admin, subject, chapter])
+        db.session.commit()
+        seed_catalogue(db, (Quiz, Question), chapter.id, args.quizzes)
+
+        headers = auth_header(admin.id, "admin")
+        client = app.test_client()
+
+        statements = [0]
+
+        @event.listens_for(db.engine, "before_cursor_execute")
+        def count_statements(*_):
+            statements[0] += 1
+
+        # Measure the handler, not the response cache in front of it
+        cache.clear()
+        samples, listed, cursor = [], 0, None
+        statements[0] = 0
+        while True:
+            query = {"page_size": args.page_size}
+            if cursor:
+                query["cursor"] = cursor
+            start = perf_counter()
+            response = client.get("/api/quizzes", query_string=query, headers=headers)
+            samples.append((perf_counter() - start) * 1000)
+            body = response.get_json()
+            assert response.status_code == 200, body
+            listed += len(body["quizzes"])
+            cursor = body["next_cursor"]
+            if not cursor:
+                break
+
+        assert listed == args.quizzes, listed
+        per_page = statements[0] / len(samples)
+        print(f"{args.quizzes} quizzes in {len(samples)} pages")
+        print(
+            f"{summarize(f'page of {args.page_size}', samples)}   {per_page:.1f} queries"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Latency and write-lock hold time of QuizApi.put on large quizzes.
+
+Seeds quizzes of 100, 500 and 2000 questions, then submits edits that
+update, delete and add 10% of the questions each, and reports request
+latency next to the write_ms the endpoint measures between its first
+write statement and the commit.
+
+    python -m benchmarks.quiz_edit [--repeat 5]
+"""
+
+import argparse
+from datetime import date
+from statistics import mean
+from time import perf_counter
+from .common import create_bench_app, auth_header, summarize
+from .grading import seed_quiz
+
+QUIZ_SIZES = (100, 500, 2000)
+
+
+def edited_document(client, headers, quiz_id, round_number):
+    """The quiz's current questions with 10% updated, deleted and added"""
+    response = client.get(
+        f"/api/quizzes/{quiz_id}?include_answers=true", headers=headers
+    )
+    questions = response.get_json()["questions"]
+    step = 10
+    for question in questions[::step]:
+        question["text"] = f"Edited {round_number} {question['id']}"
+        question["options"][1]["text"] = f"Edited option {round_number}"
+    del questions[5::step]
+    questions.extend(
+        {
+            "text": f"Added {round_number} {i}",
+            "options": [
+                {"text": f"Option {j}", "is_correct": j == 0} for j in range(4)
+            ],
+        }
+        for i in range(len(questions) // step)
+    )
+    return {"questions": questions}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    from backend import db
+    from backend.models import User, Subject, Chapter, Quiz, Question, Option
+
+    with app.app_context():
+        admin = User(
+            name="bench admin",
+            email="admin@kwizzy.local",
+            dob=date(2000, 1, 1),
+            qualification="Bachelors",
+            role="admin",
+            password="unused",
+        )
+        subject = Subject(name="Benchmarks", description="Benchmark data")
+        chapter = Chapter(name="Editing", description="Editing", subject=subject)
+        db.session.add_all([admin, subject, chapter])
+        db.session.commit()
+
+        headers = auth_header(admin.id, "admin")
+        client = app.test_client()
+
+        for size in QUIZ_SIZES:
+            quiz_id, _ = seed_quiz(db, (Quiz, Question, Option), chapter.id, size)
+            samples, write_ms = [], []
+            for round_number in range(args.repeat):
+                document = edited_document(client, headers, quiz_id, round_number)
+                start = perf_counter()
+                response = client.put(
+                    f"/api/quizzes/{quiz_id}", json=document, headers=headers
+                )
+                samples.append((perf_counter() - start) * 1000)
+                assert response.status_code == 200, response.get_json()
+                write_ms.append(response.get_json()["write_ms"])
+
+            print(
+                f"{summarize(f'{size} questions', samples)}   "
+                f"write lock {mean(write_ms):.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Throughput of the bulk quiz importer.
+
+Writes a CSV question bank of --questions questions (spread over quizzes of
+--per-quiz questions, four options each) and imports it through
+import_quizzes(), reporting wall time, rows per second and peak RSS.
+
+    python -m benchmarks.quiz_import [--questions 100000] [--per-quiz 50]
+"""
+
+import argparse
+import csv
+import os
+import tempfile
+import resource
+from time import perf_counter
+from .common import create_bench_app
+
+OPTIONS_PER_QUESTION = 4
+
+
+def write_bank(path, chapter_id, questions, per_quiz):
+    header = [
+        "chapter_id",
+        "quiz_name",
+        "quiz_description",
+        "time_duration",
+        "question_text",
+        *[f"option_{i}" for i in range(1, OPTIONS_PER_QUESTION + 1)],
+        "correct_option",
+    ]
+    with open(path, "w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(header)
+        for i in range(questions):
+            writer.writerow(
+                [
+                    chapter_id,
+                    f"Imported {i // per_quiz}",
+                    "Bulk imported quiz",
+                    "00:30",
+                    f"Question {i}",
+                    *[f"Option {j}" for j in range(OPTIONS_PER_QUESTION)],
+                    i % OPTIONS_PER_QUESTION + 1,
+                ]
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--questions", type=int, default=100_000)
+    parser.add_argument("--per-quiz", type=int, default=50)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    from backend import db
+    from backend.models import Subject, Chapter
+    from backend.services.quiz_import import import_quizzes
+
+    with app.app_context():
+        subject = Subject(name="Benchmarks", description="Benchmark data")
+        chapter = Chapter(name="Import", description="Import", subject=subject)
+        db.session.add_all([subject, chapter])
+        db.session.commit()
+
+        path = os.path.join(tempfile.mkdtemp(prefix="kwizzy-bench-"), "bank.csv")
+        write_bank(path, chapter.id, args.questions, args.per_quiz)
+        size = os.path.getsize(path) / 2**20
+
+        start = perf_counter()
+        with open(path, newline="") as stream:
+            report = import_quizzes(stream, "csv")
+        elapsed = perf_counter() - start
+        # ru_maxrss is in KiB on Linux
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+
+        assert report["error_count"] == 0, report["errors"][:5]
+        print(
+            f"{args.questions} questions from a {size:.1f} MiB CSV: {report['created']}"
+        )
+        print(
+            f"{elapsed:.2f} s   {args.questions / elapsed:,.0f} questions/s   "
+            f"peak RSS {peak:.0f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
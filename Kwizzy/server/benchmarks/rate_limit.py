@@ -0,0 +1,67 @@
+"""
+Cost of the rate limit check.
+
+Times RateLimiter.take for --clients distinct addresses, against Redis (one
+EVALSHA of the token bucket script per check) and against the in-process
+fallback buckets. The Redis run needs a Redis server; it uses database
+--redis-db and removes its keys afterwards.
+
+    python -m benchmarks.rate_limit [--checks 50000] [--redis-db 15]
+"""
+
+import argparse
+from time import perf_counter
+from .common import create_bench_app, percentile
+
+
+def time_checks(limiter, checks, clients):
+    """Per-check latencies in microseconds, and how many were refused"""
+    samples, refused = [], 0
+    for i in range(checks):
+        buckets = [(f"ratelimit:bench:ip:10.0.{i % clients}", 30, 60_000)]
+        start = perf_counter()
+        allowed, _ = limiter.take(buckets)
+        samples.append((perf_counter() - start) * 1_000_000)
+        refused += not allowed
+    return samples, refused
+
+
+def report(label, samples, refused):
+    print(
+        f"{label:<24} p50 {percentile(samples, 50):7.2f} us   "
+        f"p99 {percentile(samples, 99):7.2f} us   "
+        f"{refused}/{len(samples)} refused"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--checks", type=int, default=50_000)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--redis-db", type=int, default=15)
+    args = parser.parse_args()
+
+    create_bench_app()
+    import redis
+    from backend.services.rate_limit import RateLimiter
+
+    report(
+        "in-process buckets",
+        *time_checks(RateLimiter(storage="memory"), args.checks, args.clients),
+    )
+
+    limiter = RateLimiter()
+    limiter.client = redis.Redis(db=args.redis_db)
+    try:
+        report("redis buckets", *time_checks(limiter, args.checks, args.clients))
+        if limiter.redis_errors:
+            print("(Redis was unreachable; those checks fell back to the process)")
+    finally:
+        if not limiter.redis_errors:
+            keys = limiter.client.keys("ratelimit:bench:*")
+            if keys:
+                limiter.client.delete(*keys)
+
+
+if __name__ == "__main__":
+    main()
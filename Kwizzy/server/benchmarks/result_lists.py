@@ -0,0 +1,127 @@
+"""
+Latency of quiz result list views for a student with a long quiz history.
+
+Seeds one student with thousands of graded attempts (each with a full
+answer sheet), then times the recent activity feed, the student chart
+dashboard, and loading the whole history with the summary projection (as
+the CSV export and monthly report do) and the review projection.
+
+    python -m benchmarks.result_lists [--attempts 5000] [--questions 20]
+"""
+
+import argparse
+from datetime import date, datetime, timedelta
+from sqlalchemy import insert
+from .common import create_bench_app, auth_header, timed, summarize
+from .grading import seed_quiz
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--attempts", type=int, default=5000)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    from backend import db
+    from backend.models import (
+        User,
+        Subject,
+        Chapter,
+        Quiz,
+        Question,
+        Option,
+        QuizResult,
+        UserAnswer,
+    )
+    from backend.services.serializers import (
+        quiz_result_summary_options,
+        quiz_result_review_options,
+    )
+
+    with app.app_context():
+        student = User(
+            name="bench student",
+            email="bench@kwizzy.local",
+            dob=date(2000, 1, 1),
+            qualification="Bachelors",
+            password="unused",
+        )
+        subject = Subject(name="Benchmarks", description="Benchmark data")
+        chapter = Chapter(name="History", description="History", subject=subject)
+        db.session.add_all([student, subject, chapter])
+        db.session.commit()
+        quiz_id, answers = seed_quiz(
+            db, (Quiz, Question, Option), chapter.id, args.questions
+        )
+
+        start = datetime(2020, 1, 1)
+        result_ids = db.session.scalars(
+            insert(QuizResult).returning(QuizResult.id),
+            [
+                {
+                    "quiz_id": quiz_id,
+                    "user_id": student.id,
+                    "marks_scored": i % (args.questions + 1),
+                    "total_marks": args.questions,
+                    "completed_at": start + timedelta(hours=6 * i),
+                }
+                for i in range(args.attempts)
+            ],
+        ).all()
+        db.session.execute(
+            insert(UserAnswer),
+            [
+                {
+                    "result_id": result_id,
+                    "question_id": answer["question_id"],
+                    "selected_option": answer["selected_option_id"],
+                    "is_correct": (result_id + j) % 3 != 0,
+                }
+                for result_id in result_ids
+                for j, answer in enumerate(answers)
+            ],
+        )
+        db.session.commit()
+
+        headers = auth_header(student.id, "student")
+        client = app.test_client()
+        endpoints = {
+            "recent activity": f"/api/student/{student.id}/activity",
+            "chart dashboard": "/api/student/charts",
+        }
+        for label, url in endpoints.items():
+            nonce = iter(range(args.repeat))
+
+            def fetch():
+                # A fresh query string misses the response cache
+                response = client.get(
+                    url, query_string={"nonce": next(nonce)}, headers=headers
+                )
+                assert response.status_code == 200, response.get_json()
+                return response
+
+            print(summarize(label, timed(fetch, args.repeat)))
+
+        projections = {
+            "history summary": quiz_result_summary_options(with_subject=True),
+            "history review": quiz_result_review_options(),
+        }
+        for label, options in projections.items():
+
+            def load():
+                results = (
+                    QuizResult.query.options(*options)
+                    .filter_by(user_id=student.id)
+                    .all()
+                )
+                db.session.expunge_all()
+                return results
+
+            rows = len(load())
+            print(f"{summarize(label, timed(load, args.repeat))}   {rows} attempts")
+
+
+if __name__ == "__main__":
+    main()
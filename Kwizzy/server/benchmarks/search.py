@@ -0,0 +1,120 @@
+"""
+Full-text search latency over a large question bank.
+
+Seeds quizzes whose questions are drawn from a Zipf-like vocabulary (so
+some words appear in a large share of the bank and others are rare), lets
+the database triggers index them, then times typical /api/search queries.
+
+    python -m benchmarks.search [--questions 1000000] [--repeat 50]
+"""
+
+import argparse
+import random
+from math import exp, log
+from datetime import date
+from time import perf_counter
+from sqlalchemy import insert
+from .common import create_bench_app, auth_header, timed, summarize
+
+QUESTIONS_PER_QUIZ = 100
+SEED_BATCH = 20_000
+VOCABULARY = 20_000
+# The most frequent words of real text are stop words nobody searches for
+STOP_WORDS = 100
+WORDS_PER_QUESTION = 12
+
+QUERIES = {
+    "common word": "w100",
+    "frequent word": "w150",
+    "rare word": "w17500",
+    "two words": "w105 w140",
+    "prefix": "w123",
+    "no match": "zzzz",
+}
+
+
+def words(rng, count):
+    """Word ids with a roughly Zipfian distribution, stop words left out"""
+    low, high = log(STOP_WORDS), log(VOCABULARY)
+    return [f"w{int(exp(rng.uniform(low, high)))}" for _ in range(count)]
+
+
+def seed_bank(db, models, chapter_id, count, rng):
+    Quiz, Question = models
+    quiz_count = max(1, count // QUESTIONS_PER_QUIZ)
+    quiz_ids = db.session.scalars(
+        insert(Quiz).returning(Quiz.id, sort_by_parameter_order=True),
+        [
+            {
+                "name": f"Quiz {i}",
+                "description": " ".join(words(rng, 6)),
+                "chapter_id": chapter_id,
+                "time_duration": 1800,
+                "one_attempt_only": False,
+            }
+            for i in range(quiz_count)
+        ],
+    ).all()
+    db.session.commit()
+    for start in range(0, count, SEED_BATCH):
+        db.session.execute(
+            insert(Question),
+            [
+                {
+                    "quiz_id": quiz_ids[i // QUESTIONS_PER_QUIZ % quiz_count],
+                    "title": " ".join(words(rng, 3)),
+                    "text": " ".join(words(rng, WORDS_PER_QUESTION)),
+                }
+                for i in range(start, min(start + SEED_BATCH, count))
+            ],
+        )
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--questions", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    from backend import db
+    from backend.models import User, Subject, Chapter, Quiz, Question
+    from backend.services.search import search
+
+    with app.app_context():
+        admin = User(
+            name="bench admin",
+            email="admin@kwizzy.local",
+            dob=date(2000, 1, 1),
+            qualification="Bachelors",
+            role="admin",
+            password="unused",
+        )
+        subject = Subject(name="Benchmarks", description="Benchmark data")
+        chapter = Chapter(name="Search", description="Search", subject=subject)
+        db.session.add_all([admin, subject, chapter])
+        db.session.commit()
+
+        start = perf_counter()
+        seed_bank(db, (Quiz, Question), chapter.id, args.questions, random.Random(7))
+        print(
+            f"Seeded and indexed {args.questions} questions "
+            f"in {perf_counter() - start:.1f} s"
+        )
+
+        headers = auth_header(admin.id, "admin")
+        client = app.test_client()
+        for label, query in QUERIES.items():
+            hits = len(search(query, limit=20))
+            samples = timed(
+                lambda: client.get(
+                    "/api/search", query_string={"q": query}, headers=headers
+                ),
+                args.repeat,
+            )
+            print(f"{summarize(label, samples)}   {hits} hits on page")
+
+
+if __name__ == "__main__":
+    main()
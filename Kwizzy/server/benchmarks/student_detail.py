@@ -0,0 +1,115 @@
+"""
+Latency of /api/student/<id> for a student with a long quiz history.
+
+Seeds one student with thousands of graded attempts (each with a full
+answer sheet), then times the first page of the detailed performance
+breakdown and a page filtered to one month.
+
+    python -m benchmarks.student_detail [--attempts 5000] [--questions 20]
+"""
+
+import argparse
+from datetime import date, datetime, timedelta
+from sqlalchemy import insert
+from .common import create_bench_app, auth_header, timed, summarize
+from .grading import seed_quiz
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--attempts", type=int, default=5000)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    from backend import db
+    from backend.models import (
+        User,
+        Subject,
+        Chapter,
+        Quiz,
+        Question,
+        Option,
+        QuizResult,
+        UserAnswer,
+    )
+
+    with app.app_context():
+        admin = User(
+            name="bench admin",
+            email="admin@kwizzy.local",
+            dob=date(2000, 1, 1),
+            qualification="Bachelors",
+            role="admin",
+            password="unused",
+        )
+        student = User(
+            name="bench student",
+            email="bench@kwizzy.local",
+            dob=date(2000, 1, 1),
+            qualification="Bachelors",
+            password="unused",
+        )
+        subject = Subject(name="Benchmarks", description="Benchmark data")
+        chapter = Chapter(name="History", description="History", subject=subject)
+        db.session.add_all([admin, student, subject, chapter])
+        db.session.commit()
+        quiz_id, answers = seed_quiz(
+            db, (Quiz, Question, Option), chapter.id, args.questions
+        )
+
+        start = datetime(2020, 1, 1)
+        result_ids = db.session.scalars(
+            insert(QuizResult).returning(QuizResult.id),
+            [
+                {
+                    "quiz_id": quiz_id,
+                    "user_id": student.id,
+                    "marks_scored": i % (args.questions + 1),
+                    "total_marks": args.questions,
+                    "completed_at": start + timedelta(hours=6 * i),
+                }
+                for i in range(args.attempts)
+            ],
+        ).all()
+        db.session.execute(
+            insert(UserAnswer),
+            [
+                {
+                    "result_id": result_id,
+                    "question_id": answer["question_id"],
+                    "selected_option": answer["selected_option_id"],
+                    "is_correct": (result_id + j) % 3 != 0,
+                }
+                for result_id in result_ids
+                for j, answer in enumerate(answers)
+            ],
+        )
+        db.session.commit()
+
+        headers = auth_header(admin.id, "admin")
+        client = app.test_client()
+        cases = {
+            "first page": {},
+            "one month": {"date_from": "2021-03-01", "date_to": "2021-03-31"},
+        }
+        for label, query in cases.items():
+            nonce = iter(range(args.repeat + 1))
+
+            def fetch():
+                # A fresh query string misses the response cache
+                response = client.get(
+                    f"/api/student/{student.id}",
+                    query_string={**query, "nonce": next(nonce)},
+                    headers=headers,
+                )
+                assert response.status_code == 200, response.get_json()
+                return response
+
+            rows = len(fetch().get_json()["detailed_performance"])
+            print(f"{summarize(label, timed(fetch, args.repeat))}   {rows} attempts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Admin student list latency as students accumulate quiz attempts.
+
+Seeds a set of students, gives them a growing number of attempts (spread
+over separate days), rebuilds the analytics rollup and times a page of
+/api/students after each round. Latency and statements per page should stay
+flat however many attempts each student has.
+
+    python -m benchmarks.student_list [--students 200] [--repeat 20]
+"""
+
+import argparse
+from datetime import date, datetime, timedelta
+from sqlalchemy import event, insert
+from .common import create_bench_app, auth_header, timed, summarize
+
+ATTEMPT_ROUNDS = (1, 10, 100)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    from backend import db
+    from backend.models import User, Subject, Chapter, Quiz, QuizResult
+    from backend.services.analytics import rebuild_student_rollup
+
+    with app.app_context():
+        admin = User(
+            name="bench admin",
+            email="admin@kwizzy.local",
+            dob=date(2000, 1, 1),
+            qualification="Bachelors",
+            role="admin",
+            password="unused",
+        )
+        subject = Subject(name="Benchmarks", description="Benchmark data")
+        chapter = Chapter(name="Students", description="Students", subject=subject)
+        quiz = Quiz(
+            name="Bench quiz",
+            description="Benchmark quiz",
+            chapter=chapter,
+            time_duration=1800,
+            one_attempt_only=False,
+        )
+        db.session.add_all([admin, subject, chapter, quiz])
+        db.session.commit()
+        student_ids = db.session.scalars(
+            insert(User).returning(User.id),
+            [
+                {
+                    "name": f"Student {i}",
+                    "email": f"student{i}@kwizzy.local",
+                    "dob": date(2000, 1, 1),
+                    "qualification": "Bachelors",
+                    "role": "student",
+                    "password": "unused",
+                }
+                for i in range(args.students)
+            ],
+        ).all()
+        db.session.commit()
+
+        headers = auth_header(admin.id, "admin")
+        client = app.test_client()
+        statements = [0]
+
+        @event.listens_for(db.engine, "before_cursor_execute")
+        def count_statements(*_):
+            statements[0] += 1
+
+        seeded, start = 0, datetime(2024, 1, 1)
+        for attempts in ATTEMPT_ROUNDS:
+            db.session.execute(
+                insert(QuizResult),
+                [
+                    {
+                        "quiz_id": quiz.id,
+                        "user_id": student_id,
+                        "marks_scored": (student_id + day) % 11,
+                        "total_marks": 10,
+                        "completed_at": start + timedelta(days=day),
+                    }
+                    for day in range(seeded, attempts)
+                    for student_id in student_ids
+                ],
+            )
+            db.session.commit()
+            seeded = attempts
+            rebuild_student_rollup()
+
+            nonce = iter(range(args.repeat + 1))
+
+            def fetch():
+                # A fresh query string misses the response cache
+                response = client.get(
+                    "/api/students",
+                    query_string={"per_page": args.page_size, "nonce": next(nonce)},
+                    headers=headers,
+                )
+                assert response.status_code == 200, response.get_json()
+
+            fetch()
+            statements[0] = 0
+            samples = timed(fetch, args.repeat)
+            per_page = statements[0] / len(samples)
+            print(
+                f"{summarize(f'{attempts} attempts each', samples)}   "
+                f"{per_page:.1f} queries"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Cost of the JWT revocation check.
+
+Revokes --revoked tokens in Redis, syncs a blocklist from them, then times
+TokenBlocklist.is_revoked for tokens that were never revoked (the hot path,
+answered by the in-process Bloom filter) and for revoked ones (confirmed in
+Redis). Needs a Redis server; it uses database --redis-db and removes its
+keys afterwards.
+
+    python -m benchmarks.token_blocklist [--revoked 100000] [--redis-db 15]
+"""
+
+import argparse
+import time
+from uuid import uuid4
+from time import perf_counter
+from .common import create_bench_app, percentile
+
+
+def time_checks(blocklist, payloads):
+    """Per-check latencies in microseconds, and how many were revoked"""
+    samples, revoked = [], 0
+    for payload in payloads:
+        start = perf_counter()
+        revoked += blocklist.is_revoked(payload)
+        samples.append((perf_counter() - start) * 1_000_000)
+    return samples, revoked
+
+
+def report(label, samples, revoked):
+    print(
+        f"{label:<24} p50 {percentile(samples, 50):7.2f} us   "
+        f"p99 {percentile(samples, 99):7.2f} us   "
+        f"max {max(samples):9.2f} us   {revoked}/{len(samples)} revoked"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--revoked", type=int, default=100_000)
+    parser.add_argument("--checks", type=int, default=100_000)
+    parser.add_argument("--redis-db", type=int, default=15)
+    args = parser.parse_args()
+
+    create_bench_app()
+    import redis
+    from backend.services import token_blocklist as module
+
+    blocklist = module.TokenBlocklist(capacity=args.revoked)
+    blocklist.client = redis.Redis(db=args.redis_db)
+    keys = (module.TOKENS_KEY, module.USERS_KEY, module.VERSION_KEY)
+    blocklist.client.delete(*keys)
+    try:
+        expires = int(time.time()) + 3600
+        revoked = [str(uuid4()) for _ in range(args.revoked)]
+        for start in range(0, len(revoked), 10_000):
+            blocklist.client.zadd(
+                module.TOKENS_KEY,
+                {jti: expires for jti in revoked[start : start + 10_000]},
+            )
+        blocklist.client.incr(module.VERSION_KEY)
+
+        start = perf_counter()
+        blocklist.sync()
+        print(f"synced {args.revoked} revoked tokens in {perf_counter() - start:.2f} s")
+
+        now = int(time.time())
+        valid = [
+            {"jti": str(uuid4()), "sub": str(i % 1000), "iat": now}
+            for i in range(args.checks)
+        ]
+        report("valid tokens", *time_checks(blocklist, valid))
+        sample = [
+            {"jti": jti, "sub": "1", "iat": now} for jti in revoked[: args.checks // 10]
+        ]
+        report("revoked tokens", *time_checks(blocklist, sample))
+        print(blocklist.stats())
+    finally:
+        blocklist.client.delete(*keys)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""payment history keyset indexes
+
+Revision ID: 6c1d2f0a9b3e
+Revises: 4fbbe9528ee7
+Create Date: 2026-10-18 20:15:42.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6c1d2f0a9b3e'
+down_revision = '4fbbe9528ee7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('payment_history', schema=None) as batch_op:
+        batch_op.create_index('ix_payment_history_created_at_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_payment_history_user_created_at_id', ['user_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_payment_history_quiz_created_at_id', ['quiz_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_payment_history_status_created_at_id', ['status', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('payment_history', schema=None) as batch_op:
+        batch_op.drop_index('ix_payment_history_status_created_at_id')
+        batch_op.drop_index('ix_payment_history_quiz_created_at_id')
+        batch_op.drop_index('ix_payment_history_user_created_at_id')
+        batch_op.drop_index('ix_payment_history_created_at_id')
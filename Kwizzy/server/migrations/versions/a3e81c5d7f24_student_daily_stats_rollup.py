@@ -0,0 +1,71 @@
+"""student daily stats rollup
+
+Revision ID: a3e81c5d7f24
+Revises: 6c1d2f0a9b3e
+Create Date: 2026-10-18 21:04:11.529307
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3e81c5d7f24'
+down_revision = '6c1d2f0a9b3e'
+branch_labels = None
+depends_on = None
+
+# The rows rebuild_student_rollup() writes, from the quiz history so far
+BACKFILL_ROLLUP = """
+INSERT INTO student_daily_stats (
+    user_id, subject_id, chapter_id, day, attempts, scored_attempts,
+    score_sum, score_max, score_min, marks_scored, total_marks, last_completed_at
+)
+SELECT r.user_id, c.subject_id, q.chapter_id, r.day, count(*), count(r.score),
+    coalesce(sum(r.score), 0), max(r.score), min(r.score),
+    coalesce(sum(r.marks_scored), 0), coalesce(sum(r.total_marks), 0),
+    max(r.completed_at)
+FROM (
+    SELECT user_id, quiz_id, marks_scored, total_marks, completed_at,
+        date(completed_at) AS day,
+        CASE WHEN marks_scored IS NOT NULL AND total_marks > 0
+            THEN marks_scored * 100.0 / total_marks END AS score
+    FROM quiz_results
+) AS r
+JOIN quizzes AS q ON q.id = r.quiz_id
+JOIN chapters AS c ON c.id = q.chapter_id
+GROUP BY r.user_id, c.subject_id, q.chapter_id, r.day
+"""
+
+
+def upgrade():
+    # create_app() runs db.create_all(), which may have made the table already
+    if not sa.inspect(op.get_bind()).has_table('student_daily_stats'):
+        create_rollup_table()
+    op.execute('DELETE FROM student_daily_stats')
+    op.execute(BACKFILL_ROLLUP)
+
+
+def create_rollup_table():
+    op.create_table('student_daily_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('subject_id', sa.Integer(), nullable=False),
+    sa.Column('chapter_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('scored_attempts', sa.Integer(), nullable=False),
+    sa.Column('score_sum', sa.Float(), nullable=False),
+    sa.Column('score_max', sa.Float(), nullable=True),
+    sa.Column('score_min', sa.Float(), nullable=True),
+    sa.Column('marks_scored', sa.Integer(), nullable=False),
+    sa.Column('total_marks', sa.Integer(), nullable=False),
+    sa.Column('last_completed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['chapter_id'], ['chapters.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['subject_id'], ['subjects.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'subject_id', 'chapter_id', 'day')
+    )
+
+
+def downgrade():
+    op.drop_table('student_daily_stats')
@@ -0,0 +1,32 @@
+"""student performance page indexes
+
+Revision ID: b84c2e6f1d37
+Revises: f2b7d4e9a610
+Create Date: 2026-10-18 23:48:19.660143
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b84c2e6f1d37'
+down_revision = 'f2b7d4e9a610'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('quiz_results', schema=None) as batch_op:
+        batch_op.create_index('ix_quiz_results_user_completed_at_id', ['user_id', 'completed_at', 'id'], unique=False)
+
+    with op.batch_alter_table('user_answers', schema=None) as batch_op:
+        batch_op.create_index('ix_user_answers_result_id_is_correct', ['result_id', 'is_correct'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user_answers', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_answers_result_id_is_correct')
+
+    with op.batch_alter_table('quiz_results', schema=None) as batch_op:
+        batch_op.drop_index('ix_quiz_results_user_completed_at_id')
@@ -0,0 +1,26 @@
+"""questions quiz_id index
+
+Revision ID: c71f4e2b8d90
+Revises: a3e81c5d7f24
+Create Date: 2026-10-18 21:42:37.104925
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c71f4e2b8d90'
+down_revision = 'a3e81c5d7f24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('questions', schema=None) as batch_op:
+        batch_op.create_index('ix_questions_quiz_id', ['quiz_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('questions', schema=None) as batch_op:
+        batch_op.drop_index('ix_questions_quiz_id')
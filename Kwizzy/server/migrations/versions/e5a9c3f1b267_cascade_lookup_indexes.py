@@ -0,0 +1,34 @@
+"""cascade lookup indexes
+
+Revision ID: e5a9c3f1b267
+Revises: c71f4e2b8d90
+Create Date: 2026-10-18 22:31:05.862113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a9c3f1b267'
+down_revision = 'c71f4e2b8d90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('options', schema=None) as batch_op:
+        batch_op.create_index('ix_options_question_id', ['question_id'], unique=False)
+
+    with op.batch_alter_table('user_answers', schema=None) as batch_op:
+        batch_op.create_index('ix_user_answers_question_id', ['question_id'], unique=False)
+        batch_op.create_index('ix_user_answers_selected_option', ['selected_option'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user_answers', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_answers_selected_option')
+        batch_op.drop_index('ix_user_answers_question_id')
+
+    with op.batch_alter_table('options', schema=None) as batch_op:
+        batch_op.drop_index('ix_options_question_id')
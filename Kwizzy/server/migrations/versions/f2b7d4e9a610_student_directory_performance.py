@@ -0,0 +1,42 @@
+"""student directory performance column and sort indexes
+
+Revision ID: f2b7d4e9a610
+Revises: e5a9c3f1b267
+Create Date: 2026-10-18 23:12:47.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b7d4e9a610'
+down_revision = 'e5a9c3f1b267'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('performance', sa.Float(), server_default='0', nullable=False))
+        batch_op.create_index('ix_users_role_name', ['role', 'name', 'id'], unique=False)
+        batch_op.create_index('ix_users_role_email', ['role', 'email', 'id'], unique=False)
+        batch_op.create_index('ix_users_role_qualification', ['role', 'qualification', 'id'], unique=False)
+        batch_op.create_index('ix_users_role_dob', ['role', 'dob', 'id'], unique=False)
+        batch_op.create_index('ix_users_role_performance', ['role', 'performance', 'id'], unique=False)
+    # What refresh_performance() computes, from the rollup backfilled in a3e81c5d7f24
+    op.execute(
+        'UPDATE users SET performance = coalesce(('
+        'SELECT round(sum(s.marks_scored) * 100.0 / nullif(sum(s.total_marks), 0), 2) '
+        'FROM student_daily_stats AS s WHERE s.user_id = users.id), 0)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_role_performance')
+        batch_op.drop_index('ix_users_role_dob')
+        batch_op.drop_index('ix_users_role_qualification')
+        batch_op.drop_index('ix_users_role_email')
+        batch_op.drop_index('ix_users_role_name')
+        batch_op.drop_column('performance')